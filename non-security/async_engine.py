@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Async Probe Engine for Security Tests
+Runs many endpoint probes concurrently on one event loop, with bounded
+concurrency per host. Uses aiohttp when it is installed and falls back to
+the shared pooled transport on a thread pool otherwise.
+"""
+
+import asyncio
+import contextvars
+import importlib.util
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from cassette import get_cassette
+from http_transport import BODY_CHUNK_SIZE, DOWNLOAD_STATS, BodyReader, get_transport, POOL_STATS
+from latency import LATENCY
+from pacing import get_pacer
+
+# aiohttp takes longer to import than the rest of the harness together, so
+# it is only imported once an engine is actually opened with it
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+aiohttp = None
+
+
+def _import_aiohttp():
+    global aiohttp
+    if aiohttp is None:
+        import aiohttp as module
+        aiohttp = module
+    return aiohttp
+
+
+class ProbeResponse:
+    """Minimal response object shared by both engine backends"""
+
+    def __init__(self, status_code, headers, content, elapsed, url, truncated=False, stopped_early=False):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+        self.url = url
+        self.truncated = truncated
+        self.stopped_early = stopped_early
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    @classmethod
+    def from_requests(cls, response, elapsed):
+        return cls(response.status_code, response.headers, response.content, elapsed, response.url,
+                   getattr(response, 'truncated', False), getattr(response, 'stopped_early', False))
+
+
+class AsyncProbeEngine:
+    """
+    Async HTTP engine for tester probes
+
+    Usage:
+        async with AsyncProbeEngine() as engine:
+            responses = await engine.gather([
+                engine.get(url1, timeout=5),
+                engine.get(url2, timeout=5),
+            ])
+    """
+
+    def __init__(self, per_host_limit=10, total_limit=100, use_aiohttp=None):
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.use_aiohttp = AIOHTTP_AVAILABLE if use_aiohttp is None else (use_aiohttp and AIOHTTP_AVAILABLE)
+        self.backend = 'aiohttp' if self.use_aiohttp else 'threads'
+        self._host_limits = {}
+        self._session = None
+        self._executor = None
+
+    async def __aenter__(self):
+        # Cassettes hook the requests adapter, so recording and replay stay on the thread backend
+        if self.use_aiohttp and get_cassette() is None:
+            _import_aiohttp()
+            connector = aiohttp.TCPConnector(limit=self.total_limit, limit_per_host=self.per_host_limit)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+        self.backend = 'aiohttp' if self._session is not None else 'threads'
+        self._executor = ThreadPoolExecutor(max_workers=self.total_limit)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def request(self, method, url, pacing=True, expect_throttle=False, max_bytes=None, on_chunk=None,
+                      **kwargs):
+        """
+        Send one request; accepts the same keyword arguments as requests
+
+        max_bytes and on_chunk bound and stop the body read as in
+        HttpTransport.request.
+        """
+        async with self._host_limit(url):
+            # aiohttp has no equivalent of requests' files=, so uploads use the transport
+            if self._session is None or 'files' in kwargs:
+                start = time.perf_counter()
+                response = await self.run_sync(
+                    get_transport().request, method, url,
+                    pacing=pacing, expect_throttle=expect_throttle,
+                    max_bytes=max_bytes, on_chunk=on_chunk, **kwargs
+                )
+                return ProbeResponse.from_requests(response, time.perf_counter() - start)
+
+            host = urlsplit(url).hostname
+            POOL_STATS.record(host, 'requests')
+            pacer = get_pacer()
+
+            if pacing:
+                wait = pacer.reserve(host)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            reader = BodyReader(max_bytes, on_chunk)
+            complete = True
+            start = time.perf_counter()
+            try:
+                async with self._session.request(method, url, **self._aiohttp_kwargs(kwargs)) as response:
+                    async for chunk in response.content.iter_chunked(BODY_CHUNK_SIZE):
+                        if not reader.feed(chunk):
+                            complete = response.content.at_eof()
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if pacing:
+                    pacer.observe_error(host)
+                raise
+            content = reader.finish(complete)
+            DOWNLOAD_STATS.record(pacer.suite_name(), reader)
+
+            elapsed = time.perf_counter() - start
+            LATENCY.record(method, url, elapsed)
+            if pacing:
+                pacer.observe(host, response.status, elapsed, response.headers, expect_throttle=expect_throttle)
+            return ProbeResponse(response.status, response.headers, content, elapsed, str(response.url),
+                                 reader.truncated, reader.stopped)
+
+    @staticmethod
+    def _aiohttp_kwargs(kwargs):
+        """Translate requests-style keyword arguments for aiohttp"""
+        kwargs = dict(kwargs)
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        if kwargs.pop('verify', True) is False:
+            kwargs['ssl'] = False
+        return kwargs
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request('PUT', url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request('DELETE', url, **kwargs)
+
+    async def options(self, url, **kwargs):
+        return await self.request('OPTIONS', url, **kwargs)
+
+    async def gather(self, probes):
+        """Await probes together; failed probes come back as their exception"""
+        return await asyncio.gather(*probes, return_exceptions=True)
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Adapter for blocking code: run it on the engine's thread pool"""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. the current suite) into the thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+
+
+async def run_tester_async(engine, tester, *args):
+    """
+    Run a tester's whole suite on the engine
+
+    Testers with a run_all_tests_async(engine, ...) method run natively on
+    the event loop; everything else goes through the thread adapter.
+    """
+    if hasattr(tester, 'run_all_tests_async'):
+        return await tester.run_all_tests_async(engine, *args)
+    return await engine.run_sync(tester.run_all_tests, *args)
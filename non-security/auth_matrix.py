@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Authorization Matrix for Security Tests
+Requests every indexed route as every test identity on a bounded thread
+pool and records an allow/deny matrix, saved column by column so two runs
+diff cleanly
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+
+from http_transport import get_transport
+from pacing import suite_executor
+from route_index import get_route_index
+
+# One character per cell
+ALLOW, DENY, REDIRECT, MISSING, SERVER_ERROR, FAILED = 'A', 'D', 'R', 'N', 'E', 'X'
+
+# Routes only admins should reach
+ADMIN_ROUTE = re.compile(r'(^|/)admin(/|$)')
+ADMIN_MIDDLEWARE = re.compile(r'^(role|can|permission):|admin')
+
+
+class Identity:
+    """A test identity: the credentials sent with each of its requests"""
+
+    def __init__(self, name, token=None, cookies=None, admin=False):
+        self.name = name
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self.cookies = dict(cookies or {})
+        self.admin = admin
+
+    @property
+    def fingerprint(self):
+        """Identities with the same credentials send identical requests"""
+        return (tuple(sorted(self.headers.items())), tuple(sorted(self.cookies.items())))
+
+
+def classify(response):
+    """Verdict character for one response"""
+    status = response.status_code
+    if 200 <= status < 300:
+        return ALLOW
+    if status in (401, 403, 419):
+        return DENY
+    if 300 <= status < 400:
+        # Laravel sends guests to the login page
+        return DENY if 'login' in response.headers.get('Location', '') else REDIRECT
+    if status in (404, 405):
+        return MISSING
+    if status >= 500:
+        return SERVER_ERROR
+    return DENY
+
+
+class AuthorizationMatrix:
+    """
+    Route x identity matrix
+
+    Only GET routes are requested: the matrix runs as admin too, and
+    replaying every POST/PUT/DELETE route as admin would change the target.
+    Path parameters are filled with 1.
+    """
+
+    def __init__(self, base_url, identities, routes=None, workers=None, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.identities = identities
+        self.workers = workers or int(os.getenv('AUTHZ_WORKERS', get_transport().pool_size))
+        self.timeout = timeout
+        self.http = get_transport()
+
+        index = get_route_index()
+        routes = index.query(method='GET') if routes is None else routes
+
+        # One row per concrete URL; duplicate route definitions collapse into it
+        self.rows = []
+        seen = {}
+        for route in routes:
+            path = index.fill_path(route['path'])
+            if path in seen:
+                seen[path]['routes'] += 1
+                continue
+            row = {
+                'method': 'GET',
+                'path': path,
+                'route': route['path'],
+                'name': route['name'],
+                'auth': index.requires_auth(route),
+                'admin': bool(ADMIN_ROUTE.search(route['path']) or any(ADMIN_MIDDLEWARE.search(m) for m in route['middleware'])),
+                'routes': 1,
+            }
+            seen[path] = row
+            self.rows.append(row)
+
+        self.cells = {}       # (row index, identity name) -> (verdict, status)
+        self.stats = {}
+
+    def run(self):
+        """Send every unique request once and fill in the matrix"""
+        requests_by_key = {}
+        cell_keys = {}
+        for i, row in enumerate(self.rows):
+            for identity in self.identities:
+                key = (row['method'], row['path'], identity.fingerprint)
+                requests_by_key.setdefault(key, identity)
+                cell_keys[(i, identity.name)] = key
+
+        started = datetime.now()
+        with suite_executor(self.workers) as executor:
+            outcomes = dict(zip(requests_by_key, executor.map(self._probe, requests_by_key.items())))
+        elapsed = (datetime.now() - started).total_seconds()
+
+        self.cells = {cell: outcomes[key] for cell, key in cell_keys.items()}
+        self.stats = {
+            'rows': len(self.rows),
+            'identities': len(self.identities),
+            'cells': len(cell_keys),
+            'requests': len(requests_by_key),
+            'deduplicated': len(cell_keys) - len(requests_by_key),
+            'workers': self.workers,
+            'seconds': round(elapsed, 2),
+        }
+        return self.cells
+
+    def _probe(self, item):
+        (method, path, _), identity = item
+        try:
+            response = self.http.request(
+                method, f"{self.base_url}{path}",
+                headers={**identity.headers, 'Accept': 'application/json'},
+                cookies=identity.cookies or None,
+                timeout=self.timeout,
+                allow_redirects=False
+            )
+        except Exception:
+            return (FAILED, None)
+        return (classify(response), response.status_code)
+
+    def verdicts(self, identity_name):
+        return ''.join(self.cells[(i, identity_name)][0] for i in range(len(self.rows)))
+
+    def findings(self):
+        """
+        Cells that should have been denied: anonymous access to routes with
+        auth middleware, and non-admin access to admin routes
+        """
+        found = []
+        for i, row in enumerate(self.rows):
+            for identity in self.identities:
+                verdict, status = self.cells[(i, identity.name)]
+                if verdict != ALLOW:
+                    continue
+                if row['auth'] and not identity.headers and not identity.cookies:
+                    found.append({'path': row['path'], 'identity': identity.name, 'status': status,
+                                  'issue': 'anonymous access to authenticated route'})
+                elif row['admin'] and not identity.admin:
+                    found.append({'path': row['path'], 'identity': identity.name, 'status': status,
+                                  'issue': 'non-admin access to admin route'})
+        return found
+
+    def to_columns(self):
+        """
+        Columnar form: one list per field, one verdict string per identity
+
+        Row i of every column describes the same request, so a diff of two
+        saved matrices points straight at the cells that changed.
+        """
+        columns = {
+            'method': [row['method'] for row in self.rows],
+            'path': [row['path'] for row in self.rows],
+            'name': [row['name'] for row in self.rows],
+            'auth': ''.join('1' if row['auth'] else '0' for row in self.rows),
+            'admin': ''.join('1' if row['admin'] else '0' for row in self.rows),
+        }
+        for identity in self.identities:
+            columns[f"verdict.{identity.name}"] = self.verdicts(identity.name)
+            columns[f"status.{identity.name}"] = [self.cells[(i, identity.name)][1] for i in range(len(self.rows))]
+
+        return {
+            'base_url': self.base_url,
+            'generated_at': datetime.now().isoformat(),
+            'identities': [identity.name for identity in self.identities],
+            'legend': {ALLOW: 'allow', DENY: 'deny', REDIRECT: 'redirect', MISSING: 'not found',
+                       SERVER_ERROR: 'server error', FAILED: 'request failed'},
+            'stats': self.stats,
+            'columns': columns,
+        }
+
+    def save_with_previous(self, path):
+        """
+        Save to path, keeping the matrix already there for the same target
+
+        Returns the verdict changes since that matrix, or None when there
+        was no earlier matrix of this target to compare with.
+        """
+        previous = load_matrix(path)
+        if previous is None or previous.get('base_url') != self.base_url:
+            self.save(path)
+            return None
+        os.replace(path, previous_path(path))
+        self.save(path)
+        return diff_matrices(previous, self.to_columns())
+
+    def save(self, path):
+        """Write the columnar matrix with one column per line"""
+        data = self.to_columns()
+        columns = data.pop('columns')
+        lines = [f"  {json.dumps(key)}: {json.dumps(value)}" for key, value in data.items()]
+        column_lines = [f"    {json.dumps(key)}: {json.dumps(value)}" for key, value in columns.items()]
+        with open(path, 'w') as f:
+            f.write("{\n" + ",\n".join(lines) + ',\n  "columns": {\n' + ",\n".join(column_lines) + "\n  }\n}\n")
+        return path
+
+
+def load_matrix(path):
+    """A saved matrix, or None if there is none at path"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def previous_path(path):
+    """Where save_with_previous keeps the matrix it replaces"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.previous{ext}"
+
+
+def diff_matrices(old, new):
+    """Cells whose verdict changed between two saved matrices, matched by method and path"""
+    def cells(data):
+        columns = data['columns']
+        rows = list(zip(columns['method'], columns['path']))
+        return {
+            (method, path, name): columns[f"verdict.{name}"][i]
+            for name in data['identities']
+            for i, (method, path) in enumerate(rows)
+        }
+
+    before, after = cells(old), cells(new)
+    return [
+        {'method': method, 'path': path, 'identity': name,
+         'before': before.get((method, path, name)), 'after': after.get((method, path, name))}
+        for method, path, name in sorted(set(before) | set(after))
+        if before.get((method, path, name)) != after.get((method, path, name))
+    ]
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Harness Throughput Benchmark
+Runs each test suite against its own fresh local stand-in target
+(mock_server.py), one child process per suite, so no suite inherits another's
+used-up auth throttle, and records requests/sec, CPU time and peak
+RSS so a slowdown in the harness itself shows up in CI
+
+Usage:
+    python benchmark.py
+    python benchmark.py --suite "Rate Limiting" --latency 0.01
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from tabulate import tabulate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+# Child environment: no pacing sleeps and uncapped load rates, so the run
+# measures the harness rather than its deliberate waits. Already-set
+# variables win.
+BENCHMARK_ENV = {
+    'PACING': 'false',
+    'RATE_LIMIT_RPS': '500',
+    'LOADGEN_MAX_RATE': '500',
+    'TIMING_BOOTSTRAP': '500',
+    'CASSETTE_MODE': 'off',
+}
+
+# Throttled by the mock; a suite throttled here measured skipped work
+AUTH_PATHS = ('/register', '/api/auth/login')
+
+# Regressions are flagged on these, with the direction that is worse
+METRICS = {'requests_per_second': 'lower', 'cpu_seconds': 'higher', 'peak_rss_mb': 'higher'}
+
+
+def maxrss_mb(ru_maxrss):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else ru_maxrss / 1024
+
+
+def start_target(profile, latency, limit):
+    """Start mock_server.py on a free port; returns (process, url)"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'mock_server.py'), '--port', '0',
+         '--profile', profile, '--latency', str(latency), '--limit', str(limit)],
+        stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line.startswith('Mock target on '):
+        process.kill()
+        raise RuntimeError(f"mock server did not start: {line!r}")
+    return process, line.split()[3]
+
+
+def run_child(suite_name, base_url):
+    """
+    Child side: run one suite with its output discarded, then print one JSON
+    line with the request count
+    """
+    sys.path.insert(0, os.path.join(HERE, 'tests'))
+    from run_all_tests import TEST_SUITES, SecurityTestRunner, load_tester
+    from http_transport import POOL_STATS, get_transport
+
+    spec = next((spec for spec in TEST_SUITES if spec[0] == suite_name), None)
+    if spec is None:
+        raise SystemExit(f"unknown suite: {suite_name}")
+
+    # The credential suites log in; the mock starts with no users. A suite
+    # that cannot register or log in skips most of its requests, so its
+    # numbers are reported as an error rather than as a fast run.
+    email, password = f"bench-{os.getpid()}@example.com", 'Benchmark-Passw0rd!'
+    error = None
+    registered = requests.post(f"{base_url}/register", json={'name': 'Benchmark', 'email': email, 'password': password,
+                                                              'password_confirmation': password},
+                               allow_redirects=False, timeout=10)
+    if registered.status_code not in (200, 201, 302):
+        error = f"registration failed: {registered.status_code}"
+    else:
+        login = requests.post(f"{base_url}/api/auth/login", json={'email': email, 'password': password}, timeout=10)
+        if login.status_code != 200:
+            error = f"login failed: {login.status_code}"
+
+    # Suites that probe the throttle are expected to hit it
+    throttled = []
+    if 'rate-limit' not in load_tester(spec[1]).tags:
+        def note_throttled(response, **kwargs):
+            path = urlsplit(response.url).path
+            if response.status_code == 429 and path in AUTH_PATHS:
+                throttled.append(path)
+        get_transport().session.hooks['response'].append(note_throttled)
+
+    runner = SecurityTestRunner(base_url, email, password)
+    runner.start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            runner.run_suite_spec(*spec)
+        except Exception as e:
+            error = error or f"{type(e).__name__}: {e}"
+    if throttled and not error:
+        error = f"auth throttled: {len(throttled)} x 429 on {', '.join(sorted(set(throttled)))}"
+    print(json.dumps({'requests': POOL_STATS.snapshot()['totals']['requests'], 'error': error}))
+
+
+def measure_suite(suite_name, base_url, env):
+    """Run one suite in a child process; wall time, CPU time and peak RSS from wait4"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child', suite_name, base_url],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env, cwd=HERE
+    )
+    stdout, stderr = process.stdout.read(), process.stderr.read()
+    # wait4 rather than Popen.wait: it also returns the child's own rusage
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+
+    lines = stdout.strip().splitlines()
+    try:
+        child = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        child = {'requests': 0, 'error': (stderr.strip().splitlines() or ['no output'])[-1]}
+
+    requests = child['requests']
+    return {
+        'suite': suite_name,
+        'requests': requests,
+        'wall_seconds': round(wall, 3),
+        'requests_per_second': round(requests / wall, 1) if wall else 0.0,
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+        'peak_rss_mb': round(maxrss_mb(usage.ru_maxrss), 1),
+        'exit_code': process.returncode,
+        'error': child.get('error'),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Suites whose metrics are worse than baseline by more than tolerance"""
+    previous = {row['suite']: row for row in baseline.get('suites', [])}
+    regressions = []
+    for row in results:
+        before = previous.get(row['suite'])
+        if not before:
+            continue
+        for metric, worse in METRICS.items():
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (worse == 'lower' and change < -tolerance) or (worse == 'higher' and change > tolerance):
+                regressions.append({'suite': row['suite'], 'metric': metric, 'baseline': old,
+                                    'current': new, 'change': round(change, 3)})
+    return regressions
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        return run_child(sys.argv[2], sys.argv[3])
+
+    sys.path.insert(0, os.path.join(HERE, 'tests'))
+    from run_all_tests import TEST_SUITES
+    names = [spec[0] for spec in TEST_SUITES]
+
+    parser = argparse.ArgumentParser(description="Benchmark the harness against the local stand-in target")
+    parser.add_argument('--suite', action='append', choices=names, help="Suite to run (repeatable; default all)")
+    parser.add_argument('--profile', choices=('secure', 'vulnerable'), default='secure', help="Mock target profile")
+    parser.add_argument('--latency', type=float, default=0.0, help="Added mock response delay in seconds")
+    parser.add_argument('--limit', type=int, default=60, help="Mock throttle per minute on auth paths (0 = none)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument('--baseline', help="Earlier results JSON; exit 1 if any suite regressed")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression (default 0.2)")
+    args = parser.parse_args()
+
+    env = {**BENCHMARK_ENV, **os.environ}
+    results = []
+    for name in args.suite or names:
+        print(f"Benchmarking {name}...", flush=True)
+        # A fresh target per suite: its throttle counts start at zero
+        target, base_url = start_target(args.profile, args.latency, args.limit)
+        try:
+            results.append(measure_suite(name, base_url, env))
+        finally:
+            target.terminate()
+            target.wait()
+
+    print(tabulate(
+        [[r['suite'], r['requests'], r['wall_seconds'], r['requests_per_second'], r['cpu_seconds'],
+          r['peak_rss_mb'], r['error'] or ''] for r in results],
+        headers=['Suite', 'Requests', 'Wall (s)', 'Req/s', 'CPU (s)', 'Peak RSS (MB)', 'Error'],
+        tablefmt='grid'
+    ))
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'target': {'profile': args.profile, 'latency': args.latency, 'limit': args.limit},
+        'suites': results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+        for item in regressions:
+            print(f"REGRESSION {item['suite']}: {item['metric']} {item['baseline']} -> {item['current']} "
+                  f"({item['change']:+.0%})")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Synchronized Request Bursts for Security Tests
+Last-byte synchronization: N connections are opened and warmed, every
+request is written except its final byte, and only then are all final
+bytes released together, so the server receives the requests within
+microseconds of each other instead of spread over thread and connection
+start-up
+"""
+
+import json
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from cassette import get_cassette, request_key
+from latency import LATENCY
+from upload_payloads import read_status
+
+
+def serialize_request(method, url, json_body=None, headers=None):
+    """Raw HTTP/1.1 request bytes; Connection: close so the response ends at EOF"""
+    parts = urlsplit(url)
+    path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    body = json.dumps(json_body).encode() if json_body is not None else b''
+
+    lines = [f"{method.upper()} {path} HTTP/1.1", f"Host: {parts.netloc}", "Accept: application/json"]
+    if json_body is not None:
+        lines.append("Content-Type: application/json")
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    lines += [f"Content-Length: {len(body)}", "Connection: close", "", ""]
+    return "\r\n".join(lines).encode() + body
+
+
+def _read_head(sock, received=b''):
+    """Read up to the end of the response headers: (head, rest)"""
+    while b'\r\n\r\n' not in received:
+        data = sock.recv(65536)
+        if not data:
+            raise ConnectionError("connection closed during warm-up")
+        received += data
+    head, rest = received.split(b'\r\n\r\n', 1)
+    return head, rest
+
+
+def _drain_response(sock):
+    """
+    Read one keep-alive response completely; returns whether the connection
+    can carry another request
+    """
+    head, body = _read_head(sock)
+    headers = {}
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get(b'connection') == b'close' or b'content-length' not in headers:
+        return False
+    remaining = int(headers[b'content-length']) - len(body)
+    while remaining > 0:
+        data = sock.recv(min(remaining, 65536))
+        if not data:
+            return False
+        remaining -= len(data)
+    return True
+
+
+class BurstConnection:
+    """One pre-opened connection holding a request minus its last byte"""
+
+    def __init__(self, url, tls_context=None, timeout=10):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.tls_context = tls_context
+        self.timeout = timeout
+        self.sock = None
+        self.sent_at = None
+        self.status_code = None
+        self.elapsed = None
+        self.error = None
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        # The final byte must leave immediately, not wait for an ACK
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.https:
+            context = self.tls_context or ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=self.host)
+        self.sock = sock
+
+    def warm(self, path):
+        """Send one keep-alive request so TCP slow start and lazy server setup are behind us"""
+        self.sock.sendall(
+            f"GET {path} HTTP/1.1\r\nHost: {self.netloc}\r\nAccept: application/json\r\n\r\n".encode()
+        )
+        if not _drain_response(self.sock):
+            self.sock.close()
+            self.connect()
+
+    def prime(self, payload):
+        self.sock.sendall(payload[:-1])
+        self.last_byte = payload[-1:]
+
+    def fire(self):
+        self.sock.send(self.last_byte)
+        self.sent_at = time.perf_counter_ns()
+
+    def read(self):
+        try:
+            self.status_code = read_status(self.sock, b'')
+        except OSError as e:
+            self.error = str(e)
+        self.elapsed = (time.perf_counter_ns() - self.sent_at) / 1e9 if self.sent_at else None
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
+class RecordedBurst:
+    """A burst served from a cassette"""
+
+    def __init__(self, data):
+        self.data = data
+        self.spread_us = data['send_spread_us']
+        self.status_codes = data['status_codes']
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class BurstResult:
+    def __init__(self, connections):
+        self.connections = connections
+        sent = [c.sent_at for c in connections if c.sent_at is not None]
+        self.first_sent = min(sent) if sent else None
+        self.spread_us = (max(sent) - min(sent)) / 1000 if sent else None
+
+    @property
+    def status_codes(self):
+        return [c.status_code for c in self.connections]
+
+    def to_dict(self):
+        return {
+            'requests': len(self.connections),
+            'send_spread_us': round(self.spread_us, 1) if self.spread_us is not None else None,
+            'send_offsets_us': [
+                round((c.sent_at - self.first_sent) / 1000, 1) if c.sent_at is not None else None
+                for c in self.connections
+            ],
+            'status_codes': self.status_codes,
+            'elapsed_ms': [round(c.elapsed * 1000, 2) if c.elapsed is not None else None for c in self.connections],
+            'errors': [c.error for c in self.connections if c.error],
+        }
+
+
+def send_burst(url, payloads, method='POST', headers=None, warm_path=None, tls_context=None, timeout=10):
+    """
+    Send every payload in payloads as one synchronized burst
+
+    payloads are JSON bodies, one request each. warm_path, if given, is
+    fetched once on every connection before the burst. Once every
+    connection is primed (the barrier), the final bytes go out back to back
+    from a single thread: a thread per socket has to win the GIL after the
+    release, which spreads sends over milliseconds rather than tens of
+    microseconds. Responses are then read in parallel.
+    """
+    cassette = get_cassette()
+    key = request_key(f"BURST {method}", url, json.dumps(payloads), headers) if cassette is not None else None
+    if cassette is not None and cassette.replaying:
+        return RecordedBurst(cassette.replay(key))
+
+    connections = [BurstConnection(url, tls_context=tls_context, timeout=timeout) for _ in payloads]
+    try:
+        for connection in connections:
+            connection.connect()
+            if warm_path:
+                connection.warm(warm_path)
+        for connection, payload in zip(connections, payloads):
+            connection.prime(serialize_request(method, url, payload, headers))
+
+        for connection in connections:
+            connection.fire()
+
+        with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+            list(executor.map(BurstConnection.read, connections))
+
+        for connection in connections:
+            if connection.elapsed is not None:
+                LATENCY.record(method, url, connection.elapsed)
+        result = BurstResult(connections)
+        if cassette is not None:
+            cassette.record(key, result.to_dict())
+        return result
+    finally:
+        for connection in connections:
+            connection.close()
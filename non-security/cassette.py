@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Record/Replay Cassettes for Security Tests
+Record mode stores every request and response of a run in one compressed,
+indexed file; replay mode serves the responses from it without touching the
+network, so harness changes can be checked offline in about a second
+"""
+
+import atexit
+import base64
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+MAGIC = b'SECCASSETTE1\n'
+TRAILER = struct.Struct('>QQ')   # index offset, index length
+
+DEFAULT_PATH = 'security_run.cassette'
+
+# Values that differ between runs of the same test: timestamps, counters, uuids, nonces
+VOLATILE = re.compile(r'[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*|\d+')
+BOUNDARY = re.compile(rb'boundary=([^\s;]+)')
+
+
+def _mask(text):
+    return VOLATILE.sub('#', text)
+
+
+def _mask_json(value):
+    if isinstance(value, dict):
+        return {key: _mask_json(item) for key, item in sorted(value.items())}
+    if isinstance(value, list):
+        return [_mask_json(item) for item in value]
+    if isinstance(value, str):
+        return _mask(value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return '#' if abs(value) >= 100000 else value
+    return value
+
+
+def normalize_url(url):
+    """Scheme-less URL with sorted query parameters and volatile values masked"""
+    parts = urlsplit(url)
+    query = urlencode(sorted((key, _mask(value)) for key, value in parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.netloc}{_mask(parts.path) or '/'}" + (f"?{query}" if query else '')
+
+
+def normalize_body(body, content_type=''):
+    """Stable text for a request body: masked JSON, masked form/multipart, or a stream's length"""
+    if body is None or body == b'' or body == '':
+        return ''
+    if not isinstance(body, (bytes, str)):
+        # A streamed body (file upload); its length is all that is stable
+        try:
+            return f"<stream {len(body)}>"
+        except TypeError:
+            return '<stream>'
+
+    raw = body.encode() if isinstance(body, str) else body
+    boundary = BOUNDARY.search((content_type or '').encode())
+    if boundary:
+        return '\n'.join(_normalize_part(part) for part in raw.split(b'--' + boundary.group(1)))
+    try:
+        return json.dumps(_mask_json(json.loads(raw)), sort_keys=True)
+    except (ValueError, UnicodeDecodeError):
+        return _mask(raw.decode('latin-1'))
+
+
+def _normalize_part(part):
+    """A multipart part: headers masked, binary content reduced to its length (zips embed timestamps)"""
+    head, separator, content = part.partition(b'\r\n\r\n')
+    if not separator:
+        return _mask(part.decode('latin-1'))
+    try:
+        content = _mask(content.decode('utf-8'))
+    except UnicodeDecodeError:
+        content = f"<{len(content)} bytes>"
+    return _mask(head.decode('latin-1')) + '\n' + content
+
+
+def request_key(method, url, body=None, headers=None):
+    """
+    Normalized request key
+
+    Credentials are part of the key, unmasked, so the same URL fetched as two
+    identities stays two entries; in replay, tokens come from replayed logins
+    and match.
+    """
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    credentials = f"{headers.get('authorization', '')}|{headers.get('cookie', '')}"
+    material = '\n'.join([
+        method.upper(),
+        normalize_url(url),
+        normalize_body(body, headers.get('content-type', '')),
+        hashlib.sha1(credentials.encode()).hexdigest() if credentials != '|' else '',
+    ])
+    return hashlib.sha1(material.encode()).hexdigest()[:20]
+
+
+class CassetteMiss(ConnectionError):
+    """Replay found no recorded response for a request"""
+
+
+class Cassette:
+    """
+    One cassette file
+
+    Layout: magic, zlib-compressed entries back to back, the compressed JSON
+    index {key: [[offset, length], ...]}, then the index's offset and length.
+    Replay loads only the index and seeks to an entry on demand, so lookup
+    is a dict hit plus one read. Repeats of a key are replayed in recorded
+    order; past the last one, the last response repeats.
+    """
+
+    def __init__(self, path, mode):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.index = {}
+        self.positions = {}      # key -> next entry number to replay
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if mode == 'record':
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+        else:
+            self._file = open(path, 'rb')
+            if self._file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a cassette file")
+            self._file.seek(-TRAILER.size, os.SEEK_END)
+            offset, length = TRAILER.unpack(self._file.read(TRAILER.size))
+            self._file.seek(offset)
+            self.index = json.loads(zlib.decompress(self._file.read(length)))
+
+    @property
+    def recording(self):
+        return self.mode == 'record' and not self._closed
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def record(self, key, entry):
+        """Append one entry (a JSON-able dict) under key"""
+        data = zlib.compress(json.dumps(entry).encode(), 6)
+        with self._lock:
+            if self._closed:
+                return
+            offset = self._file.tell()
+            self._file.write(data)
+            self.index.setdefault(key, []).append([offset, len(data)])
+            self.stats['recorded'] += 1
+
+    def replay(self, key):
+        """The next recorded entry for key; raises CassetteMiss if there is none"""
+        with self._lock:
+            entries = self.index.get(key)
+            if not entries:
+                self.stats['misses'] += 1
+                raise CassetteMiss(key)
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            offset, length = entries[min(position, len(entries) - 1)]
+            self._file.seek(offset)
+            data = self._file.read(length)
+            self.stats['replayed'] += 1
+        return json.loads(zlib.decompress(data))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.mode == 'record':
+                index = zlib.compress(json.dumps(self.index).encode(), 9)
+                offset = self._file.tell()
+                self._file.write(index)
+                self._file.write(TRAILER.pack(offset, len(index)))
+            self._file.close()
+
+    def report(self):
+        return {'mode': self.mode, 'path': self.path, 'keys': len(self.index), **self.stats}
+
+
+def encode_body(content):
+    return base64.b64encode(content or b'').decode('ascii')
+
+
+def decode_body(data):
+    return base64.b64decode(data)
+
+
+_cassette = None
+_cassette_configured = False
+_cassette_lock = threading.Lock()
+
+
+def configure_cassette(mode=None, path=None):
+    """
+    Open the process-wide cassette; mode is 'record', 'replay' or None (off)
+
+    Defaults come from CASSETTE_MODE and CASSETTE_PATH.
+    """
+    global _cassette, _cassette_configured
+    with _cassette_lock:
+        if _cassette is not None:
+            _cassette.close()
+        mode = mode or os.getenv('CASSETTE_MODE', '').lower() or None
+        path = path or os.getenv('CASSETTE_PATH', DEFAULT_PATH)
+        _cassette = Cassette(path, mode) if mode and mode != 'off' else None
+        if _cassette is not None:
+            atexit.register(_cassette.close)
+        _cassette_configured = True
+        return _cassette
+
+
+def get_cassette():
+    """The process-wide cassette, or None when recording and replay are off"""
+    if not _cassette_configured:
+        configure_cassette()
+    return _cassette
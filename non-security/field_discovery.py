@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Mass Assignment Field Discovery
+Adaptive group testing over a large candidate field list (by default every
+users column in the Laravel migrations): many fields go out per request and
+only groups that need it are split, so k findings cost about k*log2(n)
+requests instead of one per field
+"""
+
+import os
+import re
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATION_DIRS = ('database/migrations', 'wave/database/migrations')
+
+# Columns the probes set themselves, or that no endpoint should take
+SKIP_COLUMNS = {'id', 'email', 'password', 'remember_token', 'created_at', 'updated_at', 'deleted_at'}
+
+# Blueprint methods that take a column name but do not define a column
+NON_COLUMN_METHODS = {
+    'dropColumn', 'dropColumns', 'renameColumn', 'index', 'unique', 'primary', 'foreign',
+    'dropForeign', 'dropIndex', 'dropUnique', 'dropPrimary', 'dropIfExists', 'dropConstrainedForeignId',
+}
+
+INTEGER_TYPES = {
+    'integer', 'bigInteger', 'smallInteger', 'tinyInteger', 'mediumInteger',
+    'unsignedInteger', 'unsignedBigInteger', 'unsignedSmallInteger', 'unsignedTinyInteger',
+    'foreignId', 'foreignIdFor',
+}
+DECIMAL_TYPES = {'decimal', 'float', 'double', 'unsignedDecimal'}
+DATE_TYPES = {'timestamp', 'timestampTz', 'dateTime', 'dateTimeTz'}
+
+SCHEMA_BLOCK = re.compile(r"Schema::(?:create|table)\(\s*['\"](\w+)['\"]")
+COLUMN_CALL = re.compile(r"\$table->(\w+)\(\s*['\"](\w+)['\"]")
+
+
+def load_migration_columns(table='users', root=None):
+    """
+    Columns added to table by the up() migrations, as {name: blueprint type}
+
+    Reads database/migrations and wave/database/migrations under root (the
+    repository root, or MIGRATIONS_ROOT).
+    """
+    root = root or os.getenv('MIGRATIONS_ROOT', REPO_ROOT)
+    columns = {}
+
+    paths = []
+    for directory in MIGRATION_DIRS:
+        full = os.path.join(root, directory)
+        if os.path.isdir(full):
+            paths.extend(os.path.join(full, name) for name in os.listdir(full) if name.endswith('.php'))
+
+    # Migration filenames are timestamped, so this is schema order
+    for path in sorted(paths, key=os.path.basename):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            source = f.read()
+
+        # Only up(); down() re-adds columns it is reverting
+        up = source.split('function down', 1)[0]
+        blocks = SCHEMA_BLOCK.split(up)
+        # split() alternates: preamble, table, body, table, body, ...
+        for block_table, body in zip(blocks[1::2], blocks[2::2]):
+            if block_table != table:
+                continue
+            for method, name in COLUMN_CALL.findall(body):
+                if method in NON_COLUMN_METHODS or name in SKIP_COLUMNS:
+                    continue
+                columns.setdefault(name, method)
+
+    return columns
+
+
+def candidate_value(column_type, current, marker):
+    """A value for the column that differs from its current value"""
+    if column_type == 'boolean':
+        return not current
+    if column_type in INTEGER_TYPES:
+        # Try 1 first: for role_id and friends that is usually the admin row
+        return 1 if current != 1 else 2
+    if column_type in DECIMAL_TYPES:
+        return (float(current) if current not in (None, '') else 0.0) + 1.5
+    if column_type in DATE_TYPES:
+        return '2099-12-31 23:59:59'
+    if column_type == 'date':
+        return '2099-12-31'
+    if column_type in ('json', 'jsonb'):
+        return {'probe': marker}
+    return marker
+
+
+def value_persisted(sent, stored):
+    """Whether a read-back value is the one that was sent"""
+    if isinstance(sent, bool):
+        return stored in (sent, int(sent), str(int(sent)))
+    if isinstance(sent, (int, float)):
+        try:
+            return float(stored) == float(sent)
+        except (TypeError, ValueError):
+            return False
+    if isinstance(sent, str) and sent.startswith('2099-12-31'):
+        return isinstance(stored, str) and stored.startswith('2099-12-31')
+    return stored == sent
+
+
+class GroupProbe:
+    """Outcome of sending one group of fields"""
+
+    def __init__(self, ok, persisted=None, side_effects=None):
+        self.ok = ok                               # request accepted and read back
+        self.persisted = persisted or {}           # sent field -> stored value
+        self.side_effects = side_effects or set()  # read-back keys that changed but were not sent
+
+
+class GroupTester:
+    """
+    Adaptive group testing over candidate fields
+
+    oracle(fields) sends one group and returns a GroupProbe. Read-back
+    attributes persisted fields directly; a group is split in half only when
+    it cannot be attributed: the request was rejected (one bad field poisons
+    the rest) or something changed that was not sent.
+    """
+
+    def __init__(self, oracle, group_size=64):
+        self.oracle = oracle
+        self.group_size = group_size
+        self.probes = 0
+
+    def run(self, fields):
+        fields = list(fields)
+        persisted = {}
+        side_effects = {}
+        rejected = []
+        self.probes = 0
+
+        # Cap group size: PHP drops input past max_input_vars (1000 by default)
+        stack = [fields[i:i + self.group_size] for i in range(0, len(fields), self.group_size)]
+        stack.reverse()
+
+        while stack:
+            group = stack.pop()
+            probe = self.oracle(group)
+            self.probes += 1
+
+            if probe.ok:
+                persisted.update(probe.persisted)
+                if not probe.side_effects:
+                    continue
+                if len(group) == 1:
+                    side_effects[group[0]] = sorted(probe.side_effects)
+                    continue
+            elif len(group) == 1:
+                rejected.append(group[0])
+                continue
+
+            middle = len(group) // 2
+            stack.append(group[middle:])
+            stack.append(group[:middle])
+
+        return {
+            'candidates': len(fields),
+            'probes': self.probes,
+            'probes_saved': len(fields) - self.probes,
+            'persisted': persisted,
+            'side_effects': side_effects,
+            'rejected': rejected,
+        }
+
+
+def probe_marker():
+    """Unique string marker for one discovery run"""
+    return f"ga-{uuid.uuid4().hex[:8]}"
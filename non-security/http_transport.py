@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+HTTP Transport for Security Tests
+One pooled keep-alive transport shared by every tester and the SessionManager.
+Bodies are streamed within a byte budget, and a probe can stop reading as
+soon as it has seen enough
+"""
+
+import io
+import os
+import ssl
+import threading
+import time
+from http.client import HTTPMessage
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from urllib3 import HTTPHeaderDict
+except ImportError:   # urllib3 1.x, which requests 2.31 still allows, keeps it private
+    from urllib3._collections import HTTPHeaderDict
+
+from cassette import CassetteMiss, decode_body, encode_body, get_cassette, request_key
+from latency import LATENCY
+from pacing import get_pacer
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+class PoolStats:
+    """Thread-safe connection pool counters, keyed by host"""
+
+    COUNTERS = ('requests', 'pool_hits', 'pool_misses', 'tls_handshakes', 'tls_resumed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts = {}
+
+    def record(self, host, counter, amount=1):
+        with self._lock:
+            counters = self.hosts.setdefault(host, dict.fromkeys(self.COUNTERS, 0))
+            counters[counter] += amount
+
+    def reset(self):
+        """Zero every counter; a long-lived process starts each run fresh"""
+        with self._lock:
+            self.hosts = {}
+
+    def snapshot(self):
+        """Totals plus a per-host breakdown, ready for the JSON report"""
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self.hosts.items()}
+
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for counters in hosts.values():
+            for counter, value in counters.items():
+                totals[counter] += value
+
+        checkouts = totals['pool_hits'] + totals['pool_misses']
+        totals['pool_hit_rate'] = round(totals['pool_hits'] / checkouts, 3) if checkouts else 0.0
+
+        return {'totals': totals, 'hosts': hosts}
+
+
+POOL_STATS = PoolStats()
+
+
+class DownloadStats:
+    """Thread-safe response body counters, keyed by suite"""
+
+    COUNTERS = ('responses', 'bytes', 'truncated', 'stopped_early')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.suites = {}
+
+    def record(self, suite, reader):
+        with self._lock:
+            counters = self.suites.setdefault(suite, dict.fromkeys(self.COUNTERS, 0))
+            counters['responses'] += 1
+            counters['bytes'] += len(reader.body)
+            counters['truncated'] += reader.truncated
+            counters['stopped_early'] += reader.stopped
+
+    def reset(self):
+        """Zero every counter; a long-lived process starts each run fresh"""
+        with self._lock:
+            self.suites = {}
+
+    def suite_report(self, suite):
+        with self._lock:
+            return dict(self.suites.get(suite, dict.fromkeys(self.COUNTERS, 0)))
+
+    def snapshot(self):
+        """Totals plus a per-suite breakdown, ready for the JSON report"""
+        with self._lock:
+            suites = {suite: dict(counters) for suite, counters in self.suites.items()}
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for counters in suites.values():
+            for counter, value in counters.items():
+                totals[counter] += value
+        return {'totals': totals, 'suites': suites}
+
+
+DOWNLOAD_STATS = DownloadStats()
+
+
+def body_budget(max_bytes=None):
+    """Byte budget for a response body: max_bytes, else HTTP_MAX_BODY_BYTES; 0 means no limit"""
+    if max_bytes is None:
+        max_bytes = int(os.getenv('HTTP_MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES))
+    return max_bytes or None
+
+
+class BodyReader:
+    """
+    A response body collected chunk by chunk
+
+    Reading stops at the byte budget (the body is cut there and marked
+    truncated) or when on_chunk(chunk) returns True because the probe has
+    its answer (marked stopped). feed() returns False once reading should
+    stop.
+    """
+
+    def __init__(self, max_bytes=None, on_chunk=None):
+        self.max_bytes = body_budget(max_bytes)
+        self.on_chunk = on_chunk
+        self.body = bytearray()
+        self.truncated = False
+        self.stopped = False
+
+    def feed(self, chunk):
+        if self.max_bytes is not None and len(self.body) + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - len(self.body)]
+            self.truncated = True
+        self.body += chunk
+        if self.on_chunk is not None and chunk and self.on_chunk(chunk):
+            self.stopped = True
+        return not (self.truncated or self.stopped)
+
+    def finish(self, complete):
+        """complete: nothing was left unread, so an early stop skipped nothing"""
+        if complete:
+            self.stopped = False
+        return bytes(self.body)
+
+
+def read_body(response, max_bytes=None, on_chunk=None):
+    """
+    Read a streamed requests response within the byte budget
+
+    Sets response.content and response.truncated / response.stopped_early.
+    A connection left with unread data is closed instead of going back to
+    the pool. Responses already loaded are cut the same way. While a
+    cassette records, the bytes kept here are what gets recorded.
+    """
+    reader = BodyReader(max_bytes, on_chunk)
+    if response._content is False:
+        chunks = response.iter_content(BODY_CHUNK_SIZE)
+        try:
+            for chunk in chunks:
+                if not reader.feed(chunk):
+                    break
+            else:
+                chunks = None
+            if chunks is not None and getattr(response.raw, 'length_remaining', None) == 0:
+                for _ in chunks:
+                    pass   # body fully received; finishing the iterator keeps the connection reusable
+                chunks = None
+        except BaseException:
+            response.close()
+            raise
+        complete = chunks is None
+        if not complete and response.raw is not None:
+            response.raw.close()
+    else:
+        content = response._content or b''
+        position = 0
+        while position < len(content) and reader.feed(content[position:position + BODY_CHUNK_SIZE]):
+            position += BODY_CHUNK_SIZE
+        complete = len(reader.body) >= len(content)
+
+    response._content = reader.finish(complete)
+    response._content_consumed = True
+    # A replayed body that was cut while recording is still a cut body
+    response.truncated = reader.truncated or getattr(response, 'recorded_truncated', False)
+    response.stopped_early = reader.stopped or getattr(response, 'recorded_stopped', False)
+    response.close()
+    pending = getattr(response, 'cassette_entry', None)
+    if pending is not None:
+        cassette, key, entry, start = pending
+        # Timed to the end of the body, like the live latency samples
+        cassette.record(key, {**entry, 'elapsed': time.perf_counter() - start,
+                              'body': encode_body(response._content),
+                              'truncated': reader.truncated, 'stopped_early': reader.stopped})
+    DOWNLOAD_STATS.record(get_pacer().suite_name(), reader)
+    return response
+
+
+def preview(response, limit=300):
+    """The first limit bytes of a body as text, for printing; the rest is never decoded"""
+    return response.content[:limit].decode(getattr(response, 'encoding', None) or 'utf-8', errors='replace')
+
+
+class TLSSessionContext(ssl.SSLContext):
+    """SSLContext that resumes the previous TLS session for a host when it can"""
+
+    def __init__(self, *args, **kwargs):
+        # Last session seen per hostname, offered again on new handshakes
+        self.sessions = {}
+
+    def remember(self, server_hostname, session):
+        self.sessions[server_hostname] = session
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        session = session or self.sessions.get(server_hostname)
+        ssl_sock = super().wrap_socket(
+            sock, *args, server_hostname=server_hostname, session=session, **kwargs
+        )
+
+        POOL_STATS.record(server_hostname, 'tls_handshakes')
+        if ssl_sock.session_reused:
+            POOL_STATS.record(server_hostname, 'tls_resumed')
+        if ssl_sock.session is not None:
+            self.remember(server_hostname, ssl_sock.session)
+
+        return ssl_sock
+
+
+def create_tls_context():
+    """Client context matching urllib3's defaults, but with session tickets enabled"""
+    context = TLSSessionContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    # urllib3 matches hostnames itself, and verify=False needs this off
+    context.check_hostname = False
+    return context
+
+
+def create_socket_tls_context():
+    """
+    Context for probes that open their own sockets (streamed uploads, bursts)
+
+    urllib3 loads CAs and matches hostnames for its own connections; a raw
+    socket wrapped with create_tls_context() would get neither. This one
+    verifies against the same CA bundle requests uses and checks hostnames.
+    """
+    context = create_tls_context()
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.check_hostname = True
+    context.load_verify_locations(requests.utils.DEFAULT_CA_BUNDLE_PATH)
+    return context
+
+
+class _CountingPoolMixin:
+    """Counts whether each connection checkout reused a live socket"""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        sock = getattr(conn, 'sock', None)
+
+        if sock is None:
+            POOL_STATS.record(self.host, 'pool_misses')
+        else:
+            POOL_STATS.record(self.host, 'pool_hits')
+
+        return conn
+
+    def _put_conn(self, conn):
+        # TLS 1.3 tickets arrive after the handshake, so refresh the cached
+        # session once a response has been read on the connection
+        sock = getattr(conn, 'sock', None)
+        context = getattr(sock, 'context', None)
+        if isinstance(context, TLSSessionContext) and sock.session is not None:
+            context.remember(sock.server_hostname, sock.session)
+
+        super()._put_conn(conn)
+
+
+class CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class RecordedMessage:
+    """
+    Stands in for the http.client response behind a replayed response
+
+    requests reads Set-Cookie from it (msg) into the session's jar, as it
+    does for a live response.
+    """
+
+    def __init__(self, method, headers):
+        self._method = method
+        self.msg = HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def isclosed(self):
+        return self.closed
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter using counting pools and the shared TLS context
+
+    Every requests session in the harness sends through this adapter, so it
+    is also where cassettes record responses and serve them back.
+    """
+
+    def __init__(self, tls_context, router=None, **kwargs):
+        self.tls_context = tls_context
+        # router(url) returns the per-host adapter for url, if there is one
+        self.router = router
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.router is not None:
+            # Looked up per request, so sessions created before the host's
+            # adapter existed still use its pool
+            adapter = self.router(request.url)
+            if adapter is not None:
+                return adapter.send(request, **kwargs)
+
+        cassette = get_cassette()
+        if cassette is None:
+            return super().send(request, **kwargs)
+
+        key = request_key(request.method, request.url, request.body, request.headers)
+        if cassette.replaying:
+            try:
+                entry = cassette.replay(key)
+            except CassetteMiss:
+                raise requests.exceptions.ConnectionError(
+                    f"No recorded response for {request.method} {request.url} in {cassette.path}",
+                    request=request
+                )
+            if 'error' in entry:
+                # Failures replay as the same exception type
+                error = getattr(requests.exceptions, entry['error'], requests.exceptions.ConnectionError)
+                raise error(entry['message'], request=request)
+            return self._replayed_response(request, entry)
+
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.exceptions.RequestException as e:
+            cassette.record(key, {'method': request.method, 'url': request.url,
+                                  'error': type(e).__name__, 'message': str(e)})
+            raise
+        entry = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            # raw headers keep repeated Set-Cookie lines apart
+            'headers': list((response.raw.headers if response.raw is not None else response.headers).items()),
+        }
+        if kwargs.get('stream'):
+            # read_body records what it keeps, so the byte budget and early
+            # stops hold while recording too
+            response.cassette_entry = (cassette, key, entry, start)
+            return response
+        body = encode_body(response.content)
+        cassette.record(key, {**entry, 'elapsed': time.perf_counter() - start, 'body': body})
+        return response
+
+    def _replayed_response(self, request, entry):
+        """
+        A live-looking response built from a recorded entry
+
+        It goes through build_response like a live one, so cookies it sets
+        reach the session's jar and the body streams from raw. The recorded
+        body is already decoded, so raw gets no Content-Encoding and its
+        real length.
+        """
+        headers = HTTPHeaderDict(entry['headers'])
+        body = decode_body(entry['body'])
+        raw_headers = HTTPHeaderDict([(name, value) for name, value in entry['headers']
+                                      if name.lower() not in ('content-encoding', 'content-length')])
+        raw_headers['Content-Length'] = str(len(body))
+        raw = HTTPResponse(
+            body=io.BytesIO(body), headers=raw_headers, status=entry['status'], reason=entry['reason'],
+            preload_content=False, decode_content=False, request_method=request.method,
+            original_response=RecordedMessage(request.method, entry['headers'])
+        )
+        response = self.build_response(request, raw)
+        response.headers = CaseInsensitiveDict(headers)
+        response.recorded_truncated = entry.get('truncated', False)
+        response.recorded_stopped = entry.get('stopped_early', False)
+        # Session.send overwrites elapsed, so the recorded time travels separately
+        response.recorded_elapsed = entry['elapsed']
+        return response
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('ssl_context', self.tls_context)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+def parse_host_pool_sizes(value):
+    """Parse 'host=size,host=size' into a dict"""
+    sizes = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        host, size = item.split('=', 1)
+        try:
+            sizes[host.strip().lower()] = int(size)
+        except ValueError:
+            continue
+    return sizes
+
+
+class HttpTransport:
+    """
+    Process-wide HTTP client with per-host keep-alive connection pools
+
+    The session never stores cookies from responses, so testers sharing it
+    stay as isolated as they were with module-level requests calls. Cookies
+    passed explicitly per request are still sent.
+    """
+
+    def __init__(self, pool_size=None, host_pool_sizes=None):
+        self.pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE))
+        if host_pool_sizes is None:
+            host_pool_sizes = parse_host_pool_sizes(os.getenv('HTTP_HOST_POOL_SIZES'))
+        self.host_pool_sizes = host_pool_sizes
+        self.tls_context = create_tls_context()
+        self.socket_tls_context = create_socket_tls_context()
+        self.default_adapter = self._new_adapter(self.pool_size, router=self._adapter_for)
+        self.host_adapters = {}
+        self._lock = threading.Lock()
+
+        self.session = self.new_session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    def _new_adapter(self, maxsize, router=None):
+        return PooledAdapter(self.tls_context, router=router, pool_connections=self.pool_size, pool_maxsize=maxsize)
+
+    def _adapter_for(self, url):
+        """Per-host adapter when a pool size is configured for the host"""
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if host not in self.host_pool_sizes:
+            return None
+
+        prefix = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if prefix not in self.host_adapters:
+                self.host_adapters[prefix] = self._new_adapter(self.host_pool_sizes[host])
+            return self.host_adapters[prefix]
+
+    def new_session(self):
+        """A cookie-keeping session that still draws from the shared pools"""
+        session = requests.Session()
+        session.mount('http://', self.default_adapter)
+        session.mount('https://', self.default_adapter)
+        return session
+
+    def request(self, method, url, pacing=True, expect_throttle=False, max_bytes=None, on_chunk=None, **kwargs):
+        """
+        Send a request through the shared pools
+
+        Response times feed the per-endpoint latency histograms.
+        Requests wait on the pacing scheduler unless pacing=False. Probes
+        that measure throttling pass expect_throttle=True so their 429s
+        don't slow themselves down.
+
+        The body is read in chunks up to max_bytes (default
+        HTTP_MAX_BODY_BYTES). on_chunk(chunk) sees each chunk as it arrives;
+        returning True stops reading there. Passing stream=True skips all
+        of this and leaves the body unread.
+        """
+        host = urlsplit(url).hostname
+        if kwargs.pop('stream', False):
+            send = lambda: self.session.request(method, url, stream=True, **kwargs)
+        else:
+            send = lambda: read_body(self.session.request(method, url, stream=True, **kwargs), max_bytes, on_chunk)
+
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            # No network, so no pacing; latency is the recorded one
+            response = send()
+            LATENCY.record(method, url, response.recorded_elapsed)
+            return response
+
+        POOL_STATS.record(host, 'requests')
+
+        if not pacing:
+            start = time.perf_counter()
+            response = send()
+            LATENCY.record(method, url, time.perf_counter() - start)
+            return response
+
+        pacer = get_pacer()
+        pacer.wait(host)
+        start = time.perf_counter()
+        try:
+            response = send()
+        except requests.exceptions.RequestException:
+            pacer.observe_error(host)
+            raise
+
+        elapsed = time.perf_counter() - start
+        LATENCY.record(method, url, elapsed)
+        pacer.observe(host, response.status_code, elapsed,
+                      response.headers, expect_throttle=expect_throttle)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request('OPTIONS', url, **kwargs)
+
+    def stats(self):
+        """Pool hit/miss and TLS counters for the report"""
+        return POOL_STATS.snapshot()
+
+    def downloads(self):
+        """Body bytes read per suite for the report"""
+        return DOWNLOAD_STATS.snapshot()
+
+    def close(self):
+        self.session.close()
+        for adapter in self.host_adapters.values():
+            adapter.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the process-wide transport, creating it on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Latency Histograms for Security Tests
+Fixed-memory log-linear histograms (HDR style) fed by every request the
+harness sends, one per endpoint, for p50/p90/p99/p999 in the report
+"""
+
+import os
+import re
+import threading
+from array import array
+from urllib.parse import urlsplit
+
+# 2**SUB_BUCKET_BITS linear steps per power of two: under 1% relative error
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Values are microseconds; anything above 2**32 us (~71 minutes) is clamped
+MAX_VALUE_BITS = 32
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+PERCENTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('p999', 0.999))
+
+# Path segments that vary per request collapse into one endpoint
+NUMERIC_SEGMENT = re.compile(r'^\d+$')
+TOKEN_SEGMENT = re.compile(r'^(?=.*\d)[0-9a-fA-F-]{16,}$|^[A-Za-z0-9_-]{32,}$')
+
+DEFAULT_MAX_ENDPOINTS = 500
+OVERFLOW_ENDPOINT = '(other)'
+
+
+def bucket_index(value):
+    """Bucket for a value in microseconds"""
+    value = min(max(int(value), 0), (1 << MAX_VALUE_BITS) - 1)
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_value(index):
+    """Midpoint of a bucket, in microseconds"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    lower = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return lower + (1 << shift) // 2
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram
+
+    Memory is fixed at BUCKET_COUNT counters however many values are
+    recorded. Not thread-safe on its own; LatencyRecorder locks around it.
+    """
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        micros = int(seconds * 1_000_000)
+        self.counts[bucket_index(micros)] += 1
+        self.count += 1
+        self.total += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = micros if self.max is None else max(self.max, micros)
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, fraction):
+        """Latency in seconds at or below which fraction of the values fall"""
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * fraction // 1))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                # Never report beyond what was actually observed
+                return min(max(bucket_value(index), self.min), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self):
+        """count, min/mean/max and the report percentiles, in milliseconds"""
+        if not self.count:
+            return {'count': 0}
+        summary = {
+            'count': self.count,
+            'min_ms': round(self.min / 1000, 2),
+            'mean_ms': round(self.total / self.count / 1000, 2),
+        }
+        for name, fraction in PERCENTILES:
+            summary[f"{name}_ms"] = round(self.percentile(fraction) * 1000, 2)
+        summary['max_ms'] = round(self.max / 1000, 2)
+        return summary
+
+
+def endpoint_key(method, url):
+    """'METHOD host/path' with ids and tokens in the path replaced by placeholders"""
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        if NUMERIC_SEGMENT.match(segment):
+            segment = '{id}'
+        elif TOKEN_SEGMENT.match(segment):
+            segment = '{token}'
+        segments.append(segment)
+    return f"{method.upper()} {parts.hostname}{'/'.join(segments) or '/'}"
+
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint histograms, bounded to max_endpoints entries"""
+
+    def __init__(self, max_endpoints=None):
+        self.max_endpoints = max_endpoints or int(os.getenv('LATENCY_MAX_ENDPOINTS', DEFAULT_MAX_ENDPOINTS))
+        self.endpoints = {}
+        self.overall = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record(self, method, url, seconds):
+        key = endpoint_key(method, url)
+        with self._lock:
+            histogram = self.endpoints.get(key)
+            if histogram is None:
+                if len(self.endpoints) >= self.max_endpoints:
+                    key = OVERFLOW_ENDPOINT
+                    histogram = self.endpoints.get(key)
+                if histogram is None:
+                    histogram = self.endpoints[key] = LatencyHistogram()
+            histogram.record(seconds)
+            self.overall.record(seconds)
+
+    def reset(self):
+        """Forget everything recorded; a long-lived process starts each run fresh"""
+        with self._lock:
+            self.endpoints = {}
+            self.overall = LatencyHistogram()
+
+    def snapshot(self):
+        """Overall and per-endpoint summaries, ready for the JSON report"""
+        with self._lock:
+            return {
+                'overall': self.overall.summary(),
+                'endpoints': {key: histogram.summary() for key, histogram in sorted(self.endpoints.items())},
+            }
+
+
+LATENCY = LatencyRecorder()
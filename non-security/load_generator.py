@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Open-Loop Load Generator for Security Tests
+Sends requests on a fixed schedule (request i at start + i/rate) whatever
+the response times, and buckets outcomes per second to show exactly when
+throttling starts
+"""
+
+import os
+import threading
+import time
+
+from cassette import get_cassette
+from pacing import suite_executor
+
+# Ceiling no configuration can lift
+ABSOLUTE_MAX_RATE = 1000
+
+DEFAULT_MAX_RATE = 100        # req/s, LOADGEN_MAX_RATE
+DEFAULT_MAX_REQUESTS = 1000   # per run, LOADGEN_MAX_REQUESTS
+
+OUTCOMES = ('2xx', '3xx', '4xx', '429', '5xx', 'error', 'dropped')
+
+
+def outcome_for(status_code):
+    if status_code is None:
+        return 'error'
+    if status_code == 429:
+        return '429'
+    return f"{status_code // 100}xx" if 200 <= status_code < 600 else 'error'
+
+
+class LoadResult:
+    """Per-second outcome buckets for one run"""
+
+    def __init__(self, target_rate, capped):
+        self.target_rate = target_rate
+        self.capped = capped
+        self.buckets = {}
+        self.sent = 0
+        self.completed = 0
+        self.max_lag = 0.0
+        self.first_throttle = None   # (seconds into the run, request number)
+        self.send_span = 0.0         # first send to last send, in seconds
+        self._lock = threading.Lock()
+
+    def _bucket(self, second):
+        if second not in self.buckets:
+            self.buckets[second] = dict.fromkeys(OUTCOMES, 0)
+            self.buckets[second]['latency_total'] = 0.0
+        return self.buckets[second]
+
+    def record(self, offset, outcome, latency=None, request_number=None):
+        with self._lock:
+            bucket = self._bucket(int(offset))
+            bucket[outcome] += 1
+            if outcome != 'dropped':
+                self.completed += 1
+                bucket['latency_total'] += latency or 0.0
+            if outcome == '429' and (self.first_throttle is None or offset < self.first_throttle[0]):
+                self.first_throttle = (round(offset, 3), request_number)
+
+    def count(self, outcome):
+        return sum(bucket[outcome] for bucket in self.buckets.values())
+
+    @property
+    def achieved_rate(self):
+        # sent requests span sent - 1 intervals; response times are not part of the rate
+        return (self.sent - 1) / self.send_span if self.sent > 1 and self.send_span else 0.0
+
+    def rows(self):
+        """Buckets in time order, with mean latency instead of the running total"""
+        rows = []
+        for second in sorted(self.buckets):
+            bucket = dict(self.buckets[second])
+            answered = sum(bucket[o] for o in OUTCOMES if o != 'dropped')
+            latency_total = bucket.pop('latency_total')
+            bucket['mean_ms'] = round(latency_total / answered * 1000, 1) if answered else None
+            rows.append({'second': second, **bucket})
+        return rows
+
+    def to_dict(self):
+        return {
+            'target_rate': self.target_rate,
+            'achieved_rate': round(self.achieved_rate, 2),
+            'capped': self.capped,
+            'sent': self.sent,
+            'completed': self.completed,
+            'dropped': self.count('dropped'),
+            'max_schedule_lag_ms': round(self.max_lag * 1000, 2),
+            'first_throttle': self.first_throttle,
+            'totals': {outcome: self.count(outcome) for outcome in OUTCOMES},
+            'buckets': self.rows(),
+        }
+
+
+class OpenLoopGenerator:
+    """
+    Constant-rate request generator
+
+    send(i) performs request i and returns its status code. Sends never
+    wait for earlier responses; if max_in_flight requests are already
+    outstanding the slot is recorded as dropped instead of sliding the
+    schedule, so the offered rate stays what was asked for.
+    """
+
+    def __init__(self, send, rate, max_in_flight=32, max_rate=None, max_requests=None):
+        self.max_rate = min(ABSOLUTE_MAX_RATE, max_rate or float(os.getenv('LOADGEN_MAX_RATE', DEFAULT_MAX_RATE)))
+        self.max_requests = max_requests or int(os.getenv('LOADGEN_MAX_REQUESTS', DEFAULT_MAX_REQUESTS))
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.send = send
+        self.capped = rate > self.max_rate
+        self.rate = min(rate, self.max_rate)
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def run(self, count=None, duration=None):
+        """Send count requests (or duration seconds' worth) at the target rate"""
+        total = count if count is not None else int((duration or 0) * self.rate)
+        total = min(total, self.max_requests)
+        result = LoadResult(self.rate, self.capped or total < (count or total))
+        interval = 1.0 / self.rate
+        # Replayed responses need no schedule; buckets use scheduled offsets either way
+        cassette = get_cassette()
+        replaying = cassette is not None and cassette.replaying
+
+        with suite_executor(self.max_in_flight) as executor:
+            start = time.perf_counter()
+            for i in range(total):
+                due = i * interval
+                delay = start + due - time.perf_counter()
+                if delay > 0 and not replaying:
+                    time.sleep(delay)
+                result.max_lag = max(result.max_lag, time.perf_counter() - start - due)
+
+                with self._lock:
+                    saturated = self._in_flight >= self.max_in_flight
+                    if not saturated:
+                        self._in_flight += 1
+                if saturated:
+                    result.record(due, 'dropped')
+                    continue
+
+                result.sent += 1
+                # A replay has no clock, so its sends count as on schedule
+                result.send_span = due if replaying else time.perf_counter() - start
+                executor.submit(self._fire, i, due, result)
+
+        return result
+
+    def _fire(self, i, offset, result):
+        start = time.perf_counter()
+        try:
+            status_code = self.send(i)
+        except Exception:
+            status_code = None
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        result.record(offset, outcome_for(status_code), time.perf_counter() - start, i + 1)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Local Stand-in Target for Security Tests
+An in-memory, Laravel-like mock of the EvenLeads endpoints the testers hit
+(auth, profile, uploads, admin, config files) with fixed-window throttling,
+configurable latency and response overrides, for exercising the harness
+without touching a real deployment
+
+Usage:
+    python mock_server.py --port 8000 --limit 60 --window 60
+    python mock_server.py --port 8000 --profile vulnerable --latency 0.05
+    python tests/test_rate_limiting.py http://127.0.0.1:8000
+"""
+
+import argparse
+import itertools
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROFILES = ('secure', 'vulnerable')
+
+# Attributes registration and profile updates may set ($fillable)
+FILLABLE = {'name', 'email', 'password', 'username', 'country', 'occupation'}
+HIDDEN = {'password'}
+
+CONFIG_FILES = ('/.env', '/.env.example', '/env.example', '/.env.backup', '/.env.old',
+                '/.git/config', '/composer.json', '/package.json')
+LEAKED_ENV = "APP_NAME=EvenLeads\nAPP_ENV=production\nAPP_KEY=base64:bW9jaw==\nAPP_DEBUG=true\nDB_PASSWORD=mock\n"
+
+# Web routes outside the CSRF exemptions answer 419 without this token and session
+CSRF_TOKEN = 'mock-csrf-token'
+CSRF_SESSION = 'mock-session'
+
+# The vulnerable profile caches the plan check per user, so a user's first
+# campaigns request pays for it and later ones don't
+PLAN_CHECK_DELAY = 0.02
+
+ADMIN_API = re.compile(r'^/api/(v1/)?admin(/|$)')
+ADMIN_PAGE = re.compile(r'^/admin(/|$)')
+
+
+class FixedWindowLimiter:
+    """Laravel's throttle middleware: limit hits per key per window, reset at window end"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """(allowed, remaining, seconds until reset)"""
+        now = time.monotonic()
+        with self._lock:
+            started, hits = self.windows.get(key, (now, 0))
+            if now - started >= self.window:
+                started, hits = now, 0
+            hits += 1
+            self.windows[key] = (started, hits)
+        reset_in = max(1, math.ceil(started + self.window - now))
+        return hits <= self.limit, max(0, self.limit - hits), reset_in
+
+
+class MockState:
+    """Users and tokens, shared by all handler threads"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.users = {}
+        self.tokens = {}
+        self.plan_checked = set()
+        self.ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def assign(self, user, data):
+        """Mass assignment; the vulnerable profile ignores $fillable"""
+        for key, value in data.items():
+            if key in ('id', 'password_confirmation'):
+                continue
+            if self.profile == 'secure' and key not in FILLABLE:
+                continue
+            user[key] = value
+        user['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    def register(self, data):
+        with self._lock:
+            user = {'id': next(self.ids), 'role_id': 2, 'email_verified_at': None, 'trial_ends_at': None,
+                    'created_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+            self.assign(user, data)
+            self.users[user['id']] = user
+            return user
+
+    def login(self, email, password):
+        with self._lock:
+            for user in self.users.values():
+                if user.get('email') == email and user.get('password') == password:
+                    token = uuid.uuid4().hex
+                    self.tokens[token] = user['id']
+                    return token, user
+        return None, None
+
+    def user_for(self, authorization):
+        token = (authorization or '').replace('Bearer ', '', 1)
+        return self.users.get(self.tokens.get(token))
+
+    @staticmethod
+    def public(user):
+        return {key: value for key, value in user.items() if key not in HIDDEN}
+
+
+class MockTargetHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this Nagle adds ~40ms per response
+    disable_nagle_algorithm = True
+
+    # Paths the limiter guards, like throttle:login on the real routes
+    THROTTLED_PATHS = ('/api/auth/login', '/api/login', '/register', '/welcome/set-password')
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        headers = dict(headers or {})
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', headers.pop('Content-Type', 'application/json'))
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self, limit=None):
+        """The request body, or None when it exceeds limit bytes (drained, not kept)"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if limit is None or length <= limit:
+            return self.rfile.read(length) if length else b''
+        while length > 0:
+            chunk = self.rfile.read(min(length, 65536))
+            if not chunk:
+                break
+            length -= len(chunk)
+        return None
+
+    @staticmethod
+    def _json(raw):
+        try:
+            data = json.loads(raw or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _handle(self):
+        path = self.path.split('?', 1)[0]
+        server = self.server
+        raw = self._read_body(server.upload_limit if path == '/livewire/upload-file' else None)
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        override = server.responses.get(f"{self.command} {path}") or server.responses.get(path)
+        if override:
+            return self._send_json(override.get('status', 200), override.get('json', {}), override.get('headers'))
+
+        headers = {}
+        if path in self.THROTTLED_PATHS and server.limiter is not None:
+            allowed, remaining, reset_in = server.limiter.hit((self.client_address[0], path))
+            if server.rate_limit_headers:
+                headers = {'X-RateLimit-Limit': server.limiter.limit, 'X-RateLimit-Remaining': remaining}
+            if not allowed:
+                if server.rate_limit_headers:
+                    headers.update({'Retry-After': reset_in, 'X-RateLimit-Reset': int(time.time()) + reset_in})
+                return self._send_json(429, {'message': 'Too Many Attempts.'}, headers)
+
+        status, payload, extra = self.route(path, raw)
+        headers.update(extra or {})
+        return self._send_json(status, payload, headers)
+
+    def route(self, path, raw):
+        """(status, payload, headers) for the request"""
+        state = self.server.state
+        vulnerable = state.profile == 'vulnerable'
+        method = self.command
+        user = state.user_for(self.headers.get('Authorization'))
+        unauthenticated = (401, {'message': 'Unauthenticated.'}, None)
+        not_found = (404, {'message': 'Not Found'}, None)
+
+        if path == '/up':
+            return 200, {'status': 'up'}, None
+
+        if path == '/register' and method == 'POST':
+            data = self._json(raw)
+            if not data.get('email') or data.get('password') != data.get('password_confirmation', data.get('password')):
+                return 422, {'message': 'The given data was invalid.'}, None
+            state.register(data)
+            return 201, {'message': 'Registered'}, None
+
+        if path in ('/api/auth/login', '/api/login') and method == 'POST':
+            data = self._json(raw)
+            token, account = state.login(data.get('email'), data.get('password'))
+            if token is None:
+                return 422, {'message': 'The provided credentials are incorrect.'}, None
+            return 200, {'token': token, 'user': state.public(account)}, None
+
+        if path in ('/api/user', '/api/auth/user'):
+            return (200, state.public(user), None) if user else unauthenticated
+
+        if path == '/api/user/profile' and method in ('PUT', 'PATCH', 'POST'):
+            if not user:
+                return unauthenticated
+            state.assign(user, self._json(raw))
+            return 200, {'user': state.public(user)}, None
+
+        if path == '/login' and method == 'GET':
+            page = f'<html><head><meta name="csrf-token" content="{CSRF_TOKEN}"></head></html>'.encode()
+            return 200, page, {'Content-Type': 'text/html',
+                               'Set-Cookie': f'laravel_session={CSRF_SESSION}; path=/; httponly'}
+
+        if path == '/welcome/set-password':
+            if (self.headers.get('X-CSRF-TOKEN') != CSRF_TOKEN
+                    or f'laravel_session={CSRF_SESSION}' not in self.headers.get('Cookie', '')):
+                return 419, {'message': 'CSRF token mismatch.'}, None
+            return 422, {'message': 'This link is invalid or has expired.'}, None
+
+        if path == '/livewire/upload-file':
+            if raw is None:
+                return 413, {'message': 'Payload Too Large'}, None
+            if not vulnerable:
+                # Livewire only accepts uploads on a signed URL
+                return 401, {'message': 'Invalid signature.'}, None
+            return 200, {'paths': [f"livewire-tmp/{uuid.uuid4().hex}.upload"]}, None
+
+        if ADMIN_API.match(path) or path == '/admin/plugins/upload':
+            if vulnerable:
+                return 200, {'data': []}, None
+            if not user:
+                return unauthenticated
+            return (200, {'data': []}, None) if user.get('role_id') == 1 else \
+                (403, {'message': 'This action is unauthorized.'}, None)
+
+        if ADMIN_PAGE.match(path):
+            if vulnerable:
+                return 200, b'<html><title>Admin Dashboard</title></html>', {'Content-Type': 'text/html'}
+            return 302, b'', {'Location': '/login', 'Content-Type': 'text/html'}
+
+        if path == '/api/v1/campaigns':
+            if method == 'OPTIONS':
+                origin = self.headers.get('Origin', '*') if vulnerable else 'https://evenleads.com'
+                return 204, b'', {'Access-Control-Allow-Origin': origin,
+                                  'Access-Control-Allow-Credentials': 'true' if vulnerable else 'false'}
+            if not user:
+                return unauthenticated
+            if vulnerable and user['id'] not in state.plan_checked:
+                time.sleep(PLAN_CHECK_DELAY)
+                state.plan_checked.add(user['id'])
+            return 200, {'data': []}, None
+
+        if path in CONFIG_FILES:
+            return (200, LEAKED_ENV.encode(), {'Content-Type': 'text/plain'}) if vulnerable else not_found
+
+        if path == '/api/settings':
+            return 200, {'app_name': 'EvenLeads', 'app_debug': vulnerable}, None
+
+        if path == '/api/v1/health':
+            return 200, {'status': 'ok'}, None
+
+        if path == '/error/test' and vulnerable:
+            return 500, {'message': 'Server Error', 'exception': 'ErrorException',
+                         'file': '/var/www/html/app/Http/Controllers/TestController.php', 'trace': []}, None
+
+        return not_found
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _handle
+
+
+class MockTargetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, limit=60, window=60, latency=0.0, rate_limit_headers=True,
+                 profile='secure', responses=None, upload_limit_mb=12):
+        if profile not in PROFILES:
+            raise ValueError(f"profile must be one of {PROFILES}, not {profile!r}")
+        super().__init__(address, MockTargetHandler)
+        self.limiter = FixedWindowLimiter(limit, window) if limit else None
+        self.latency = latency
+        self.rate_limit_headers = rate_limit_headers
+        self.state = MockState(profile)
+        # {"METHOD /path" or "/path": {"status": ..., "json": ..., "headers": {...}}}
+        self.responses = responses or {}
+        self.upload_limit = int(upload_limit_mb * 1024 * 1024)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def load_responses(path):
+    """Response overrides from a JSON file"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def start_mock_server(host='127.0.0.1', port=0, **options):
+    """Start the stand-in target on a background thread; port 0 picks a free port"""
+    server = MockTargetServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in target for the security tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help="Port (0 picks a free one)")
+    parser.add_argument('--limit', type=int, default=60, help="Requests per window on throttled paths (0 = no limit)")
+    parser.add_argument('--window', type=float, default=60, help="Throttle window in seconds")
+    parser.add_argument('--latency', type=float, default=0.0, help="Added response delay in seconds")
+    parser.add_argument('--no-headers', action='store_true', help="Omit X-RateLimit-* and Retry-After headers")
+    parser.add_argument('--profile', choices=PROFILES, default='secure',
+                        help="secure: $fillable, auth and admin checks, no leaks; vulnerable: none of them")
+    parser.add_argument('--responses', help="JSON file of fixed responses keyed by 'METHOD /path' or '/path'")
+    parser.add_argument('--upload-limit-mb', type=float, default=12, help="Upload size above which 413 is returned")
+    args = parser.parse_args()
+
+    server = MockTargetServer(
+        (args.host, args.port), limit=args.limit, window=args.window, latency=args.latency,
+        rate_limit_headers=not args.no_headers, profile=args.profile,
+        responses=load_responses(args.responses) if args.responses else None,
+        upload_limit_mb=args.upload_limit_mb
+    )
+    print(f"Mock target on {server.url} ({args.profile}, throttle {args.limit}/{args.window:g}s, "
+          f"latency {args.latency}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
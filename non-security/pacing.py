@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Adaptive Pacing for Security Tests
+Spaces requests to a host only when the target asks for it (429/503,
+Retry-After, rising latency) and sends at full speed while it is healthy
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUSES = (429, 503)
+
+# Suite the current thread or asyncio task is working for
+current_suite = ContextVar('current_suite', default=None)
+
+
+def parse_retry_after(value):
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostPace:
+    """Spacing state for one host"""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.last_send = 0.0
+        self.hold_until = 0.0      # set by throttle responses
+        self.hold_suite = None     # suite whose response set hold_until
+        self.latency_fast = None   # EWMA over the last few requests
+        self.latency_slow = None   # EWMA baseline
+        self.samples = 0
+
+
+class PacingScheduler:
+    """
+    Central request pacer shared through the HTTP transport
+
+    Each host starts at zero delay. Throttle responses back off (honouring
+    Retry-After), latency climbing well above its baseline adds spacing, and
+    healthy responses decay the delay back to zero.
+    """
+
+    def __init__(self, max_delay=None, backoff_base=0.5, decay=0.5, latency_factor=2.0):
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('PACING_MAX_DELAY', '30'))
+        self.backoff_base = backoff_base
+        self.decay = decay
+        self.latency_factor = latency_factor
+        self.enabled = os.getenv('PACING', 'true').lower() != 'false'
+        self.hosts = {}
+        self.suites = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, suite_name):
+        """Attribute pacing waits in this thread or task to a suite"""
+        token = current_suite.set(suite_name)
+        try:
+            yield
+        finally:
+            current_suite.reset(token)
+
+    def suite_name(self):
+        """Suite the caller is working for"""
+        return current_suite.get() or 'unattributed'
+
+    def reset_stats(self):
+        """Forget per-suite waits; host delays are the target's state and carry over"""
+        with self._lock:
+            self.suites = {}
+
+    def _suite_stats(self, suite=None):
+        suite = suite or self.suite_name()
+        if suite not in self.suites:
+            self.suites[suite] = {'throttled': 0.0, 'waits': 0, 'throttle_signals': 0}
+        return self.suites[suite]
+
+    def reserve(self, host):
+        """Claim the next send slot for host and return how long to wait for it"""
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            pace = self.hosts.setdefault(host, HostPace())
+            now = time.monotonic()
+            send_at = max(now, pace.last_send + pace.delay, pace.hold_until)
+            pace.last_send = send_at
+            wait = send_at - now
+
+            if wait > 0:
+                # A Retry-After hold is charged to the suite that drew it, not whoever waits it out
+                held = max(0.0, pace.hold_until - now)
+                stats = self._suite_stats()
+                stats['throttled'] += wait - held
+                stats['waits'] += 1
+                if held > 0:
+                    self._suite_stats(pace.hold_suite)['throttled'] += held
+
+        return wait
+
+    def wait(self, host):
+        """Block until host may be sent another request"""
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, host, status_code, elapsed, headers=None, expect_throttle=False):
+        """
+        Feed a response back into the host's pace
+
+        Probes that measure throttling pass expect_throttle=True so their
+        429s don't slow them down; 503s and latency still count.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            pace = self.hosts.setdefault(host, HostPace())
+            now = time.monotonic()
+
+            throttled = status_code in THROTTLE_STATUSES and not (expect_throttle and status_code == 429)
+            if throttled:
+                self._suite_stats()['throttle_signals'] += 1
+                retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+                pace.delay = min(self.max_delay, max(self.backoff_base, pace.delay * 2))
+                hold = retry_after if retry_after is not None else pace.delay
+                hold_until = now + min(hold, self.max_delay)
+                if hold_until > pace.hold_until:
+                    pace.hold_until = hold_until
+                    pace.hold_suite = self.suite_name()
+                return
+
+            if elapsed is not None:
+                self._observe_latency(pace, elapsed)
+
+    def observe_error(self, host):
+        """Connection errors and timeouts back off like a soft throttle"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            pace = self.hosts.setdefault(host, HostPace())
+            pace.delay = min(self.max_delay, max(self.backoff_base / 2, pace.delay * 1.5))
+
+    def _observe_latency(self, pace, elapsed):
+        pace.samples += 1
+        if pace.latency_slow is None:
+            pace.latency_slow = pace.latency_fast = elapsed
+            return
+
+        pace.latency_fast = 0.5 * pace.latency_fast + 0.5 * elapsed
+        pace.latency_slow = 0.95 * pace.latency_slow + 0.05 * elapsed
+
+        if pace.samples >= 5 and pace.latency_fast > self.latency_factor * pace.latency_slow:
+            # Target is slowing down: space requests by roughly one baseline latency
+            pace.delay = min(self.max_delay, max(pace.delay, pace.latency_slow))
+        else:
+            pace.delay *= self.decay
+            if pace.delay < 0.01:
+                pace.delay = 0.0
+
+    def suite_report(self, suite_name, duration):
+        """Throttled versus working time for a finished suite"""
+        with self._lock:
+            stats = dict(self.suites.get(suite_name, {'throttled': 0.0, 'waits': 0, 'throttle_signals': 0}))
+        stats['throttled'] = round(stats['throttled'], 3)
+        stats['working'] = round(max(0.0, duration - stats['throttled']), 3)
+        return stats
+
+
+def suite_executor(max_workers):
+    """Thread pool whose workers stay attributed to the caller's suite"""
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=current_suite.set,
+                              initargs=(current_suite.get(),))
+
+
+_pacer = None
+_pacer_lock = threading.Lock()
+
+
+def get_pacer():
+    """Return the process-wide pacing scheduler"""
+    global _pacer
+    with _pacer_lock:
+        if _pacer is None:
+            _pacer = PacingScheduler()
+        return _pacer
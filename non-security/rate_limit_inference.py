@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Rate Limit Inference for Security Tests
+Estimates an endpoint's real throttle (N requests per W seconds): an
+exponential burst ramp finds N, then the window is read from Retry-After or
+bisected by probing while throttled. Also reads the intended limits from the
+Laravel source for comparison
+"""
+
+import glob
+import os
+import re
+import time
+from datetime import datetime
+
+from http_transport import get_transport
+from pacing import suite_executor
+from route_index import REPO_ROOT, get_route_index
+
+NAMED_LIMITER = re.compile(
+    r"RateLimiter::for\(\s*['\"](\w+)['\"].*?Limit::per(Second|Minute|Hour|Day)\(\s*(\d+)",
+    re.S
+)
+PERIOD_SECONDS = {'Second': 1, 'Minute': 60, 'Hour': 3600, 'Day': 86400}
+THROTTLE_MIDDLEWARE = re.compile(r'^throttle:(\w+)(?:,(\d+))?')
+
+
+def named_limiters(root=None):
+    """{name: (limit, window seconds)} from RateLimiter::for() in app/Providers"""
+    root = root or REPO_ROOT
+    limiters = {}
+    for path in sorted(glob.glob(os.path.join(root, 'app', 'Providers', '*.php'))):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for name, period, limit in NAMED_LIMITER.findall(f.read()):
+                limiters[name] = (int(limit), PERIOD_SECONDS[period])
+    return limiters
+
+
+def _throttles_api_group(root):
+    path = os.path.join(root, 'bootstrap', 'app.php')
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return '->throttleApi(' in f.read()
+
+
+def parse_expected(value):
+    """Parse '/path=N/W,/path=N/W' into {path: (N, W)}"""
+    expected = {}
+    for item in (value or '').split(','):
+        if '=' not in item or '/' not in item.split('=', 1)[1]:
+            continue
+        path, limit = item.split('=', 1)
+        count, window = limit.split('/', 1)
+        try:
+            expected[path.strip()] = (int(count), int(window))
+        except ValueError:
+            continue
+    return expected
+
+
+def expected_limit(path, method='POST', root=None):
+    """
+    Intended (limit, window seconds, source) for a route, or None
+
+    RATE_LIMIT_EXPECTED overrides the source; otherwise throttle:N,M and
+    named throttle middleware on the indexed route are resolved, with
+    throttleApi() applying the 'api' limiter to the api group.
+    """
+    overrides = parse_expected(os.getenv('RATE_LIMIT_EXPECTED'))
+    if path in overrides:
+        return (*overrides[path], 'RATE_LIMIT_EXPECTED')
+
+    root = root or REPO_ROOT
+    routes = [r for r in get_route_index().query(method=method) if r['path'] == path]
+    if not routes:
+        return None
+
+    middleware = list(routes[0]['middleware'])
+    if 'api' in middleware and _throttles_api_group(root):
+        middleware.append('throttle:api')
+
+    limiters = None
+    for item in middleware:
+        match = THROTTLE_MIDDLEWARE.match(item)
+        if not match:
+            continue
+        first, decay_minutes = match.groups()
+        if first.isdigit():
+            return (int(first), int(decay_minutes or 1) * 60, item)
+        limiters = limiters if limiters is not None else named_limiters(root)
+        if first in limiters:
+            return (*limiters[first], f"RateLimiter::for('{first}')")
+    return None
+
+
+def _timestamp(epoch):
+    return datetime.fromtimestamp(epoch).isoformat(timespec='milliseconds') if epoch else None
+
+
+class RateLimitInference:
+    """
+    Infers N requests per W seconds for one endpoint at a time
+
+    Ramp: bursts of 1, 2, 4, 8... concurrent requests until the first 429;
+    the allowed responses before it give N. A ramp throttled from its first
+    request started inside a window something else used up, so it waits for
+    the reset (Retry-After, else growing pauses) and starts over; if no
+    reset comes within max_wait the result is inconclusive. Laravel's throttle is a fixed
+    window that starts at the first hit and does not count rejected
+    requests, so probing while throttled is free. Window: Retry-After when
+    the window provably started with the ramp, otherwise exponential probes
+    find a reset and bisection narrows it, re-exhausting the window after
+    each probe that gets through.
+    """
+
+    def __init__(self, base_url, max_requests=None, max_wait=None, resolution=None, timeout=5):
+        self.base_url = base_url.rstrip('/')
+        self.max_requests = max_requests or int(os.getenv('RATE_INFER_MAX_REQUESTS', 256))
+        self.max_wait = max_wait or float(os.getenv('RATE_INFER_MAX_WAIT', 180))
+        self.resolution = resolution or float(os.getenv('RATE_INFER_RESOLUTION', 2))
+        self.timeout = timeout
+        self.http = get_transport()
+
+    def _send(self, path, payload):
+        """(status code or None, headers, send time)"""
+        sent_at = time.time()
+        try:
+            response = self.http.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+                timeout=self.timeout,
+                pacing=False
+            )
+            return response.status_code, response.headers, sent_at
+        except Exception:
+            return None, {}, sent_at
+
+    def _burst(self, path, payload_for, start, count):
+        with suite_executor(min(count, 32)) as executor:
+            return list(executor.map(lambda i: self._send(path, payload_for(i)), range(start, start + count)))
+
+    @staticmethod
+    def _header_int(headers, name):
+        try:
+            return int(headers.get(name))
+        except (TypeError, ValueError):
+            return None
+
+    def _ramp(self, path, payload_for, first):
+        """(allowed, responses, throttled responses) for one ramp"""
+        used = allowed = 0
+        batch = 1
+        responses = []
+        throttled = []
+        while used < self.max_requests and not throttled:
+            size = min(batch, self.max_requests - used)
+            results = self._burst(path, payload_for, first + used, size)
+            used += size
+            responses.extend(results)
+            throttled = [r for r in results if r[0] == 429]
+            allowed += sum(1 for r in results if r[0] is not None and r[0] != 429)
+            batch *= 2
+        return allowed, responses, throttled
+
+    def infer(self, path, payload_for):
+        """Infer the limit on POST path; payload_for(i) builds request i's body"""
+        deadline = time.time() + self.max_wait
+        requests = 0
+        waited = 0.0
+        pause = 1.0
+        while True:
+            started = time.time()
+            allowed, responses, throttled = self._ramp(path, payload_for, requests)
+            requests += len(responses)
+            if allowed or not throttled:
+                break
+            # Throttled from the first request: wait for the window to reset and start over
+            retry_after = self._header_int(throttled[0][1], 'Retry-After')
+            wait = retry_after + 0.5 if retry_after is not None else pause
+            pause *= 2
+            if time.time() + wait > deadline:
+                break
+            time.sleep(wait)
+            waited += wait
+
+        errors = sum(1 for r in responses if r[0] is None)
+        result = {
+            'path': path,
+            'limited': bool(throttled),
+            'limit': allowed if throttled else None,
+            'inconclusive': bool(throttled) and not allowed,
+            'window_seconds': None,
+            'window_source': None,
+            'requests': requests,
+            'waited_for_reset': round(waited, 1),
+            'errors': errors,
+            'started_at': _timestamp(started),
+            'first_throttled_at': None,
+            'reset_at': None,
+            'header_limit': None,
+        }
+        if result['inconclusive']:
+            # Never got a request through, so there is no limit to report
+            result['limit'] = None
+            return result
+        if not throttled:
+            return result
+
+        header_limits = [self._header_int(r[1], 'X-RateLimit-Limit') for r in responses]
+        result['header_limit'] = next((v for v in header_limits if v is not None), None)
+        first_429 = min(r[2] for r in throttled)
+        result['first_throttled_at'] = _timestamp(first_429)
+
+        # Retry-After dates the reset; the window length also needs the window's start
+        retry_after = self._header_int(throttled[0][1], 'Retry-After')
+        first_remaining = self._header_int(responses[0][1], 'X-RateLimit-Remaining')
+        fresh_window = result['header_limit'] is not None and first_remaining == result['header_limit'] - 1
+        if retry_after is not None:
+            reset = max(r[2] for r in throttled) + retry_after
+            result['reset_at'] = _timestamp(reset)
+            if fresh_window:
+                result['window_seconds'] = round(reset - started)
+                result['window_source'] = 'retry-after'
+                return result
+
+        window, requests, reset = self._probe_window(path, payload_for, allowed)
+        result['requests'] += requests
+        result['window_seconds'] = window
+        result['window_source'] = 'probing' if window is not None else None
+        result['reset_at'] = result['reset_at'] or _timestamp(reset)
+        return result
+
+    def _probe_window(self, path, payload_for, limit):
+        """
+        Window length by probing while throttled: (seconds, requests used, first reset time)
+
+        Each probe that gets through opens a new window at a known time; the
+        window is then exhausted again and probed at the bisection midpoint.
+        """
+        deadline = time.time() + self.max_wait
+        requests = 0
+        first_reset = None
+        window_start = None       # known once a probe opens a window
+        low, high = 0.0, None
+        wait = 1.0
+
+        while time.time() < deadline:
+            if window_start is None:
+                target = time.time() + wait
+                wait *= 2
+            elif high is None:
+                target = window_start + max(low * 2, 1.0)
+            else:
+                if high - low <= self.resolution:
+                    break
+                target = window_start + (low + high) / 2
+
+            if target > deadline:
+                break
+            time.sleep(max(0.0, target - time.time()))
+            status, _, sent_at = self._send(path, payload_for(requests))
+            requests += 1
+
+            if status == 429:
+                if window_start is not None:
+                    low = sent_at - window_start
+                continue
+
+            # Got through: the window reset before this probe, which opens the next one
+            if window_start is not None:
+                high = sent_at - window_start if high is None else min(high, sent_at - window_start)
+            first_reset = first_reset or sent_at
+            window_start = sent_at
+
+            # Exhaust the new window again so the next probe measures its end
+            if limit > 1:
+                self._burst(path, payload_for, requests, limit - 1)
+                requests += limit - 1
+
+        window = round((low + high) / 2) if high is not None else None
+        return window, requests, first_reset
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Response Scanner for Security Tests
+Finds every keyword and secret format in a response body in one pass over
+its bytes. The keywords of all testers and the literal anchors of the
+secret formats (sk_live_, base64:, mysql://, ...) are compiled into one
+Aho-Corasick automaton with a full transition table, so each byte costs one
+table lookup however many patterns there are. A secret's bounded regex
+(Stripe keys, APP_KEY, database DSNs, ...) only runs where one of its
+anchors was found. Bodies can be fed chunk by chunk as they stream in, and
+every match comes back with its byte offsets
+
+Usage:
+    python response_scanner.py FILE [FILE ...]
+"""
+
+import re
+import sys
+import threading
+from collections import deque, namedtuple
+
+# group: (case sensitive, keywords); a keyword can appear in several groups
+KEYWORDS = {
+    # Words that suggest configuration or credentials in a public response
+    'sensitive': (False, ('key', 'secret', 'password', 'token', 'api', 'stripe', 'database')),
+    # Traces left by Laravel's debug error pages
+    'debug': (True, ('Whoops\\Handler', 'Stack trace', 'vendor/laravel', 'APP_DEBUG', 'DebugBar', 'Ignition')),
+    # Upper-case .env variable fragments
+    'credentials': (True, ('PASSWORD', 'SECRET')),
+}
+
+# A secret format: the regex runs only where one of its case-sensitive
+# anchors occurs, and a match starts at most lead bytes before the anchor
+Secret = namedtuple('Secret', 'anchors pattern lead', defaults=(0,))
+
+# Secret formats, reported in the 'secrets' group. Each must match at most
+# REGEX_WINDOW bytes so chunked scanning can tell when a match is final.
+SECRETS = {
+    'Stripe secret key': Secret(('sk_live_', 'sk_test_', 'rk_live_', 'rk_test_'),
+                                rb'\b[rs]k_(?:live|test)_[0-9A-Za-z]{16,247}'),
+    'Stripe webhook secret': Secret(('whsec_',), rb'\bwhsec_[0-9A-Za-z]{16,250}'),
+    'Laravel APP_KEY': Secret(('base64:',), rb'base64:[A-Za-z0-9+/]{43}='),
+    'Database DSN': Secret(('mysql://', 'mariadb://', 'pgsql://', 'postgres://', 'postgresql://',
+                            'sqlsrv://', 'mongodb://', 'mongodb+srv://', 'redis://'),
+                           rb'\b(?:mysql|mariadb|pgsql|postgres(?:ql)?|sqlsrv|mongodb(?:\+srv)?|redis)://'
+                           rb'[^\s:/@"\'<>]{1,64}:[^\s@/"\'<>]{1,128}@[^\s/"\'<>]{1,128}'),
+    'Database password': Secret(('DB_PASSWORD',), rb'(?m)^[ \t]{0,16}DB_PASSWORD[ \t]*=[ \t]*[^\s#]{1,128}',
+                                lead=16),
+    'AWS access key': Secret(('AKIA',), rb'\bAKIA[0-9A-Z]{16}\b'),
+    'Private key': Secret(('-----BEGIN ',), rb'-----BEGIN (?:RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----'),
+}
+SECRETS_GROUP = 'secrets'
+REGEX_WINDOW = 512
+
+UPPERCASE = range(ord('A'), ord('Z') + 1)
+
+Match = namedtuple('Match', 'group name start end')
+
+
+class ScanResult:
+    """Matches of one body, ordered by offset"""
+
+    def __init__(self, matches, scanner):
+        self.matches = sorted(matches, key=lambda match: (match.start, match.end))
+        self._order = scanner.order
+
+    def __iter__(self):
+        return iter(self.matches)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __bool__(self):
+        return bool(self.matches)
+
+    def in_group(self, group):
+        return [match for match in self.matches if match.group == group]
+
+    def names(self, group):
+        """Distinct names matched in a group, in the order the patterns were declared"""
+        found = {match.name for match in self.matches if match.group == group}
+        return sorted(found, key=lambda name: self._order[(group, name)])
+
+    def first(self, group):
+        return next((match for match in self.matches if match.group == group), None)
+
+
+class ResponseScanner:
+    """
+    A compiled pattern set
+
+    keywords is {group: (case sensitive, keywords)} and secrets
+    {name: Secret}. Matching folds ASCII case inside the automaton
+    (upper-case bytes share the lower-case transitions); case-sensitive
+    keywords and anchors are then checked against the original bytes.
+    """
+
+    def __init__(self, keywords=None, secrets=None):
+        keywords = KEYWORDS if keywords is None else keywords
+        secrets = SECRETS if secrets is None else secrets
+
+        # (group, name, literal bytes, case sensitive); anchors have group
+        # None and the secret's index as name
+        self.keywords = []
+        self.order = {}
+        for group, (case_sensitive, words) in keywords.items():
+            for word in words:
+                literal = word.encode() if isinstance(word, str) else word
+                self.order[(group, word)] = len(self.order)
+                self.keywords.append((group, word, literal, case_sensitive))
+        self.secrets = []           # (name, compiled regex, lead)
+        for number, (name, secret) in enumerate(secrets.items()):
+            self.order[(SECRETS_GROUP, name)] = len(self.order)
+            self.secrets.append((name, re.compile(secret.pattern), secret.lead))
+            for anchor in secret.anchors:
+                self.keywords.append((None, number, anchor.encode(), True))
+
+        self.longest = max((len(literal) for _, _, literal, _ in self.keywords), default=1)
+        self._build()
+
+    def _build(self):
+        """Trie of the case-folded keywords, then failure links folded into a full transition table"""
+        goto = [{}]
+        outputs = [[]]
+        for number, (_, _, literal, _) in enumerate(self.keywords):
+            state = 0
+            for byte in literal.lower():
+                if byte not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].append(number)
+
+        delta = [None] * len(goto)
+        fail = [0] * len(goto)
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            row = list(delta[fail[state]]) if state else [0] * 256
+            for byte, child in goto[state].items():
+                row[byte] = child
+                fail[child] = delta[fail[state]][byte] if state else 0
+                queue.append(child)
+            for byte in UPPERCASE:
+                row[byte] = row[byte + 32]
+            delta[state] = row
+            if state:
+                outputs[state] = outputs[state] + outputs[fail[state]]
+
+        self._delta = delta
+        self._outputs = [tuple(numbers) for numbers in outputs]
+
+    @property
+    def states(self):
+        return len(self._delta)
+
+    def stream(self):
+        """A scan fed chunk by chunk"""
+        return ScanStream(self)
+
+    def stop_on(self, *groups):
+        """An on_chunk hook for the HTTP transport that stops reading at the first match in groups"""
+        return StopOnMatch(self, groups)
+
+    def scan(self, body):
+        """Every match in a whole body (bytes or str)"""
+        stream = ScanStream(self)
+        stream.feed(body)
+        stream.close()
+        return stream.result()
+
+
+class ScanStream:
+    """
+    One body scanned as it arrives
+
+    feed() returns the matches completed by that chunk. Keyword matches are
+    reported as soon as their last byte is seen. An anchor queues its
+    secret's regex, which runs once REGEX_WINDOW bytes past the anchor have
+    arrived (or at close()), so a longer match can no longer replace it.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.matches = []
+        self.offset = 0                 # bytes fed so far
+        self.closed = False
+        self._state = 0
+        self._buffer = b''              # tail kept for secrets and case checks
+        self._buffer_start = 0          # offset of _buffer[0]
+        self._pending = []              # (anchor offset, secret) waiting for their window
+        self._secret_ends = [0] * len(scanner.secrets)
+
+    def feed(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8', errors='replace')
+        if not chunk:
+            return []
+        scanner = self.scanner
+        buffer = self._buffer + chunk
+        start_of_buffer = self._buffer_start
+        found = []
+
+        delta, outputs, keywords = scanner._delta, scanner._outputs, scanner.keywords
+        state = self._state
+        base = self.offset + 1
+        for index, byte in enumerate(chunk):
+            state = delta[state][byte]
+            if outputs[state]:
+                end = base + index
+                for number in outputs[state]:
+                    group, name, literal, case_sensitive = keywords[number]
+                    start = end - len(literal)
+                    if case_sensitive and buffer[start - start_of_buffer:end - start_of_buffer] != literal:
+                        continue
+                    if group is None:
+                        self._pending.append((start, name))
+                    else:
+                        found.append(Match(group, name, start, end))
+        self._state = state
+        self.offset += len(chunk)
+
+        found.extend(self._scan_secrets(buffer, final=False))
+        self._trim(buffer)
+        found.sort(key=lambda match: (match.start, match.end))
+        self.matches.extend(found)
+        return found
+
+    def _scan_secrets(self, buffer, final):
+        """Run the regexes of anchors whose window is complete (every anchor at close)"""
+        found = []
+        waiting = []
+        start_of_buffer = self._buffer_start
+        # One byte past the window, so a \b or lookahead at its end sees real context
+        for anchor, number in sorted(self._pending):
+            if not final and anchor + REGEX_WINDOW + 1 > self.offset:
+                waiting.append((anchor, number))
+                continue
+            if anchor < self._secret_ends[number]:
+                continue   # inside a match already reported
+            name, pattern, lead = self.scanner.secrets[number]
+            position = max(anchor - lead, self._secret_ends[number], start_of_buffer)
+            match = pattern.search(buffer, position - start_of_buffer,
+                                   anchor + REGEX_WINDOW + 1 - start_of_buffer)
+            if match is None or start_of_buffer + match.start() > anchor:
+                continue   # a later anchor covers matches that start after this one
+            found.append(Match(SECRETS_GROUP, name, start_of_buffer + match.start(),
+                               start_of_buffer + match.end()))
+            self._secret_ends[number] = start_of_buffer + match.end()
+        self._pending = waiting
+        return found
+
+    def _trim(self, buffer):
+        # Keep what queued anchors and case checks may still need, plus one
+        # byte of context for \b and ^
+        keep_from = self.offset - self.scanner.longest
+        for anchor, number in self._pending:
+            keep_from = min(keep_from, anchor - self.scanner.secrets[number][2])
+        keep_from = max(keep_from - 1, self._buffer_start)
+        self._buffer = buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+
+    def close(self):
+        """Report the secret matches still open; returns them"""
+        if self.closed:
+            return []
+        self.closed = True
+        found = self._scan_secrets(self._buffer, final=True)
+        self._buffer = b''
+        self.matches.extend(found)
+        return found
+
+    def result(self):
+        return ScanResult(self.matches, self.scanner)
+
+
+class StopOnMatch:
+    """
+    Scans a body while the transport streams it in
+
+    Called with each chunk; returns True, telling the transport to stop
+    reading, once a match in one of its groups has been seen. result() has
+    every match in what was read.
+    """
+
+    def __init__(self, scanner, groups):
+        self.stream = scanner.stream()
+        self.groups = set(groups)
+
+    def __call__(self, chunk):
+        return any(match.group in self.groups for match in self.stream.feed(chunk))
+
+    def result(self):
+        self.stream.close()
+        return self.stream.result()
+
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+
+def get_scanner():
+    """The process-wide scanner for KEYWORDS and SECRETS, compiled on first use"""
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = ResponseScanner()
+        return _scanner
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python response_scanner.py FILE [FILE ...]")
+        sys.exit(2)
+    scanner = get_scanner()
+    for path in sys.argv[1:]:
+        stream = scanner.stream()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                stream.feed(chunk)
+        stream.close()
+        result = stream.result()
+        print(f"{path}: {len(result)} matches")
+        for match in result:
+            print(f"  {match.start:>10}-{match.end:<10} {match.group:<12} {match.name}")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Run Diff for Security Tests
+Compares runs from the results store: verdict flips per test and latency
+percentile shifts per endpoint. Tests are matched across runs by their
+stable ID, suite plus test name, and everything is read through the
+store's indexes, so diffing against the last 100 runs takes milliseconds
+
+Usage:
+    python results_diff.py                          # latest run against the one before it
+    python results_diff.py 42 37                    # run 42 against run 37
+    python results_diff.py security_test_results_20250101_120000.json 37
+    python results_diff.py --against 100            # latest run against each of the last 100
+"""
+
+import argparse
+import os
+import sys
+
+from colorama import Fore, Style, init
+from tabulate import tabulate
+
+from results_store import ResultsStore, json_source
+
+init(autoreset=True)
+
+PERCENTILES = ('p50', 'p90', 'p99')
+
+# A percentile moved when it changed by both this fraction and this many ms
+SHIFT_RATIO = 0.25
+SHIFT_MIN_MS = 10.0
+# Endpoints with fewer requests than this in either run are too noisy to compare
+MIN_SAMPLES = 3
+
+
+def test_id(suite, test):
+    """Stable ID of a test across runs"""
+    return f"{suite} / {test}"
+
+
+class RunDiff:
+    """What changed from a base run to a head run"""
+
+    def __init__(self, base, head):
+        self.base = base
+        self.head = head
+        self.flips = []          # {'id', 'suite', 'test', 'before', 'after'}
+        self.added = []          # tests only in head: {'id', 'suite', 'test', 'after'}
+        self.removed = []        # tests only in base: {'id', 'suite', 'test', 'before'}
+        self.latency = []        # {'endpoint', 'percentile', 'before', 'after', 'change'}
+
+    @property
+    def new_vulnerabilities(self):
+        return [flip for flip in self.flips if flip['after'] == 'VULNERABLE']
+
+    @property
+    def fixed(self):
+        return [flip for flip in self.flips if flip['after'] == 'SECURE']
+
+    @property
+    def slower(self):
+        return [shift for shift in self.latency if shift['change'] > 0]
+
+    @property
+    def faster(self):
+        return [shift for shift in self.latency if shift['change'] < 0]
+
+    @property
+    def regressed(self):
+        """A test turned vulnerable or an endpoint got slower"""
+        return bool(self.new_vulnerabilities or self.slower)
+
+    def summary(self):
+        return {
+            'base': self.base['id'],
+            'head': self.head['id'],
+            'new_vulnerabilities': len(self.new_vulnerabilities),
+            'fixed': len(self.fixed),
+            'added': len(self.added),
+            'removed': len(self.removed),
+            'slower': len(self.slower),
+            'faster': len(self.faster),
+        }
+
+
+def compare_verdicts(diff, base_verdicts, head_verdicts):
+    for key in sorted(head_verdicts.keys() | base_verdicts.keys()):
+        suite, test = key
+        before, after = base_verdicts.get(key), head_verdicts.get(key)
+        entry = {'id': test_id(suite, test), 'suite': suite, 'test': test}
+        if before is None:
+            diff.added.append({**entry, 'after': after})
+        elif after is None:
+            diff.removed.append({**entry, 'before': before})
+        elif before != after:
+            diff.flips.append({**entry, 'before': before, 'after': after})
+
+
+def compare_latency(diff, base_latency, head_latency, ratio=SHIFT_RATIO, min_ms=SHIFT_MIN_MS,
+                    min_samples=MIN_SAMPLES):
+    for endpoint in sorted(head_latency.keys() & base_latency.keys()):
+        before, after = base_latency[endpoint], head_latency[endpoint]
+        if before['count'] < min_samples or after['count'] < min_samples:
+            continue
+        for percentile in PERCENTILES:
+            old, new = before[f"{percentile}_ms"], after[f"{percentile}_ms"]
+            if old is None or new is None:
+                continue
+            change = new - old
+            if abs(change) >= min_ms and abs(change) >= ratio * old:
+                diff.latency.append({
+                    'endpoint': endpoint,
+                    'percentile': percentile,
+                    'before': old,
+                    'after': new,
+                    'change': change,
+                })
+
+
+def diff_runs(store, head_id, base_id, **thresholds):
+    """Diff two stored runs"""
+    head, base = store.run(head_id), store.run(base_id)
+    if head is None or base is None:
+        raise LookupError(f"run {head_id if head is None else base_id} is not in the results store")
+    verdicts = store.verdicts([base_id, head_id])
+    latency = store.latency([base_id, head_id])
+
+    diff = RunDiff(base, head)
+    compare_verdicts(diff, verdicts[base_id], verdicts[head_id])
+    compare_latency(diff, latency[base_id], latency[head_id], **thresholds)
+    return diff
+
+
+def diff_against(store, head_id, count=100, **thresholds):
+    """
+    Diff head against each of the count runs of its target before it
+
+    Two queries load every run's verdicts and latency, whatever count is.
+    Returns the diffs newest base first.
+    """
+    head = store.run(head_id)
+    if head is None:
+        raise LookupError(f"run {head_id} is not in the results store")
+    bases = store.runs_before(head_id, count)
+    run_ids = [head_id] + [base['id'] for base in bases]
+    verdicts = store.verdicts(run_ids)
+    latency = store.latency(run_ids)
+
+    diffs = []
+    for base in bases:
+        diff = RunDiff(base, head)
+        compare_verdicts(diff, verdicts[base['id']], verdicts[head_id])
+        compare_latency(diff, latency[base['id']], latency[head_id], **thresholds)
+        diffs.append(diff)
+    return diffs
+
+
+def resolve_run(store, reference):
+    """A run id from an id or a JSON result file, importing the file if it is not stored yet"""
+    if reference.isdigit():
+        return int(reference)
+    if not os.path.exists(reference):
+        raise LookupError(f"{reference} is neither a run id nor a file")
+    run_id = store.run_for_source(json_source(reference)) or store.import_json(reference)
+    if run_id is None:
+        raise LookupError(f"{reference} is not a result file")
+    return run_id
+
+
+def latest_run_id(store):
+    runs = store.runs(limit=1)
+    return runs[0]['id'] if runs else None
+
+
+def describe(run):
+    return f"#{run['id']} {run['started_at'][:19]} ({run['target']})"
+
+
+def print_diff(diff):
+    """Print one diff in the style of the final report"""
+    print(f"\n{Fore.CYAN}Base: {describe(diff.base)}")
+    print(f"Head: {describe(diff.head)}{Style.RESET_ALL}\n")
+
+    if diff.flips:
+        rows = []
+        for flip in diff.flips:
+            color = Fore.RED if flip['after'] == 'VULNERABLE' else Fore.GREEN
+            rows.append([flip['id'], flip['before'], f"{color}{flip['after']}{Style.RESET_ALL}"])
+        print(f"{Fore.CYAN}Verdict Flips:{Style.RESET_ALL}\n")
+        print(tabulate(rows, headers=['Test', 'Before', 'After'], tablefmt='grid'))
+        print()
+    else:
+        print(f"{Fore.GREEN}No verdict flips{Style.RESET_ALL}\n")
+
+    for label, entries, key in (('New tests', diff.added, 'after'), ('Tests no longer run', diff.removed, 'before')):
+        if entries:
+            print(f"{Fore.CYAN}{label}:{Style.RESET_ALL}")
+            for entry in entries:
+                print(f"  {entry['id']} ({entry[key]})")
+            print()
+
+    if diff.latency:
+        rows = []
+        for shift in sorted(diff.latency, key=lambda s: -abs(s['change'])):
+            color = Fore.RED if shift['change'] > 0 else Fore.GREEN
+            change = f"{shift['change']:+.1f}"
+            if shift['before']:
+                change += f" ({shift['change'] / shift['before'] * 100:+.0f}%)"
+            endpoint = 'all requests' if shift['endpoint'] == '*' else shift['endpoint']
+            rows.append([endpoint, shift['percentile'], shift['before'], shift['after'],
+                         f"{color}{change}{Style.RESET_ALL}"])
+        print(f"{Fore.CYAN}Latency Shifts (ms):{Style.RESET_ALL}\n")
+        print(tabulate(rows, headers=['Endpoint', 'Pct', 'Before', 'After', 'Change'], tablefmt='grid'))
+        print()
+    else:
+        print(f"{Fore.GREEN}No latency shifts{Style.RESET_ALL}\n")
+
+
+def print_history(diffs):
+    """One line per base run for diff_against()"""
+    rows = []
+    for diff in diffs:
+        summary = diff.summary()
+        rows.append([
+            f"#{diff.base['id']}", diff.base['started_at'][:19],
+            f"{Fore.RED}{summary['new_vulnerabilities']}{Style.RESET_ALL}" if summary['new_vulnerabilities'] else 0,
+            summary['fixed'], summary['added'], summary['removed'],
+            f"{Fore.RED}{summary['slower']}{Style.RESET_ALL}" if summary['slower'] else 0,
+            summary['faster'],
+        ])
+    print(tabulate(rows, headers=['Base', 'Started', 'New vuln.', 'Fixed', 'Added', 'Removed', 'Slower', 'Faster'],
+                   tablefmt='grid'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff security test runs from the results store")
+    parser.add_argument('head', nargs='?', help="Run id or JSON result file (default: latest run)")
+    parser.add_argument('base', nargs='?', help="Run id or JSON result file (default: the run before head)")
+    parser.add_argument('--against', type=int, metavar='N', help="Diff head against each of the N runs before it")
+    parser.add_argument('--db', help="Results database (default: RESULTS_DB or security_results.db)")
+    parser.add_argument('--shift-pct', type=float, default=SHIFT_RATIO * 100,
+                        help=f"Percent change that counts as a latency shift (default: {SHIFT_RATIO * 100:.0f})")
+    parser.add_argument('--shift-ms', type=float, default=SHIFT_MIN_MS,
+                        help=f"Minimum change in ms that counts as a latency shift (default: {SHIFT_MIN_MS:.0f})")
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES,
+                        help=f"Requests an endpoint needs in both runs to be compared (default: {MIN_SAMPLES})")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="Exit 1 if a test turned vulnerable or an endpoint got slower")
+    args = parser.parse_args()
+    thresholds = {'ratio': args.shift_pct / 100, 'min_ms': args.shift_ms, 'min_samples': args.min_samples}
+
+    store = ResultsStore(args.db)
+    try:
+        store.ensure_imported()
+        head_id = resolve_run(store, args.head) if args.head else latest_run_id(store)
+        if head_id is None:
+            print(f"{Fore.YELLOW}The results store is empty{Style.RESET_ALL}")
+            return 2
+
+        if args.against:
+            diffs = diff_against(store, head_id, args.against, **thresholds)
+            print(f"\n{Fore.CYAN}Head: {describe(store.run(head_id))}{Style.RESET_ALL}\n")
+            print_history(diffs)
+            return 1 if args.fail_on_regression and diffs and diffs[0].regressed else 0
+
+        if args.base:
+            base_id = resolve_run(store, args.base)
+        else:
+            previous = store.runs_before(head_id)
+            if not previous:
+                print(f"{Fore.YELLOW}Run #{head_id} has no earlier run of the same target{Style.RESET_ALL}")
+                return 2
+            base_id = previous[0]['id']
+
+        diff = diff_runs(store, head_id, base_id, **thresholds)
+        print_diff(diff)
+        return 1 if args.fail_on_regression and diff.regressed else 0
+    except LookupError as e:
+        print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+        return 2
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Streaming Result Sink for Security Tests
+Appends every log_result entry to a JSON Lines run file the moment it is
+logged and keeps only running counts in memory, so a crashed or killed run
+still leaves everything it found on disk
+
+Run file records, one compact JSON object per line:
+    {"type":"run", ...}      target, start time, planned suites, pid
+    {"type":"result", ...}   suite plus the log_result entry
+    {"type":"suite", ...}    a finished suite's duration and pacing
+    {"type":"end", ...}      duration, summary and the JSON report's path
+
+A run file without an end record is a partial run.
+
+Usage:
+    python results_sink.py security_run_20250101_120000.jsonl
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Lines are flushed to the OS as they are written (enough to survive the
+# process dying); fsync, which also survives the machine dying, is batched
+FSYNC_EVERY = 50
+FSYNC_INTERVAL = 1.0
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(',', ':'), default=str)
+
+
+class RunSummary:
+    """Per-suite counts and findings, updated as results arrive"""
+
+    def __init__(self):
+        self.suites = {}
+
+    def add(self, suite, result):
+        counts = self.suites.setdefault(suite, {'total': 0, 'vulnerable': 0, 'findings': []})
+        counts['total'] += 1
+        if result.get('success'):
+            counts['vulnerable'] += 1
+            counts['findings'].append({'test': result.get('test', 'Unknown'), 'details': result.get('details')})
+
+    def findings(self, suite):
+        return self.suites.get(suite, {}).get('findings', [])
+
+    def totals(self):
+        total = sum(counts['total'] for counts in self.suites.values())
+        vulnerable = sum(counts['vulnerable'] for counts in self.suites.values())
+        return {'total_tests': total, 'vulnerable': vulnerable, 'secure': total - vulnerable}
+
+
+class ResultSink:
+    """One run file being written; safe to share between threads"""
+
+    def __init__(self, path, target=None, suites=None, fsync_every=None, fsync_interval=None):
+        self.path = path
+        self.fsync_every = fsync_every or int(os.getenv('RESULT_SINK_FSYNC_EVERY', FSYNC_EVERY))
+        self.fsync_interval = fsync_interval if fsync_interval is not None else \
+            float(os.getenv('RESULT_SINK_FSYNC_INTERVAL', FSYNC_INTERVAL))
+        self.summary = RunSummary()
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._synced_at = time.monotonic()
+        self._file = open(path, 'w', encoding='utf-8')
+        self.write({
+            'type': 'run',
+            'target': target,
+            'started_at': datetime.fromtimestamp(self.started).isoformat(),
+            'suites': list(suites or []),
+            'pid': os.getpid(),
+        })
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def write(self, record):
+        line = _dumps(record) + '\n'
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            now = time.monotonic()
+            if self._pending >= self.fsync_every or now - self._synced_at >= self.fsync_interval:
+                self._sync(now)
+
+    def _sync(self, now=None):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = now or time.monotonic()
+
+    def result(self, suite, result):
+        """Append one log_result entry"""
+        with self._lock:
+            self.summary.add(suite, result)
+        self.write({'type': 'result', 'suite': suite, **result})
+
+    def suite_done(self, suite, **data):
+        self.write({'type': 'suite', 'suite': suite, **data})
+
+    def close(self, **data):
+        """Write the end record and close; a closed sink ignores further writes"""
+        if self._file is None:
+            return
+        self.write({'type': 'end', 'ended_at': datetime.now().isoformat(),
+                    'duration': time.time() - self.started, 'summary': self.summary.totals(), **data})
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+
+class RunFile:
+    """A run file read back, one pass per question, never all of it at once"""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.end = None
+        with open(path, encoding='utf-8') as f:
+            first = f.readline()
+            self.header = json.loads(first) if first.strip() else {}
+        self.end = self._end_record()
+
+    def _end_record(self):
+        # The end record is the last line; read only the file's tail
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 65536))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            if line.startswith(b'{"type":"end"'):
+                return json.loads(line)
+            if line.strip():
+                break
+        return None
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    @property
+    def in_progress(self):
+        """Still being written by a live process on this machine"""
+        pid = self.header.get('pid')
+        if self.complete or not pid or pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def records(self, kind=None):
+        prefix = f'{{"type":"{kind}"'.encode() if kind else b''
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.startswith(prefix) and line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        return   # torn last line of a killed run
+
+    def results(self, suite):
+        """One suite's log_result entries, in logged order"""
+        prefix = _dumps({'type': 'result', 'suite': suite})[:-1].encode() + b','
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.startswith(prefix):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        return
+                    del record['type'], record['suite']
+                    yield record
+
+    def suite_names(self):
+        """Suites with results, in first-seen order"""
+        names = {}
+        for record in self.records('result'):
+            names.setdefault(record['suite'], None)
+        return list(names)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def start_run(path, target=None, suites=None):
+    """Open the process-wide sink for a new run, closing any previous one"""
+    global _sink
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+        _sink = ResultSink(path, target, suites)
+        return _sink
+
+
+def get_sink():
+    """The sink of the run in progress, or None outside a runner run"""
+    return _sink
+
+
+def emit_result(suite, result):
+    """Stream a tester's log_result entry; a no-op when no run is being recorded"""
+    sink = _sink
+    if sink is not None:
+        sink.result(suite, result)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python results_sink.py RUN_FILE.jsonl")
+        sys.exit(2)
+    run = RunFile(sys.argv[1])
+    print(f"{run.header.get('target')}  started {run.header.get('started_at', '')[:19]}  "
+          f"{'complete' if run.complete else 'in progress' if run.in_progress else 'PARTIAL'}")
+    for name in run.suite_names():
+        results = list(run.results(name))
+        vulnerable = sum(1 for r in results if r.get('success'))
+        print(f"  {name:<34} {len(results)} tests  {vulnerable} vulnerable")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+SQLite Results Store for Security Tests
+Every run's verdicts and endpoint latencies in one indexed local database,
+keyed by target, suite, test, timestamp and verdict, so the results viewer
+and run diffs page through months of runs without opening a single JSON
+report
+
+Usage:
+    python results_store.py import             # bring in existing JSON reports
+    python results_store.py runs --page 2
+    python results_store.py latest --target https://evenleads.com
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+DEFAULT_PATH = 'security_results.db'
+UNKNOWN_TARGET = '(unknown)'
+
+# Keys of a log_result entry stored in their own columns; the rest go to extra
+RESULT_COLUMNS = ('test', 'success', 'details', 'timestamp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE,
+    target TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    duration REAL,
+    suites INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    vulnerable INTEGER NOT NULL,
+    report_path TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    target TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    test TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    details TEXT,
+    extra TEXT
+);
+-- The newest verdict per (target, suite, test), kept current on insert
+CREATE TABLE IF NOT EXISTS latest (
+    target TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    test TEXT NOT NULL,
+    result_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    PRIMARY KEY (target, suite, test)
+) WITHOUT ROWID;
+-- Per-endpoint latency summary of each run; endpoint '*' is the whole run
+CREATE TABLE IF NOT EXISTS run_latency (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    p50_ms REAL,
+    p90_ms REAL,
+    p99_ms REAL,
+    p999_ms REAL,
+    max_ms REAL,
+    PRIMARY KEY (run_id, endpoint)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS runs_target ON runs(target, started_at DESC);
+CREATE INDEX IF NOT EXISTS results_key ON results(target, suite, test, timestamp DESC);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS results_verdict ON results(verdict, timestamp DESC);
+"""
+
+
+def verdict(result):
+    return 'VULNERABLE' if result.get('success') else 'SECURE'
+
+
+def json_source(path):
+    """Run source for a JSON result file; a file written and stored by the same run is not imported again"""
+    return f"json:{os.path.abspath(path)}:{os.stat(path).st_mtime_ns}"
+
+
+def latency_rows(latency):
+    """(endpoint, summary) pairs of a LATENCY.snapshot(), the overall summary as '*'"""
+    if not latency:
+        return []
+    rows = [('*', latency.get('overall') or {})] + list((latency.get('endpoints') or {}).items())
+    return [(endpoint, summary) for endpoint, summary in rows if summary.get('count')]
+
+
+class ResultsStore:
+    """The results database; safe to share between threads"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('RESULTS_DB', DEFAULT_PATH)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_run(self, target, suites, started_at=None, duration=None, source=None, report_path=None,
+                latency=None):
+        """
+        Store one run; suites is {suite name: iterable of log_result entries}
+        and latency a LATENCY.snapshot()
+
+        Each suite's entries are read once, so they can be streamed from a
+        run file. Returns the run id, or None when source was already imported.
+        """
+        target = target or UNKNOWN_TARGET
+        total = vulnerable = 0
+        started_at = started_at or datetime.now().isoformat()
+        report_path = os.path.abspath(report_path) if report_path else None
+
+        with self._lock, self.db:
+            try:
+                run_id = self.db.execute(
+                    "INSERT INTO runs (source, target, started_at, duration, suites, total, vulnerable, report_path) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, target, started_at, duration, len(suites), 0, 0, report_path)
+                ).lastrowid
+            except sqlite3.IntegrityError:
+                return None
+
+            for suite, results in suites.items():
+                for result in results:
+                    total += 1
+                    vulnerable += bool(result.get('success'))
+                    extra = {key: value for key, value in result.items() if key not in RESULT_COLUMNS}
+                    row = (run_id, target, suite, result.get('test', 'Unknown'), result.get('timestamp') or started_at,
+                           verdict(result), result.get('details'), json.dumps(extra, default=str) if extra else None)
+                    result_id = self.db.execute(
+                        "INSERT INTO results (run_id, target, suite, test, timestamp, verdict, details, extra) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+                    ).lastrowid
+                    self.db.execute(
+                        "INSERT INTO latest (target, suite, test, result_id, run_id, timestamp, verdict) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (target, suite, test) DO UPDATE SET result_id = excluded.result_id, "
+                        "run_id = excluded.run_id, timestamp = excluded.timestamp, verdict = excluded.verdict "
+                        "WHERE excluded.timestamp >= latest.timestamp",
+                        (target, suite, row[3], result_id, run_id, row[4], row[5])
+                    )
+            self.db.execute("UPDATE runs SET total = ?, vulnerable = ? WHERE id = ?", (total, vulnerable, run_id))
+            self._add_latency(run_id, latency)
+        return run_id
+
+    def _add_latency(self, run_id, latency):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO run_latency (run_id, endpoint, count, p50_ms, p90_ms, p99_ms, p999_ms, max_ms) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, endpoint, summary['count'], summary.get('p50_ms'), summary.get('p90_ms'),
+              summary.get('p99_ms'), summary.get('p999_ms'), summary.get('max_ms'))
+             for endpoint, summary in latency_rows(latency)]
+        )
+
+    def count_runs(self, target=None):
+        query = "SELECT COUNT(*) FROM runs" + (" WHERE target = ?" if target else "")
+        return self.db.execute(query, (target,) if target else ()).fetchone()[0]
+
+    def runs(self, limit=10, offset=0, target=None):
+        """One page of runs, newest first"""
+        where = "WHERE target = ? " if target else ""
+        return self.db.execute(
+            f"SELECT * FROM runs {where}ORDER BY started_at DESC, id DESC LIMIT ? OFFSET ?",
+            ((target,) if target else ()) + (limit, offset)
+        ).fetchall()
+
+    def run(self, run_id):
+        return self.db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+
+    def run_results(self, run_id):
+        return self.db.execute("SELECT * FROM results WHERE run_id = ? ORDER BY id", (run_id,)).fetchall()
+
+    def run_for_source(self, source):
+        row = self.db.execute("SELECT id FROM runs WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def runs_before(self, run_id, limit=1):
+        """Runs of the same target before run_id, newest first"""
+        return self.db.execute(
+            "SELECT p.* FROM runs r JOIN runs p ON p.target = r.target "
+            "AND (p.started_at < r.started_at OR (p.started_at = r.started_at AND p.id < r.id)) "
+            "WHERE r.id = ? ORDER BY p.started_at DESC, p.id DESC LIMIT ?", (run_id, limit)
+        ).fetchall()
+
+    def verdicts(self, run_ids):
+        """
+        {run id: {(suite, test): verdict}} for several runs in one query
+
+        A test logged more than once in a run is VULNERABLE if any entry was
+        ('VULNERABLE' sorts after 'SECURE').
+        """
+        run_ids = list(run_ids)
+        verdicts = {run_id: {} for run_id in run_ids}
+        if run_ids:
+            rows = self.db.execute(
+                f"SELECT run_id, suite, test, MAX(verdict) FROM results WHERE run_id IN ({','.join('?' * len(run_ids))}) "
+                "GROUP BY run_id, suite, test", run_ids
+            )
+            for run_id, suite, test, value in rows:
+                verdicts[run_id][(suite, test)] = value
+        return verdicts
+
+    def latency(self, run_ids):
+        """{run id: {endpoint: latency row}} for several runs in one query"""
+        run_ids = list(run_ids)
+        latency = {run_id: {} for run_id in run_ids}
+        if run_ids:
+            rows = self.db.execute(
+                f"SELECT * FROM run_latency WHERE run_id IN ({','.join('?' * len(run_ids))})", run_ids
+            )
+            for row in rows:
+                latency[row['run_id']][row['endpoint']] = row
+        return latency
+
+    def latest_verdicts(self, target=None):
+        """The newest verdict for every test, with its details"""
+        where = "WHERE l.target = ? " if target else ""
+        return self.db.execute(
+            "SELECT l.target, l.suite, l.test, l.verdict, l.timestamp, l.run_id, r.details "
+            f"FROM latest l JOIN results r ON r.id = l.result_id {where}ORDER BY l.target, l.suite, l.test",
+            (target,) if target else ()
+        ).fetchall()
+
+    def history(self, target, suite, test, limit=20):
+        """Verdicts of one test over time, newest first"""
+        return self.db.execute(
+            "SELECT * FROM results WHERE target = ? AND suite = ? AND test = ? ORDER BY timestamp DESC LIMIT ?",
+            (target, suite, test, limit)
+        ).fetchall()
+
+    def targets(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT target FROM runs ORDER BY target")]
+
+    def clear(self):
+        """Delete every run; the one-time JSON import is not repeated"""
+        with self._lock, self.db:
+            for table in ('latest', 'run_latency', 'results', 'runs'):
+                self.db.execute(f"DELETE FROM {table}")
+
+    def get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # -----------------------------------------------------------------------
+    # JSON import
+    # -----------------------------------------------------------------------
+
+    def import_json(self, path, suite_names=None):
+        """
+        Import one security_test_results_*.json or results_*.json file
+
+        Returns the run id, or None if it was imported before or is not a
+        result file. suite_names maps a results_<name>.json stem to its suite.
+        """
+        stat = os.stat(path)
+        source = json_source(path)
+        with open(path) as f:
+            data = json.load(f)
+
+        if isinstance(data, dict) and 'test_suites' in data:
+            suites = {name: suite.get('results', []) for name, suite in data['test_suites'].items()}
+            return self.add_run(data.get('target'), suites, started_at=data.get('timestamp'),
+                                duration=data.get('duration'), source=source, report_path=path,
+                                latency=data.get('latency'))
+        if isinstance(data, list) and all(isinstance(r, dict) and 'test' in r for r in data):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            name = stem[len('results_'):] if stem.startswith('results_') else stem
+            suite = (suite_names or {}).get(name, name.replace('_', ' ').title())
+            started_at = min((r['timestamp'] for r in data if r.get('timestamp')),
+                             default=datetime.fromtimestamp(stat.st_mtime).isoformat())
+            return self.add_run(None, {suite: data}, started_at=started_at, source=source, report_path=path)
+        return None
+
+    def import_run_file(self, path):
+        """
+        Import a security_run_*.jsonl run file left by a run that never finished
+
+        Completed runs are skipped (their JSON report is imported instead),
+        as are runs still being written. Returns the run id or None.
+        """
+        from results_sink import RunFile
+
+        run = RunFile(path)
+        if run.complete or run.in_progress:
+            return None
+        suites = {name: run.results(name) for name in run.suite_names()}
+        if not suites:
+            return None
+        return self.add_run(run.header.get('target'), suites, started_at=run.header.get('started_at'),
+                            source=json_source(path), report_path=path)
+
+    def import_directory(self, directory='.'):
+        """Import every result file in directory not imported before: (imported, skipped)"""
+        try:
+            from tester_registry import get_registry
+            suite_names = {tester.module[len('test_'):]: tester.suite_name for tester in get_registry()}
+        except Exception:
+            suite_names = {}
+
+        paths = sorted(glob.glob(os.path.join(directory, 'security_test_results_*.json'))
+                       + glob.glob(os.path.join(directory, 'results_*.json')))
+        run_files = sorted(glob.glob(os.path.join(directory, 'security_run_*.jsonl')))
+        imported = skipped = 0
+        for path in paths + run_files:
+            try:
+                if path.endswith('.jsonl'):
+                    run_id = self.import_run_file(path)
+                else:
+                    run_id = self.import_json(path, suite_names)
+            except (OSError, ValueError):
+                run_id = None
+            if run_id is None:
+                skipped += 1
+            else:
+                imported += 1
+        self.set_meta('json_imported_at', datetime.now().isoformat())
+        return imported, skipped
+
+    def backfill_latency(self):
+        """Load endpoint latency from the JSON reports of runs stored before latency was; once per database"""
+        if self.get_meta('latency_backfilled_at') is not None:
+            return 0
+        rows = self.db.execute(
+            "SELECT id, report_path FROM runs WHERE report_path LIKE '%.json' "
+            "AND id NOT IN (SELECT DISTINCT run_id FROM run_latency)"
+        ).fetchall()
+        filled = 0
+        for run_id, report_path in rows:
+            try:
+                with open(report_path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict) and data.get('latency'):
+                with self._lock, self.db:
+                    self._add_latency(run_id, data['latency'])
+                filled += 1
+        self.set_meta('latency_backfilled_at', datetime.now().isoformat())
+        return filled
+
+    def ensure_imported(self, directory='.'):
+        """Run the JSON import once per database; later reports are written to the store directly"""
+        self.backfill_latency()
+        if self.get_meta('json_imported_at') is None:
+            return self.import_directory(directory)
+        return None
+
+
+def save_run(target, suites, **kwargs):
+    """Store a run in the default database; a store failure never fails the run"""
+    try:
+        store = ResultsStore()
+        try:
+            return store.add_run(target, suites, **kwargs)
+        finally:
+            store.close()
+    except sqlite3.Error as e:
+        print(f"Results store unavailable ({e}); JSON results are unaffected")
+        return None
+
+
+def save_suite_file(target, tester, path):
+    """Store a tester run on its own, with the results JSON it just wrote at path"""
+    return save_run(target, {tester.suite_name: tester.results}, source=json_source(path), report_path=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the security results store")
+    parser.add_argument('--db', help=f"Database path (default: RESULTS_DB or {DEFAULT_PATH})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="Import JSON result files and partial run files")
+    import_parser.add_argument('directory', nargs='?', default='.')
+    runs_parser = commands.add_parser('runs', help="List runs, newest first")
+    runs_parser.add_argument('--page', type=int, default=1)
+    runs_parser.add_argument('--per-page', type=int, default=20)
+    runs_parser.add_argument('--target')
+    latest_parser = commands.add_parser('latest', help="Latest verdict per test")
+    latest_parser.add_argument('--target')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == 'import':
+        imported, skipped = store.import_directory(args.directory)
+        print(f"Imported {imported} file(s), skipped {skipped} (already imported or not result files)")
+    elif args.command == 'runs':
+        total = store.count_runs(args.target)
+        for run in store.runs(args.per_page, (args.page - 1) * args.per_page, args.target):
+            print(f"#{run['id']:<6} {run['started_at'][:19]}  {run['target']:<35} "
+                  f"{run['suites']} suites  {run['total']} tests  {run['vulnerable']} vulnerable")
+        print(f"Page {args.page} of {max(1, -(-total // args.per_page))} ({total} runs)")
+    else:
+        for row in store.latest_verdicts(args.target):
+            print(f"{row['verdict']:<10} {row['timestamp'][:19]}  {row['target']}  {row['suite']} / {row['test']}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
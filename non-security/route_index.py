@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Static Route Index for Security Tests
+Parses the Laravel routes/*.php files into an on-disk index of method,
+path, middleware, name and action, rebuilt only when a route file changes
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.route_index.json')
+
+# Bump when parsing changes so stale caches are rebuilt
+INDEX_VERSION = 1
+
+# Route files Laravel loads, with the middleware group and prefix it wraps them in
+ROUTE_FILES = {
+    'routes/web.php': {'middleware': ['web'], 'prefix': ''},
+    'routes/api.php': {'middleware': ['api'], 'prefix': 'api'},
+    'routes/console.php': None,   # Artisan commands, no HTTP routes
+}
+
+# Static calls that pull in another route file at that point
+INCLUDES = {
+    'Wave::routes': 'wave/routes/web.php',
+    'Wave::api': 'wave/routes/api.php',
+}
+
+# Route macros registered by packages
+MACROS = {
+    'impersonate': [
+        ('GET', 'impersonate/take/{id}/{guardName?}', 'impersonate'),
+        ('GET', 'impersonate/leave', 'impersonate.leave'),
+    ],
+}
+
+VERBS = {'get', 'post', 'put', 'patch', 'delete', 'options'}
+VERB_ALIASES = {'any': ['ANY'], 'view': ['GET'], 'redirect': ['GET'], 'permanentRedirect': ['GET']}
+
+# Middleware that stops anonymous requests
+AUTH_MIDDLEWARE = re.compile(r'^(auth(\.basic)?(:.*)?|api\.key|signed|can:.*|role:.*|permission:.*)$')
+
+CALL_START = re.compile(r'\b(Route|Wave)::(\w+)\s*\(')
+IDENTIFIER = re.compile(r'\s*->\s*(\w+)\s*\(')
+
+
+# ---------------------------------------------------------------------------
+# Minimal PHP scanning: comments, strings, balanced brackets
+# ---------------------------------------------------------------------------
+
+def strip_comments(source):
+    """Blank out PHP comments, keeping string literals and offsets intact"""
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in ('"', "'"):
+            end = _string_end(source, i)
+            out.append(source[i:end])
+            i = end
+        elif source.startswith('//', i) or ch == '#':
+            end = source.find('\n', i)
+            end = n if end == -1 else end
+            out.append(' ' * (end - i))
+            i = end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            out.append(re.sub(r'[^\n]', ' ', source[i:end]))
+            i = end
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def _string_end(source, start):
+    """Index just past the string literal starting at start"""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    return len(source)
+
+
+def _matching(source, start):
+    """Index of the bracket closing the one at start"""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    stack = [pairs[source[start]]]
+    i = start + 1
+    while i < len(source):
+        ch = source[i]
+        if ch in ('"', "'"):
+            i = _string_end(source, i)
+            continue
+        if ch in pairs:
+            stack.append(pairs[ch])
+        elif ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i
+        i += 1
+    return len(source) - 1
+
+
+def _split_top_level(source, separator=','):
+    """Split on separator outside brackets and strings"""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(source):
+        ch = source[i]
+        if ch in ('"', "'"):
+            i = _string_end(source, i)
+            continue
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        elif depth == 0 and source.startswith(separator, i):
+            parts.append(source[start:i])
+            start = i + len(separator)
+            i = start
+            continue
+        i += 1
+    tail = source[start:]
+    if tail.strip():
+        parts.append(tail)
+    return [part.strip() for part in parts]
+
+
+class Closure:
+    """A closure argument; body is the source between its braces"""
+
+    def __init__(self, body):
+        self.body = body
+
+
+def parse_value(source):
+    """PHP literal to Python: strings, arrays, ::class, closures; anything else stays raw"""
+    source = source.strip()
+    if not source:
+        return None
+    if source[0] in ('"', "'") and _string_end(source, 0) == len(source):
+        return source[1:-1].replace("\\'", "'").replace('\\"', '"')
+    if source[0] == '[' and _matching(source, 0) == len(source) - 1:
+        items = [_split_top_level(item, '=>') for item in _split_top_level(source[1:-1])]
+        if items and all(len(item) == 2 for item in items):
+            return {parse_value(key): parse_value(value) for key, value in items}
+        return [parse_value(item[0]) for item in items]
+    if re.match(r'(static\s+)?(function|fn)\b', source):
+        brace = source.find('{')
+        if brace != -1:
+            return Closure(source[brace + 1:_matching(source, brace)])
+        return Closure('')
+    if source.endswith('::class'):
+        return source[:-len('::class')].lstrip('\\')
+    return {'raw': source}
+
+
+def _parse_chain(source, start):
+    """
+    The call chain starting at a Route::/Wave:: match
+
+    Returns ([(method, args)], end offset). args are parsed PHP values.
+    """
+    match = CALL_START.match(source, start)
+    calls = []
+    open_paren = match.end() - 1
+    close = _matching(source, open_paren)
+    calls.append((f"{match.group(1)}::{match.group(2)}", [parse_value(arg) for arg in _split_top_level(source[open_paren + 1:close])]))
+    pos = close + 1
+
+    while True:
+        link = IDENTIFIER.match(source, pos)
+        if not link:
+            break
+        open_paren = link.end() - 1
+        close = _matching(source, open_paren)
+        calls.append((link.group(1), [parse_value(arg) for arg in _split_top_level(source[open_paren + 1:close])]))
+        pos = close + 1
+
+    return calls, pos
+
+
+# ---------------------------------------------------------------------------
+# Route extraction
+# ---------------------------------------------------------------------------
+
+def _join_path(prefix, path):
+    parts = [segment.strip('/') for segment in (prefix, path) if segment and segment.strip('/')]
+    return '/' + '/'.join(parts)
+
+
+def _as_list(args):
+    values = []
+    for arg in args:
+        if isinstance(arg, list):
+            values.extend(a for a in arg if isinstance(a, str))
+        elif isinstance(arg, str):
+            values.append(arg)
+    return values
+
+
+def _action(arg):
+    if isinstance(arg, Closure):
+        return 'Closure'
+    if isinstance(arg, list) and len(arg) == 2 and all(isinstance(a, str) for a in arg):
+        return f"{arg[0]}@{arg[1]}"
+    if isinstance(arg, str):
+        return arg
+    return None
+
+
+class _Context:
+    """Group attributes in effect at a point in a route file"""
+
+    def __init__(self, prefix='', middleware=(), name='', source=''):
+        self.prefix = prefix
+        self.middleware = list(middleware)
+        self.name = name
+        self.source = source
+
+    def child(self, prefix=None, middleware=(), name=None, without=()):
+        return _Context(
+            _join_path(self.prefix, prefix).strip('/') if prefix else self.prefix,
+            [m for m in self.middleware + list(middleware) if m not in without],
+            self.name + (name or ''),
+            self.source
+        )
+
+
+class RouteParser:
+    """Walks route files, following groups and includes"""
+
+    def __init__(self, root):
+        self.root = root
+        self.routes = []
+        self.files = set()
+
+    def parse_file(self, relative, context):
+        path = os.path.join(self.root, relative)
+        if not os.path.exists(path):
+            return
+        self.files.add(relative)
+        with open(path, encoding='utf-8', errors='replace') as f:
+            source = strip_comments(f.read())
+        self.parse_block(source, _Context(context.prefix, context.middleware, context.name, relative))
+
+    def parse_block(self, source, context):
+        pos = 0
+        while True:
+            match = CALL_START.search(source, pos)
+            if not match:
+                return
+            calls, pos = _parse_chain(source, match.start())
+            self.apply_chain(calls, context)
+
+    def apply_chain(self, calls, context):
+        head, head_args = calls[0]
+        static = head.split('::', 1)[1]
+
+        if head in INCLUDES:
+            self.parse_file(INCLUDES[head], context)
+            return
+        if not head.startswith('Route::'):
+            return
+        if static in MACROS:
+            for method, path, name in MACROS[static]:
+                self._add(context, [method], path, name, [], [], 'macro')
+            return
+
+        # Attributes set before the verb or group, e.g. Route::prefix()->middleware()->group()
+        prefix, name, middleware, without = None, '', [], []
+        route = None
+        for method, args in calls:
+            method = method.split('::')[-1]
+
+            if route is None and (method in VERBS or method in VERB_ALIASES or method == 'match'):
+                route = self._route_call(method, args)
+                continue
+
+            if method == 'group':
+                attrs = args[0] if args and isinstance(args[0], dict) else {}
+                closure = next((a for a in args if isinstance(a, Closure)), None)
+                group_context = context.child(
+                    prefix=attrs.get('prefix', prefix) if isinstance(attrs.get('prefix', prefix), str) else prefix,
+                    middleware=middleware + _as_list([attrs.get('middleware', [])]),
+                    name=attrs.get('as', name) if isinstance(attrs.get('as', name), str) else name,
+                    without=without
+                )
+                if closure is not None:
+                    self.parse_block(closure.body, group_context)
+                return
+
+            if method == 'prefix' and args and isinstance(args[0], str):
+                prefix = args[0]
+            elif method in ('name', 'as') and args and isinstance(args[0], str):
+                name += args[0]
+            elif method == 'middleware':
+                middleware += _as_list(args)
+            elif method == 'withoutMiddleware':
+                without += _as_list(args)
+
+        if route is not None:
+            methods, path, action = route
+            if isinstance(path, str):
+                self._add(context, methods, path, name, middleware, without, action)
+
+    @staticmethod
+    def _route_call(method, args):
+        """(methods, path, action) for a verb call"""
+        if method == 'match':
+            methods = [m.upper() for m in _as_list(args[:1])]
+            return methods, args[1] if len(args) > 1 else None, _action(args[2]) if len(args) > 2 else None
+        methods = VERB_ALIASES.get(method, [method.upper()])
+        path = args[0] if args else None
+        if method in ('view', 'redirect', 'permanentRedirect'):
+            action = f"{method}:{args[1]}" if len(args) > 1 and isinstance(args[1], str) else method
+        else:
+            action = _action(args[1]) if len(args) > 1 else None
+        return methods, path, action
+
+    def _add(self, context, methods, path, name, middleware, without, action):
+        scoped = context.child(middleware=middleware, without=without)
+        self.routes.append({
+            'methods': methods,
+            'path': _join_path(context.prefix, path),
+            'name': (context.name + name) if name else None,
+            'middleware': list(dict.fromkeys(scoped.middleware)),
+            'action': action,
+            'file': context.source,
+        })
+
+
+def build_index(root=None):
+    """Parse every route file under root into index entries"""
+    root = root or REPO_ROOT
+    parser = RouteParser(root)
+    for relative, group in ROUTE_FILES.items():
+        if group is None:
+            if os.path.exists(os.path.join(root, relative)):
+                parser.files.add(relative)
+            continue
+        parser.parse_file(relative, _Context(group['prefix'], group['middleware']))
+    return parser.routes, sorted(parser.files)
+
+
+# ---------------------------------------------------------------------------
+# Cached index
+# ---------------------------------------------------------------------------
+
+def _fingerprint(root, relative):
+    path = os.path.join(root, relative)
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': digest}
+
+
+def _cache_valid(root, cache):
+    """True if no route file changed; touching a file without editing it still counts as valid"""
+    if cache.get('version') != INDEX_VERSION or cache.get('root') != root:
+        return False
+
+    current = set(_route_file_candidates(root))
+    if not current.issubset(cache['files']):
+        return False
+
+    for relative, saved in cache['files'].items():
+        path = os.path.join(root, relative)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if stat.st_mtime_ns == saved['mtime_ns'] and stat.st_size == saved['size']:
+            continue
+        if _fingerprint(root, relative)['sha1'] != saved['sha1']:
+            return False
+        # Same content: remember the new stat so later runs skip the hash
+        saved.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        cache['touched'] = True
+    return True
+
+
+def _route_file_candidates(root):
+    """routes/*.php as they exist now, to notice added files"""
+    directory = os.path.join(root, 'routes')
+    if not os.path.isdir(directory):
+        return []
+    return [f"routes/{name}" for name in os.listdir(directory) if name.endswith('.php')]
+
+
+class RouteIndex:
+    """Queryable view over the indexed routes"""
+
+    def __init__(self, routes, built=False):
+        self.routes = routes
+        self.built = built   # True when this load re-parsed the route files
+
+    def __len__(self):
+        return len(self.routes)
+
+    @staticmethod
+    def requires_auth(route):
+        return any(AUTH_MIDDLEWARE.match(m) for m in route['middleware'])
+
+    def query(self, method=None, prefix=None, middleware=None, authenticated=None,
+              has_params=None, name=None, path_contains=None):
+        """
+        Routes matching every given filter
+
+        middleware matches exactly or by prefix ('auth' matches 'auth:sanctum');
+        authenticated=False gives routes without any auth middleware.
+        """
+        matches = []
+        for route in self.routes:
+            if method and method.upper() not in route['methods'] and 'ANY' not in route['methods']:
+                continue
+            if prefix and not route['path'].startswith(prefix):
+                continue
+            if path_contains and path_contains not in route['path']:
+                continue
+            if name and not (route['name'] or '').startswith(name):
+                continue
+            if middleware and not any(m == middleware or m.startswith(middleware + ':') for m in route['middleware']):
+                continue
+            if authenticated is not None and self.requires_auth(route) != authenticated:
+                continue
+            if has_params is not None and ('{' in route['path']) != has_params:
+                continue
+            matches.append(route)
+        return matches
+
+    def unauthenticated(self, method=None):
+        return self.query(method=method, authenticated=False)
+
+    def paths(self, routes=None):
+        """Unique paths of routes, in index order"""
+        return list(dict.fromkeys(route['path'] for route in (self.routes if routes is None else routes)))
+
+    @staticmethod
+    def fill_path(path, value='1'):
+        """Concrete URL path: required parameters get value, optional ones are dropped"""
+        path = re.sub(r'/\{[^}]+\?\}', '', path)
+        return re.sub(r'\{[^}]+\}', value, path) or '/'
+
+
+def load_route_index(root=None, cache_path=None, rebuild=False):
+    """Route index from the cache, re-parsing only when a route file changed"""
+    root = os.path.abspath(root or os.getenv('ROUTES_ROOT', REPO_ROOT))
+    cache_path = cache_path or CACHE_PATH
+
+    if not rebuild:
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+            if _cache_valid(root, cache):
+                if cache.pop('touched', False):
+                    _write_cache(cache_path, cache)
+                return RouteIndex(cache['routes'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    routes, files = build_index(root)
+    _write_cache(cache_path, {
+        'version': INDEX_VERSION,
+        'root': root,
+        'files': {relative: _fingerprint(root, relative) for relative in files},
+        'routes': routes,
+    })
+    return RouteIndex(routes, built=True)
+
+
+def _write_cache(cache_path, cache):
+    try:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass   # read-only checkout: still usable, just not cached
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_route_index():
+    """Return the process-wide route index, loading it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = load_route_index()
+        return _index
+
+
+if __name__ == "__main__":
+    index = load_route_index(rebuild='--rebuild' in sys.argv)
+    public = index.unauthenticated()
+    print(f"{len(index)} routes ({'rebuilt' if index.built else 'cached'}), {len(public)} without auth middleware")
+    if '--public' in sys.argv:
+        for route in public:
+            print(f"  {','.join(route['methods']):8} {route['path']:60} {route['name'] or ''}")
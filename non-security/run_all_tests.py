@@ -8,6 +8,11 @@ import sys
 import os
 import json
 import time
+import argparse
+import asyncio
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from colorama import Fore, Style, init
 from tabulate import tabulate
@@ -15,23 +20,50 @@ from tabulate import tabulate
 # Add tests directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'tests'))
 
-from test_mass_assignment import MassAssignmentTester
-from test_rate_limiting import RateLimitTester
-from test_admin_authorization import AdminAuthTester
-from test_file_upload import FileUploadTester
-from test_business_logic import BusinessLogicTester
-from test_config_security import ConfigSecurityTester
+from cassette import configure_cassette, get_cassette
+from http_transport import DOWNLOAD_STATS, POOL_STATS, get_transport
+from latency import LATENCY
+from async_engine import AsyncProbeEngine, run_tester_async
+from pacing import get_pacer
+from results_sink import RunFile, start_run
+from results_store import json_source, save_run
+from session_helper import CREDENTIAL_CACHE
+from tester_registry import SEVERITIES, get_registry
 
 init(autoreset=True)
 
+# Suite name, tester ('module:Class' in tests/), and which run_all_tests
+# arguments it takes, from the metadata the tester classes declare. Tester
+# modules are imported only when their suite runs.
+TEST_SUITES = get_registry().specs()
+
+
+def load_tester(tester):
+    """The tester class for a TEST_SUITES 'module:Class' entry, imported on first use"""
+    module_name, class_name = tester.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
 class SecurityTestRunner:
-    def __init__(self, base_url, test_email=None, test_password=None):
+    def __init__(self, base_url, test_email=None, test_password=None,
+                 parallel=False, workers=4, suite_delay=None,
+                 use_async=False, per_host_limit=10):
         self.base_url = base_url
         self.test_email = test_email
         self.test_password = test_password
+        self.parallel = parallel
+        self.workers = workers
+        self.use_async = use_async
+        self.per_host_limit = per_host_limit
+        # Optional fixed cool-down between sequential suites; the pacing
+        # scheduler already spaces requests when the target needs it
+        self.suite_delay = suite_delay or 0
         self.all_results = {}
+        self.execution = {}
         self.start_time = None
         self.end_time = None
+        self.sink = None
+        self.report_path = None
+        self._results_lock = threading.Lock()
 
     def print_banner(self):
         """Print test suite banner"""
@@ -44,25 +76,147 @@ class SecurityTestRunner:
         print(f"Target: {Fore.CYAN}{self.base_url}{Style.RESET_ALL}")
         print(f"Time:   {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
-    def run_test_suite(self, suite_name, tester, run_method, *args):
-        """Run a test suite and collect results"""
+    def print_suite_banner(self, suite_name):
         print(f"\n{Fore.MAGENTA}{'#'*70}")
         print(f"  RUNNING: {suite_name}")
         print(f"{'#'*70}{Style.RESET_ALL}\n")
 
+    def run_test_suite(self, suite_name, tester, run_method, *args):
+        """Run a test suite and collect results"""
+        self.print_suite_banner(suite_name)
+
         suite_start = time.time()
-        results = run_method(*args)
+        with get_pacer().track(suite_name):
+            results = run_method(*args)
         suite_duration = time.time() - suite_start
 
-        self.all_results[suite_name] = {
-            'results': results,
-            'duration': suite_duration,
-            'vulnerable_count': sum(1 for r in results if r['success']),
-            'total_count': len(results)
-        }
+        self.record_suite(suite_name, results, suite_start, suite_duration)
+
+        if self.suite_delay:
+            time.sleep(self.suite_delay)
+
+    def record_suite(self, suite_name, results, suite_start, suite_duration):
+        """
+        Store one suite's counts and timing
+
+        The results themselves are already in the run file, streamed by the
+        tester's log_result; only counts are kept in memory.
+        """
+        with self._results_lock:
+            self.all_results[suite_name] = {
+                'duration': suite_duration,
+                'started_at': suite_start - self.start_time,
+                'vulnerable_count': sum(1 for r in results if r['success']),
+                'total_count': len(results),
+                'pacing': get_pacer().suite_report(suite_name, suite_duration),
+                'download': DOWNLOAD_STATS.suite_report(suite_name)
+            }
+        if self.sink is not None:
+            self.sink.suite_done(suite_name, **self.all_results[suite_name])
+
+        throttled = self.all_results[suite_name]['pacing']['throttled']
+        print(f"\n{Fore.MAGENTA}Suite completed in {suite_duration:.2f}s "
+              f"({throttled:.2f}s throttled){Style.RESET_ALL}\n")
+
+    def suite_args(self, arg_kind):
+        """Arguments passed to a suite's run_all_tests"""
+        if arg_kind == 'credentials':
+            return (self.test_email, self.test_password)
+        if arg_kind == 'token':
+            return (None,)  # Will create its own test account
+        return ()
+
+    def run_suite_spec(self, suite_name, tester_path, arg_kind):
+        """Instantiate a tester and run it as one suite"""
+        tester = load_tester(tester_path)(self.base_url)
+        self.run_test_suite(
+            suite_name,
+            tester,
+            tester.run_all_tests,
+            *self.suite_args(arg_kind)
+        )
+
+    def run_suites_sequential(self, suites):
+        """Run suites one after another"""
+        for suite_name, tester_path, arg_kind in suites:
+            self.run_suite_spec(suite_name, tester_path, arg_kind)
+
+    @staticmethod
+    def is_isolated(spec):
+        tester = get_registry().get(spec[1])
+        return tester.isolated if tester else getattr(load_tester(spec[1]), 'isolated', False)
+
+    @classmethod
+    def split_isolated(cls, suites):
+        """Separate suites whose tester sets isolated = True"""
+        shared = [spec for spec in suites if not cls.is_isolated(spec)]
+        isolated = [spec for spec in suites if cls.is_isolated(spec)]
+        return shared, isolated
+
+    @staticmethod
+    def longest_first(suites):
+        """Suites by estimated duration, longest first, so the worker pool finishes together"""
+        registry = get_registry()
+        return sorted(suites, key=lambda spec: -(getattr(registry.get(spec[1]), 'estimated_duration', 0) or 0))
+
+    def run_suites_parallel(self, suites):
+        """
+        Run suites concurrently on a worker pool
+
+        Isolated suites run alone afterwards, so nothing else is hitting
+        the target while they measure it.
+        """
+        shared, isolated = self.split_isolated(suites)
+
+        print(f"{Fore.CYAN}Parallel mode: {len(shared)} suites on {self.workers} workers, "
+              f"{len(isolated)} isolated{Style.RESET_ALL}\n")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.run_suite_spec, *spec): spec[0]
+                for spec in self.longest_first(shared)
+            }
+            for future, suite_name in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"\n{Fore.RED}Error in {suite_name}: {str(e)}{Style.RESET_ALL}\n")
+
+        self.run_suites_sequential(isolated)
+
+    async def run_suite_spec_async(self, engine, suite_name, tester_path, arg_kind):
+        """Run one suite on the async engine"""
+        self.print_suite_banner(suite_name)
+        tester = load_tester(tester_path)(self.base_url)
+
+        suite_start = time.time()
+        with get_pacer().track(suite_name):
+            results = await run_tester_async(engine, tester, *self.suite_args(arg_kind))
+        self.record_suite(suite_name, results, suite_start, time.time() - suite_start)
+
+    async def run_suites_async(self, suites):
+        """
+        Run suites on one event loop
+
+        Testers with async probes run natively; sync testers go through the
+        engine's thread adapter. Isolated suites run alone afterwards.
+        """
+        shared, isolated = self.split_isolated(suites)
+
+        async with AsyncProbeEngine(per_host_limit=self.per_host_limit) as engine:
+            print(f"{Fore.CYAN}Async mode ({engine.backend} backend): {len(shared)} suites concurrently, "
+                  f"{self.per_host_limit} requests per host, {len(isolated)} isolated{Style.RESET_ALL}\n")
+
+            outcomes = await asyncio.gather(
+                *(self.run_suite_spec_async(engine, *spec) for spec in shared),
+                return_exceptions=True
+            )
+            for spec, outcome in zip(shared, outcomes):
+                if isinstance(outcome, Exception):
+                    print(f"\n{Fore.RED}Error in {spec[0]}: {str(outcome)}{Style.RESET_ALL}\n")
 
-        print(f"\n{Fore.MAGENTA}Suite completed in {suite_duration:.2f}s{Style.RESET_ALL}\n")
-        time.sleep(2)
+            for spec in isolated:
+                await self.run_suite_spec_async(engine, *spec)
 
     def generate_summary_report(self):
         """Generate comprehensive summary report"""
@@ -83,7 +237,37 @@ class SecurityTestRunner:
         print(f"  Total Tests Run:   {total_tests}")
         print(f"  Vulnerable:        {Fore.RED}{total_vulnerable}{Style.RESET_ALL}")
         print(f"  Secure:            {Fore.GREEN}{total_secure}{Style.RESET_ALL}")
-        print(f"  Duration:          {total_duration:.2f}s\n")
+        print(f"  Duration:          {total_duration:.2f}s")
+        if self.execution.get('mode') in ('parallel', 'async'):
+            print(f"  Speedup:           {self.execution['speedup']:.2f}x "
+                  f"({self.execution['suite_time_total']:.1f}s of suite time)")
+
+        pool = get_transport().stats()['totals']
+        print(f"  HTTP Requests:     {pool['requests']} "
+              f"(pool hits: {pool['pool_hits']}, misses: {pool['pool_misses']}, "
+              f"TLS resumed: {pool['tls_resumed']}/{pool['tls_handshakes']})")
+
+        downloads = get_transport().downloads()['totals']
+        if downloads['responses']:
+            print(f"  Downloaded:        {downloads['bytes'] / 1048576:.1f} MB of response bodies "
+                  f"({downloads['truncated']} truncated, {downloads['stopped_early']} stopped early)")
+
+        credentials = CREDENTIAL_CACHE.report()
+        print(f"  Logins:            {credentials['logins']} "
+              f"({credentials['logins_avoided']} avoided via credential cache)")
+
+        cassette = get_cassette()
+        if cassette is not None:
+            report = cassette.report()
+            print(f"  Cassette:          {report['mode']} {report['path']} "
+                  f"({report['recorded'] or report['replayed']} responses, {report['misses']} misses)")
+
+        latency = LATENCY.snapshot()
+        overall = latency['overall']
+        if overall['count']:
+            print(f"  Latency:           p50 {overall['p50_ms']:.0f}ms, p90 {overall['p90_ms']:.0f}ms, "
+                  f"p99 {overall['p99_ms']:.0f}ms, p999 {overall['p999_ms']:.0f}ms")
+        print()
 
         # Per-suite breakdown
         print(f"{Fore.CYAN}Test Suite Breakdown:{Style.RESET_ALL}\n")
@@ -100,16 +284,31 @@ class SecurityTestRunner:
                 f"{Fore.RED}{data['vulnerable_count']}{Style.RESET_ALL}",
                 f"{vulnerable_pct:.1f}%",
                 f"{data['duration']:.1f}s",
+                f"{data.get('pacing', {}).get('throttled', 0):.1f}s",
+                f"{data.get('download', {}).get('bytes', 0) / 1024:.0f} KB",
                 f"{status}{Style.RESET_ALL}"
             ])
 
         print(tabulate(
             table_data,
-            headers=['Test Suite', 'Tests', 'Vulnerable', '%', 'Time', 'Status'],
+            headers=['Test Suite', 'Tests', 'Vulnerable', '%', 'Time', 'Throttled', 'Downloaded', 'Status'],
             tablefmt='grid'
         ))
         print()
 
+        # Slowest endpoints by p99
+        if latency['endpoints']:
+            rows = int(os.getenv('LATENCY_REPORT_ROWS', 15))
+            slowest = sorted(latency['endpoints'].items(), key=lambda item: item[1]['p99_ms'], reverse=True)
+            print(f"{Fore.CYAN}Endpoint Latency (slowest {min(rows, len(slowest))} by p99, ms):{Style.RESET_ALL}\n")
+            print(tabulate(
+                [[endpoint, stats['count'], stats['p50_ms'], stats['p90_ms'], stats['p99_ms'],
+                  stats['p999_ms'], stats['max_ms']] for endpoint, stats in slowest[:rows]],
+                headers=['Endpoint', 'Requests', 'p50', 'p90', 'p99', 'p999', 'Max'],
+                tablefmt='grid'
+            ))
+            print()
+
         # Detailed vulnerabilities
         if total_vulnerable > 0:
             print(f"\n{Fore.RED}{'='*70}")
@@ -118,7 +317,7 @@ class SecurityTestRunner:
 
             vuln_number = 1
             for suite_name, data in self.all_results.items():
-                vulnerable_tests = [r for r in data['results'] if r['success']]
+                vulnerable_tests = self.sink.summary.findings(suite_name)
 
                 if vulnerable_tests:
                     print(f"{Fore.YELLOW}[{suite_name}]{Style.RESET_ALL}")
@@ -146,7 +345,7 @@ class SecurityTestRunner:
             recommendations = []
 
             for suite_name, data in self.all_results.items():
-                vulnerable_tests = [r for r in data['results'] if r['success']]
+                vulnerable_tests = self.sink.summary.findings(suite_name)
 
                 if "Mass Assignment" in suite_name and vulnerable_tests:
                     recommendations.append("1. Remove sensitive fields from User model $fillable array")
@@ -165,9 +364,16 @@ class SecurityTestRunner:
             print()
 
     def save_results(self):
-        """Save results to JSON file"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'security_test_results_{timestamp}.json'
+        """
+        Close the run file and write the JSON report from it
+
+        The report is written one suite at a time, reading each suite's
+        results back from the run file, so no more than one suite's results
+        are ever in memory.
+        """
+        filename = self.report_path
+        self.sink.close(report=filename, execution=self.execution)
+        run = RunFile(self.sink.path)
 
         report = {
             'target': self.base_url,
@@ -178,74 +384,63 @@ class SecurityTestRunner:
                 'vulnerable': sum(suite['vulnerable_count'] for suite in self.all_results.values()),
                 'secure': sum(suite['total_count'] - suite['vulnerable_count'] for suite in self.all_results.values())
             },
-            'test_suites': self.all_results
+            'execution': self.execution,
+            'transport': get_transport().stats(),
+            'downloads': get_transport().downloads(),
+            'latency': LATENCY.snapshot(),
+            'cassette': get_cassette().report() if get_cassette() else None,
+            'credentials': CREDENTIAL_CACHE.report()
         }
 
-        with open(filename, 'w') as f:
-            json.dump(report, f, indent=2)
+        self.write_report(filename, report, run)
 
-        print(f"{Fore.GREEN}✓ Full report saved to: {filename}{Style.RESET_ALL}\n")
+        save_run(
+            self.base_url,
+            {name: run.results(name) for name in self.all_results},
+            started_at=datetime.fromtimestamp(self.start_time).isoformat(),
+            duration=report['duration'],
+            source=json_source(filename),
+            report_path=filename,
+            latency=report['latency']
+        )
 
-    def run_all_tests(self):
-        """Run all test suites"""
+        print(f"{Fore.GREEN}✓ Full report saved to: {filename}{Style.RESET_ALL}")
+        print(f"{Fore.GREEN}✓ Run log: {self.sink.path}{Style.RESET_ALL}\n")
+
+    def write_report(self, filename, report, run):
+        """Write report with test_suites appended suite by suite, results read back from run"""
+        with open(filename, 'w') as f:
+            f.write(json.dumps(report, indent=2)[:-2])   # leave the object open
+            f.write(',\n  "test_suites": {')
+            for number, (name, data) in enumerate(self.all_results.items()):
+                suite = json.dumps({**data, 'results': list(run.results(name))}, indent=2)
+                f.write(',' if number else '')
+                f.write(f"\n    {json.dumps(name)}: " + suite.replace('\n', '\n    '))
+            f.write('\n  }\n}\n')
+
+    def run_all_tests(self, suites=None):
+        """Run all test suites, or the given TEST_SUITES entries"""
+        suites = suites or TEST_SUITES
         self.start_time = time.time()
+        timestamp = datetime.fromtimestamp(self.start_time).strftime('%Y%m%d_%H%M%S')
+        self.report_path = f'security_test_results_{timestamp}.json'
+        # Every result is on disk as soon as it is logged, even if the run dies
+        self.sink = start_run(f'security_run_{timestamp}.jsonl', self.base_url, [spec[0] for spec in suites])
+        # A menu session runs several times in one process; each report counts only its own run
+        LATENCY.reset()
+        POOL_STATS.reset()
+        DOWNLOAD_STATS.reset()
+        get_pacer().reset_stats()
+        CREDENTIAL_CACHE.reset_stats()
         self.print_banner()
 
         try:
-            # Test Suite 1: Mass Assignment Vulnerabilities
-            mass_tester = MassAssignmentTester(self.base_url)
-            self.run_test_suite(
-                "Mass Assignment Vulnerabilities",
-                mass_tester,
-                mass_tester.run_all_tests,
-                self.test_email,
-                self.test_password
-            )
-
-            # Test Suite 2: Rate Limiting
-            rate_tester = RateLimitTester(self.base_url)
-            self.run_test_suite(
-                "Rate Limiting",
-                rate_tester,
-                rate_tester.run_all_tests
-            )
-
-            # Test Suite 3: Admin Authorization
-            admin_tester = AdminAuthTester(self.base_url)
-            self.run_test_suite(
-                "Admin Authorization",
-                admin_tester,
-                admin_tester.run_all_tests,
-                None  # Will create its own test account
-            )
-
-            # Test Suite 4: File Upload Security
-            file_tester = FileUploadTester(self.base_url)
-            self.run_test_suite(
-                "File Upload Security",
-                file_tester,
-                file_tester.run_all_tests
-            )
-
-            # Test Suite 5: Business Logic
-            business_tester = BusinessLogicTester(self.base_url)
-            self.run_test_suite(
-                "Business Logic",
-                business_tester,
-                business_tester.run_all_tests,
-                self.test_email,
-                self.test_password
-            )
-
-            # Test Suite 6: Configuration Security
-            config_tester = ConfigSecurityTester(self.base_url)
-            self.run_test_suite(
-                "Configuration Security",
-                config_tester,
-                config_tester.run_all_tests,
-                self.test_email,
-                self.test_password
-            )
+            if self.use_async:
+                asyncio.run(self.run_suites_async(suites))
+            elif self.parallel:
+                self.run_suites_parallel(suites)
+            else:
+                self.run_suites_sequential(suites)
 
         except KeyboardInterrupt:
             print(f"\n\n{Fore.YELLOW}Tests interrupted by user{Style.RESET_ALL}\n")
@@ -254,6 +449,14 @@ class SecurityTestRunner:
         finally:
             self.end_time = time.time()
 
+        # Report suites in their declared order, whatever order they finished in
+        order = [spec[0] for spec in TEST_SUITES]
+        self.all_results = dict(sorted(
+            self.all_results.items(),
+            key=lambda item: order.index(item[0]) if item[0] in order else len(order)
+        ))
+        self.record_execution()
+
         # Generate report
         self.generate_summary_report()
         self.save_results()
@@ -262,6 +465,24 @@ class SecurityTestRunner:
         total_vulnerable = sum(suite['vulnerable_count'] for suite in self.all_results.values())
         return 1 if total_vulnerable > 0 else 0
 
+    def record_execution(self):
+        """Record wall-clock time against summed suite time"""
+        wall_clock = self.end_time - self.start_time
+        suite_time = sum(suite['duration'] for suite in self.all_results.values())
+
+        if self.use_async:
+            mode = 'async'
+        else:
+            mode = 'parallel' if self.parallel else 'sequential'
+
+        self.execution = {
+            'mode': mode,
+            'workers': self.workers if self.parallel else 1,
+            'wall_clock': wall_clock,
+            'suite_time_total': suite_time,
+            'speedup': round(suite_time / wall_clock, 2) if wall_clock > 0 else 1.0
+        }
+
 def main():
     """Main entry point"""
     from dotenv import load_dotenv
@@ -274,17 +495,10 @@ def main():
     test_password = os.getenv('TEST_PASSWORD')
 
     # Parse command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['-h', '--help']:
-            print(f"""
-{Fore.CYAN}EvenLeads Security Test Suite{Style.RESET_ALL}
-
-Usage:
-  python run_all_tests.py [BASE_URL]
-
-Arguments:
-  BASE_URL    Target URL (default: from .env or https://evenleads.com)
-
+    parser = argparse.ArgumentParser(
+        description='EvenLeads Security Test Suite',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
 Environment Variables (.env file):
   BASE_URL         Target URL
   TEST_EMAIL       Test account email (optional)
@@ -293,27 +507,79 @@ Environment Variables (.env file):
 Examples:
   python run_all_tests.py
   python run_all_tests.py https://staging.evenleads.com
+  python run_all_tests.py --parallel --workers 6
+  python run_all_tests.py --async --per-host 20
+  python run_all_tests.py --record run.cassette
+  python run_all_tests.py --replay run.cassette
+  python run_all_tests.py --severity CRITICAL --endpoint /api/v1
+  python run_all_tests.py --tag auth --list
 
 Output:
   - Console: Detailed test results with colors
   - JSON: security_test_results_TIMESTAMP.json
-            """)
+  - Run log: security_run_TIMESTAMP.jsonl (streamed as results are logged)
+"""
+    )
+    parser.add_argument('base_url', nargs='?', default=base_url,
+                        help='Target URL (default: from .env or https://evenleads.com)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run suites concurrently; isolated suites still run alone')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Worker threads for --parallel (default: 4)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run suites on the asyncio probe engine')
+    parser.add_argument('--per-host', type=int, default=10,
+                        help='Concurrent requests per host for --async (default: 10)')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE', nargs='?', const=True,
+                                help='Record every request and response to a cassette file')
+    cassette_group.add_argument('--replay', metavar='CASSETTE', nargs='?', const=True,
+                                help='Serve responses from a recorded cassette; no network')
+    selection = parser.add_argument_group('suite selection (from the tester registry)')
+    selection.add_argument('--suite', action='append', metavar='NAME',
+                           help='Suite name, test file or module (repeatable)')
+    selection.add_argument('--severity', action='append', type=str.upper, choices=SEVERITIES,
+                           help='Only suites of this severity (repeatable)')
+    selection.add_argument('--tag', action='append', metavar='TAG', help='Only suites with this tag (repeatable)')
+    selection.add_argument('--endpoint', metavar='PREFIX', help='Only suites touching an endpoint under PREFIX')
+    selection.add_argument('--list', action='store_true', help='List the selected suites and exit')
+    args = parser.parse_args()
+    base_url = args.base_url
+
+    registry = get_registry()
+    selected = registry.query(severity=args.severity, tags=args.tag, endpoint=args.endpoint, names=args.suite)
+    if args.list or not selected:
+        rows = [[t.suite_name, t.severity, t.estimated_duration, 'yes' if t.isolated else '',
+                 ', '.join(t.tags)] for t in selected]
+        print(tabulate(rows, headers=['Suite', 'Severity', 'Est. (s)', 'Isolated', 'Tags'], tablefmt='simple')
+              if rows else f"{Fore.YELLOW}No suites match the selection{Style.RESET_ALL}")
+        return 0 if selected else 2
+
+    if args.record or args.replay:
+        path = args.record or args.replay
+        configure_cassette('record' if args.record else 'replay', None if path is True else path)
+    cassette = get_cassette()
+
+    # Replays never touch the target, so there is nothing to confirm
+    if cassette is None or not cassette.replaying:
+        print(f"\n{Fore.YELLOW}Target: {base_url}{Style.RESET_ALL}")
+        print(f"\nThis will run penetration tests against the target.")
+        confirm = input(f"Continue? (y/N): ")
+
+        if confirm.lower() != 'y':
+            print(f"\n{Fore.YELLOW}Tests cancelled{Style.RESET_ALL}\n")
             return 0
-        else:
-            base_url = sys.argv[1]
-
-    # Confirm before starting
-    print(f"\n{Fore.YELLOW}Target: {base_url}{Style.RESET_ALL}")
-    print(f"\nThis will run penetration tests against the target.")
-    confirm = input(f"Continue? (y/N): ")
-
-    if confirm.lower() != 'y':
-        print(f"\n{Fore.YELLOW}Tests cancelled{Style.RESET_ALL}\n")
-        return 0
 
     # Run tests
-    runner = SecurityTestRunner(base_url, test_email, test_password)
-    exit_code = runner.run_all_tests()
+    runner = SecurityTestRunner(
+        base_url, test_email, test_password,
+        parallel=args.parallel, workers=args.workers,
+        use_async=args.use_async, per_host_limit=args.per_host
+    )
+    exit_code = runner.run_all_tests(registry.specs(selected))
+
+    if cassette is not None:
+        cassette.close()
 
     return exit_code
 
@@ -6,9 +6,95 @@ Allows using existing browser sessions instead of programmatic login
 
 import os
 import json
-import requests
+import time
+import threading
 from colorama import Fore, Style
 
+from http_transport import get_transport
+
+class CredentialCache:
+    """
+    Process-wide token cache shared by every SessionManager
+
+    Entries are keyed by (target, account) and expire when the login
+    response says so (expires_in / expires_at) or after TOKEN_TTL seconds
+    if that is set. Expired or rejected tokens are dropped and replaced by
+    a fresh login the next time they are asked for.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'logins': 0,
+            'logins_avoided': 0,
+            'registrations': 0,
+            'registrations_avoided': 0,
+            'expired': 0,
+            'invalidated': 0,
+        }
+
+    def lock_for(self, key):
+        """Per-key lock so concurrent suites don't log in twice"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+                del self._entries[key]
+                self.stats['expired'] += 1
+                return None
+            return entry
+
+    def put(self, key, token, expires_at=None, **extra):
+        with self._lock:
+            self._entries[key] = {'token': token, 'expires_at': expires_at, **extra}
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats['invalidated'] += 1
+
+    def record(self, counter):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def report(self):
+        with self._lock:
+            return {**self.stats, 'cached_accounts': len(self._entries)}
+
+    def reset_stats(self):
+        """Zero the counters; cached tokens stay valid for the next run"""
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+
+CREDENTIAL_CACHE = CredentialCache()
+
+
+def token_expiry(payload):
+    """Absolute expiry time for a login response, or None if it never expires"""
+    if isinstance(payload, dict):
+        if payload.get('expires_in'):
+            try:
+                return time.time() + float(payload['expires_in'])
+            except (TypeError, ValueError):
+                pass
+        if payload.get('expires_at'):
+            try:
+                return float(payload['expires_at'])
+            except (TypeError, ValueError):
+                pass
+
+    ttl = os.getenv('TOKEN_TTL')
+    return time.time() + float(ttl) if ttl else None
+
+
 class SessionManager:
     """
     Manages authentication sessions for security tests
@@ -23,6 +109,9 @@ class SessionManager:
         self.use_existing_session = os.getenv('ACCOUNT_EXISTING', 'false').lower() == 'true'
         self.session_cookies = None
         self.api_token = None
+        self.http = get_transport()
+        # Logins and registrations actually sent; cache hits send nothing
+        self.requests_sent = 0
 
         if self.use_existing_session:
             self._load_existing_session()
@@ -70,10 +159,13 @@ class SessionManager:
         """
         Get a requests session with authentication
 
+        The session keeps its own cookies but draws connections from the
+        shared transport pools.
+
         Returns:
             tuple: (session, auth_type) where auth_type is 'cookies', 'token', or None
         """
-        session = requests.Session()
+        session = self.http.new_session()
 
         if self.use_existing_session:
             if self.session_cookies:
@@ -116,8 +208,37 @@ class SessionManager:
         if not email or not password:
             return (False, None, "Email and password required for login")
 
+        return self.get_api_token(email, password)
+
+    def get_api_token(self, email, password):
+        """
+        API token for an account, from the credential cache when possible
+
+        Returns:
+            tuple: (success, token, message)
+        """
+        if self.use_existing_session and self.api_token:
+            return (True, self.api_token, "Using existing API token")
+
+        key = (self.base_url, email.lower())
+        with CREDENTIAL_CACHE.lock_for(key):
+            entry = CREDENTIAL_CACHE.get(key)
+            if entry:
+                CREDENTIAL_CACHE.record('logins_avoided')
+                self.api_token = entry['token']
+                return (True, entry['token'], "Using cached token")
+
+            success, token, message = self._login(email, password)
+            if success:
+                self.api_token = token
+            return (success, token, message)
+
+    def _login(self, email, password):
+        """POST /api/auth/login and cache the token"""
         try:
-            response = requests.post(
+            CREDENTIAL_CACHE.record('logins')
+            self.requests_sent += 1
+            response = self.http.post(
                 f"{self.base_url}/api/auth/login",
                 json={"email": email, "password": password},
                 headers={'Content-Type': 'application/json'},
@@ -128,19 +249,67 @@ class SessionManager:
                 return (False, None, f"Login failed: {response.status_code}")
 
             try:
-                token = response.json().get('token') or response.json().get('access_token')
+                payload = response.json()
+                token = payload.get('token') or payload.get('access_token')
             except:
                 return (False, None, "Could not extract token from response")
 
             if not token:
                 return (False, None, "No token in login response")
 
-            self.api_token = token
+            CREDENTIAL_CACHE.put((self.base_url, email.lower()), token, token_expiry(payload))
             return (True, token, "Login successful")
 
         except Exception as e:
             return (False, None, f"Login error: {str(e)}")
 
+    def register_test_account(self, label, name, email_prefix, password="Password123"):
+        """
+        Register a throwaway account once per target and reuse it
+
+        Returns:
+            tuple: (success, token, email, message)
+        """
+        key = (self.base_url, f"registered:{label}")
+        with CREDENTIAL_CACHE.lock_for(key):
+            entry = CREDENTIAL_CACHE.get(key)
+            if entry:
+                success, token, message = self.get_api_token(entry['email'], entry['password'])
+                if success:
+                    CREDENTIAL_CACHE.record('registrations_avoided')
+                    return (True, token, entry['email'], "Reusing test account from this run")
+                CREDENTIAL_CACHE.invalidate(key)
+
+            email = f"{email_prefix}-{int(time.time())}@example.com"
+            try:
+                CREDENTIAL_CACHE.record('registrations')
+                self.requests_sent += 1
+                reg_response = self.http.post(
+                    f"{self.base_url}/register",
+                    json={
+                        "name": name,
+                        "email": email,
+                        "password": password,
+                        "password_confirmation": password
+                    },
+                    headers={'Content-Type': 'application/json'},
+                    timeout=10
+                )
+            except Exception as e:
+                return (False, None, email, f"Registration error: {str(e)}")
+
+            success, token, message = self._login(email, password)
+            if not success:
+                return (False, None, email, f"Registration status {reg_response.status_code}; {message}")
+
+            CREDENTIAL_CACHE.put(key, token, email=email, password=password)
+            return (True, token, email, f"Registered (status {reg_response.status_code})")
+
+    def invalidate_token(self, email):
+        """Drop a cached token the server rejected; the next call logs in again"""
+        CREDENTIAL_CACHE.invalidate((self.base_url, email.lower()))
+        self.api_token = None
+
     def make_authenticated_request(self, method, url, **kwargs):
         """
         Make an authenticated HTTP request
@@ -153,19 +322,22 @@ class SessionManager:
         Returns:
             requests.Response object
         """
-        session, auth_type = self.get_authenticated_session()
-
         # Add auth headers if using token
         if 'headers' not in kwargs:
             kwargs['headers'] = {}
         kwargs['headers'].update(self.get_auth_headers())
 
+        # Send session cookies explicitly; the shared transport never stores any
+        cookies = self.get_cookies()
+        if cookies:
+            kwargs['cookies'] = {**cookies, **kwargs.get('cookies', {})}
+
         # Add timeout if not specified
         if 'timeout' not in kwargs:
             kwargs['timeout'] = 10
 
         # Make request
-        return session.request(method, url, **kwargs)
+        return self.http.request(method.upper(), url, **kwargs)
 
     def is_using_existing_session(self):
         """Check if using existing session mode"""
@@ -7,11 +7,16 @@ One-stop interface for all security testing needs
 import sys
 import os
 import json
+import importlib
+import importlib.util
 import subprocess
 import time
 from datetime import datetime
 from pathlib import Path
 
+from results_store import DEFAULT_PATH as DEFAULT_RESULTS_DB, ResultsStore
+from tester_registry import get_registry
+
 # Check if colorama is available, if not, provide minimal fallback
 try:
     from colorama import Fore, Style, init
@@ -25,12 +30,28 @@ except ImportError:
     class Style:
         RESET_ALL = BRIGHT = ''
 
+# Map package names to import names
+REQUIRED_PACKAGES = {
+    'requests': 'requests',
+    'colorama': 'colorama',
+    'tabulate': 'tabulate',
+    'python-dotenv': 'dotenv'  # Package name vs import name
+}
+
 class SecurityTestMenu:
-    def __init__(self):
+    def __init__(self, isolate=None):
         self.base_dir = Path(__file__).parent
         self.tests_dir = self.base_dir / 'tests'
         self.env_file = self.base_dir / '.env'
         self.config = self.load_config()
+        self._missing = None
+        self._missing_signature = None
+        # By default suites run in this process through SecurityTestRunner,
+        # sharing a warm interpreter and connection pool; isolation runs each
+        # test file in its own python process instead
+        if isolate is None:
+            isolate = self.config.get('ISOLATE_SUITES', os.getenv('ISOLATE_SUITES', 'false')).lower() == 'true'
+        self.isolate = isolate
 
     def load_config(self):
         """Load configuration from .env file"""
@@ -72,24 +93,31 @@ class SecurityTestMenu:
         print(f"{'='*70}")
         print(f"{'='*70}{Style.RESET_ALL}\n")
 
-    def check_dependencies(self):
-        """Check if required dependencies are installed"""
-        # Map package names to import names
-        required = {
-            'requests': 'requests',
-            'colorama': 'colorama',
-            'tabulate': 'tabulate',
-            'python-dotenv': 'dotenv'  # Package name vs import name
-        }
-        missing = []
-
-        for package, import_name in required.items():
+    def _path_signature(self):
+        """Modification times of the import path; any pip install changes one"""
+        signature = []
+        for entry in sys.path:
             try:
-                __import__(import_name)
-            except ImportError:
-                missing.append(package)
-
-        return missing
+                signature.append(os.stat(entry or '.').st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def check_dependencies(self, refresh=False):
+        """
+        Check if required dependencies are installed
+
+        Packages are located with find_spec rather than imported, and the
+        answer is cached until the import path changes (an install, here or
+        in another terminal) or refresh is set.
+        """
+        signature = self._path_signature()
+        if refresh or self._missing is None or signature != self._missing_signature:
+            importlib.invalidate_caches()
+            self._missing = [package for package, import_name in REQUIRED_PACKAGES.items()
+                             if importlib.util.find_spec(import_name) is None]
+            self._missing_signature = signature
+        return list(self._missing)
 
     def install_dependencies(self):
         """Install required dependencies"""
@@ -162,7 +190,7 @@ class SecurityTestMenu:
             print(f"{Fore.CYAN}Verifying installation...{Style.RESET_ALL}\n")
 
             # Re-check
-            still_missing = self.check_dependencies()
+            still_missing = self.check_dependencies(refresh=True)
             if still_missing:
                 print(f"{Fore.YELLOW}Still missing: {', '.join(still_missing)}{Style.RESET_ALL}")
                 print(f"\nYou may need to restart the terminal or use:\n")
@@ -243,6 +271,67 @@ class SecurityTestMenu:
         else:
             return self.configure_settings()
 
+    def option_env(self):
+        """Settings the testers will see: .env values, overridden by the environment"""
+        return {**self.config, **os.environ}
+
+    def test_env(self):
+        """Environment for test subprocesses"""
+        env = os.environ.copy()
+        env.update({
+            'BASE_URL': self.config['BASE_URL'],
+            'TEST_EMAIL': self.config.get('TEST_EMAIL', ''),
+            'TEST_PASSWORD': self.config.get('TEST_PASSWORD', ''),
+        })
+        return env
+
+    def run_test_file(self, test_file):
+        """Run one test file in its own python process; returns its exit code"""
+        result = subprocess.run(
+            [sys.executable, str(self.tests_dir / test_file)],
+            env=self.test_env(),
+            cwd=str(self.base_dir)
+        )
+        return result.returncode
+
+    def run_in_process(self, testers=None):
+        """
+        Run registry testers (default: all) in this process through
+        SecurityTestRunner, with its summary report; returns its exit code
+        """
+        from dotenv import load_dotenv
+
+        os.chdir(self.base_dir)
+        os.environ.update({key: value for key, value in self.test_env().items()
+                           if key in ('BASE_URL', 'TEST_EMAIL', 'TEST_PASSWORD')})
+        # Before the import: modules such as latency read their settings when loaded
+        load_dotenv(self.env_file)
+        from run_all_tests import SecurityTestRunner
+
+        runner = SecurityTestRunner(
+            self.config['BASE_URL'],
+            self.config.get('TEST_EMAIL') or None,
+            self.config.get('TEST_PASSWORD') or None
+        )
+        return runner.run_all_tests(get_registry().specs(testers) if testers else None)
+
+    def run_testers(self, testers):
+        """Run registry testers in-process, or one subprocess per test file when isolated"""
+        if not self.isolate:
+            try:
+                return self.run_in_process(testers)
+            except Exception as e:
+                print(f"\n{Fore.RED}Error running tests: {e}{Style.RESET_ALL}")
+                return 1
+
+        exit_code = 0
+        for tester in testers:
+            print(f"{Fore.YELLOW}Running {tester.file}...{Style.RESET_ALL}\n")
+            print("-" * 70)
+            exit_code = max(exit_code, self.run_test_file(tester.file))
+            print("\n" + "=" * 70 + "\n")
+        return exit_code
+
     def select_tests(self):
         """Interactive test selection"""
         self.clear_screen()
@@ -250,62 +339,20 @@ class SecurityTestMenu:
 
         print(f"{Fore.CYAN}Select Tests to Run{Style.RESET_ALL}\n")
 
-        tests = [
-            {
-                'name': 'Mass Assignment Tests',
-                'file': 'test_mass_assignment.py',
-                'count': 5,
-                'severity': 'CRITICAL',
-                'desc': 'Admin escalation, bypass flags, trial manipulation'
-            },
-            {
-                'name': 'Rate Limiting Tests',
-                'file': 'test_rate_limiting.py',
-                'count': 4,
-                'severity': 'HIGH',
-                'desc': 'Brute force protection, token enumeration'
-            },
-            {
-                'name': 'Admin Authorization Tests',
-                'file': 'test_admin_authorization.py',
-                'count': 3,
-                'severity': 'CRITICAL',
-                'desc': 'Plugin upload RCE, admin endpoint access'
-            },
-            {
-                'name': 'File Upload Tests',
-                'file': 'test_file_upload.py',
-                'count': 5,
-                'severity': 'CRITICAL',
-                'desc': 'PHP shells, XSS, malware upload'
-            },
-            {
-                'name': 'Business Logic Tests',
-                'file': 'test_business_logic.py',
-                'count': 3,
-                'severity': 'HIGH',
-                'desc': 'Cache bypass, organization role manipulation'
-            },
-            {
-                'name': 'Configuration Security Tests',
-                'file': 'test_config_security.py',
-                'count': 5,
-                'severity': 'MEDIUM',
-                'desc': 'Credentials exposure, debug mode, headers'
-            }
-        ]
+        tests = list(get_registry())
 
         for i, test in enumerate(tests, 1):
-            severity_color = Fore.RED if test['severity'] == 'CRITICAL' else (Fore.YELLOW if test['severity'] == 'HIGH' else Fore.CYAN)
-            print(f"  {i}. {test['name']}")
-            print(f"     {Fore.WHITE}({test['count']} tests | {severity_color}{test['severity']}{Style.RESET_ALL})")
-            print(f"     {Fore.WHITE}{test['desc']}{Style.RESET_ALL}\n")
+            severity_color = Fore.RED if test.severity == 'CRITICAL' else (Fore.YELLOW if test.severity == 'HIGH' else Fore.CYAN)
+            print(f"  {i}. {test.suite_name}")
+            print(f"     {Fore.WHITE}({test.planned_tests(self.option_env())} tests | ~{test.estimated_duration}s | {severity_color}{test.severity}{Style.RESET_ALL})")
+            print(f"     {Fore.WHITE}{test.description}{Style.RESET_ALL}\n")
 
         print(f"{Fore.CYAN}Options:{Style.RESET_ALL}")
         print(f"  1-{len(tests)}) Run specific test suite")
         print(f"  a) Run ALL tests (recommended)")
         print(f"  c) Run CRITICAL only")
-        print(f"  h) Run HIGH priority only")
+        print(f"  h) Run HIGH and MEDIUM priority")
+        print(f"  i) Toggle suite isolation (now: {'one process per file' if self.isolate else 'in-process'})")
         print(f"  r) Return to main menu")
 
         choice = input(f"\n{Fore.GREEN}Select option: {Style.RESET_ALL}").strip().lower()
@@ -316,6 +363,9 @@ class SecurityTestMenu:
             return self.run_critical_tests()
         elif choice == 'h':
             return self.run_high_tests()
+        elif choice == 'i':
+            self.isolate = not self.isolate
+            return self.select_tests()
         elif choice == 'r':
             return
         elif choice.isdigit() and 1 <= int(choice) <= len(tests):
@@ -331,33 +381,20 @@ class SecurityTestMenu:
         self.clear_screen()
         self.print_banner()
 
-        print(f"{Fore.CYAN}Running: {test_info['name']}{Style.RESET_ALL}\n")
-        print(f"File: {test_info['file']}")
-        print(f"Tests: {test_info['count']}")
-        print(f"Severity: {test_info['severity']}\n")
+        print(f"{Fore.CYAN}Running: {test_info.suite_name}{Style.RESET_ALL}\n")
+        print(f"File: {test_info.file}")
+        print(f"Tests: {test_info.planned_tests(self.option_env())}")
+        print(f"Severity: {test_info.severity}\n")
 
         print(f"{Fore.YELLOW}Starting test...{Style.RESET_ALL}\n")
         print("=" * 70 + "\n")
 
         try:
-            # Set environment variables
-            env = os.environ.copy()
-            env.update({
-                'BASE_URL': self.config['BASE_URL'],
-                'TEST_EMAIL': self.config.get('TEST_EMAIL', ''),
-                'TEST_PASSWORD': self.config.get('TEST_PASSWORD', ''),
-            })
-
-            # Run test
-            result = subprocess.run(
-                [sys.executable, str(self.tests_dir / test_info['file'])],
-                env=env,
-                cwd=str(self.base_dir)
-            )
+            exit_code = self.run_testers([test_info])
 
             print("\n" + "=" * 70)
             print(f"\n{Fore.GREEN}Test completed!{Style.RESET_ALL}")
-            print(f"Exit code: {result.returncode}")
+            print(f"Exit code: {exit_code}")
 
         except Exception as e:
             print(f"\n{Fore.RED}Error running test: {e}{Style.RESET_ALL}")
@@ -382,7 +419,9 @@ class SecurityTestMenu:
 
         print(f"{Fore.YELLOW}Running ALL Security Tests{Style.RESET_ALL}\n")
         print(f"Target: {Fore.CYAN}{self.config['BASE_URL']}{Style.RESET_ALL}")
-        print(f"Total: 6 test suites, 25 tests\n")
+        testers = list(get_registry())
+        env = self.option_env()
+        print(f"Total: {len(testers)} test suites, {sum(t.planned_tests(env) or 0 for t in testers)} tests\n")
 
         confirm = input(f"Continue? (y/N): ").strip().lower()
 
@@ -393,20 +432,15 @@ class SecurityTestMenu:
         print("=" * 70 + "\n")
 
         try:
-            # Set environment variables
-            env = os.environ.copy()
-            env.update({
-                'BASE_URL': self.config['BASE_URL'],
-                'TEST_EMAIL': self.config.get('TEST_EMAIL', ''),
-                'TEST_PASSWORD': self.config.get('TEST_PASSWORD', ''),
-            })
-
-            # Run main test runner
-            result = subprocess.run(
-                [sys.executable, 'run_all_tests.py'],
-                env=env,
-                cwd=str(self.base_dir)
-            )
+            if self.isolate:
+                # Run main test runner
+                subprocess.run(
+                    [sys.executable, 'run_all_tests.py'],
+                    env=self.test_env(),
+                    cwd=str(self.base_dir)
+                )
+            else:
+                self.run_in_process()
 
             print("\n" + "=" * 70)
             print(f"\n{Fore.GREEN}All tests completed!{Style.RESET_ALL}")
@@ -423,122 +457,165 @@ class SecurityTestMenu:
 
         print(f"{Fore.RED}Running CRITICAL Tests Only{Style.RESET_ALL}\n")
 
-        critical_tests = [
-            'test_mass_assignment.py',
-            'test_file_upload.py',
-            'test_admin_authorization.py'
-        ]
-
-        for test_file in critical_tests:
-            print(f"{Fore.YELLOW}Running {test_file}...{Style.RESET_ALL}\n")
-            print("-" * 70)
-
-            env = os.environ.copy()
-            env.update({
-                'BASE_URL': self.config['BASE_URL'],
-                'TEST_EMAIL': self.config.get('TEST_EMAIL', ''),
-                'TEST_PASSWORD': self.config.get('TEST_PASSWORD', ''),
-            })
-
-            subprocess.run(
-                [sys.executable, str(self.tests_dir / test_file)],
-                env=env,
-                cwd=str(self.base_dir)
-            )
-
-            print("\n" + "=" * 70 + "\n")
-            time.sleep(1)
+        self.run_testers(get_registry().query(severity='CRITICAL'))
 
         input("\nPress Enter to continue...")
 
     def run_high_tests(self):
-        """Run only HIGH severity tests"""
+        """Run HIGH and MEDIUM severity tests"""
         self.clear_screen()
         self.print_banner()
 
-        print(f"{Fore.YELLOW}Running HIGH Priority Tests{Style.RESET_ALL}\n")
+        print(f"{Fore.YELLOW}Running HIGH and MEDIUM Priority Tests{Style.RESET_ALL}\n")
 
-        high_tests = [
-            'test_rate_limiting.py',
-            'test_business_logic.py',
-            'test_config_security.py'
-        ]
-
-        for test_file in high_tests:
-            print(f"{Fore.YELLOW}Running {test_file}...{Style.RESET_ALL}\n")
-            print("-" * 70)
-
-            env = os.environ.copy()
-            env.update({
-                'BASE_URL': self.config['BASE_URL'],
-                'TEST_EMAIL': self.config.get('TEST_EMAIL', ''),
-                'TEST_PASSWORD': self.config.get('TEST_PASSWORD', ''),
-            })
-
-            subprocess.run(
-                [sys.executable, str(self.tests_dir / test_file)],
-                env=env,
-                cwd=str(self.base_dir)
-            )
-
-            print("\n" + "=" * 70 + "\n")
-            time.sleep(1)
+        self.run_testers(get_registry().query(severity=('HIGH', 'MEDIUM')))
 
         input("\nPress Enter to continue...")
 
-    def view_results(self):
-        """View test results"""
+    def view_results(self, page=1, per_page=10):
+        """View test results from the results store, a page of runs at a time"""
         self.clear_screen()
         self.print_banner()
 
         print(f"{Fore.CYAN}Test Results{Style.RESET_ALL}\n")
 
-        # Find all result JSON files
-        result_files = list(self.base_dir.glob('results_*.json'))
-        result_files += list(self.base_dir.glob('security_test_results_*.json'))
+        store = ResultsStore(os.getenv('RESULTS_DB') or str(self.base_dir / DEFAULT_RESULTS_DB))
+        try:
+            # Reports written before the store existed are imported once
+            imported = store.ensure_imported(str(self.base_dir))
+            if imported and imported[0]:
+                print(f"{Fore.GREEN}✓ Imported {imported[0]} existing JSON result file(s){Style.RESET_ALL}\n")
+
+            total = store.count_runs()
+            if not total:
+                print(f"{Fore.YELLOW}No results found.{Style.RESET_ALL}")
+                print(f"Run some tests first!\n")
+                input("Press Enter to continue...")
+                return
+
+            pages = -(-total // per_page)
+            page = min(max(page, 1), pages)
+            runs = store.runs(per_page, (page - 1) * per_page)
+
+            print(f"{total} run(s), page {page} of {pages}:\n")
+            for i, run in enumerate(runs, 1):
+                status = f"{Fore.RED}{run['vulnerable']} vulnerable" if run['vulnerable'] else f"{Fore.GREEN}all secure"
+                print(f"  {i}. {run['started_at'][:19].replace('T', ' ')}  {run['target']}")
+                print(f"     {Fore.WHITE}{run['suites']} suite(s) | {run['total']} tests | {status}{Style.RESET_ALL}\n")
+
+            print(f"{Fore.CYAN}Options:{Style.RESET_ALL}")
+            print(f"  1-{len(runs)}) View specific run")
+            if page < pages:
+                print(f"  n) Next page")
+            if page > 1:
+                print(f"  p) Previous page")
+            print(f"  l) Latest verdict per test")
+            print(f"  i) Import JSON result files")
+            print(f"  d) Delete all results")
+            print(f"  r) Return to menu")
+
+            choice = input(f"\n{Fore.GREEN}Select option: {Style.RESET_ALL}").strip().lower()
+
+            if choice == 'n' and page < pages:
+                return self.view_results(page + 1, per_page)
+            elif choice == 'p' and page > 1:
+                return self.view_results(page - 1, per_page)
+            elif choice == 'l':
+                self.display_latest_verdicts(store)
+            elif choice == 'i':
+                imported, skipped = store.import_directory(str(self.base_dir))
+                print(f"\n{Fore.GREEN}✓ Imported {imported} file(s), {skipped} already stored{Style.RESET_ALL}")
+                time.sleep(1)
+            elif choice == 'd':
+                confirm = input(f"\n{Fore.RED}Delete all results, JSON result files and run logs? (y/N): {Style.RESET_ALL}").strip().lower()
+                if confirm == 'y':
+                    store.clear()
+                    for pattern in ('results_*.json', 'security_test_results_*.json', 'security_run_*.jsonl'):
+                        for file in self.base_dir.glob(pattern):
+                            file.unlink()
+                    print(f"\n{Fore.GREEN}✓ All results deleted{Style.RESET_ALL}")
+                    time.sleep(1)
+                return
+            elif choice == 'r':
+                return
+            elif choice.isdigit() and 1 <= int(choice) <= len(runs):
+                self.display_run(store, runs[int(choice) - 1])
+            else:
+                return self.view_results(page, per_page)
+        finally:
+            store.close()
+        return self.view_results(page, per_page)
 
-        if not result_files:
-            print(f"{Fore.YELLOW}No result files found.{Style.RESET_ALL}")
-            print(f"Run some tests first!\n")
-            input("Press Enter to continue...")
-            return
+    def display_run(self, store, run):
+        """Display one stored run's results"""
+        self.clear_screen()
+        self.print_banner()
 
-        # Sort by modification time (newest first)
-        result_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        print(f"{Fore.CYAN}Run #{run['id']}{Style.RESET_ALL}\n")
+        print(f"Target: {run['target']}")
+        print(f"Timestamp: {run['started_at']}")
+        if run['duration'] is not None:
+            print(f"Duration: {run['duration']:.2f}s")
+        if run['report_path']:
+            print(f"Report: {run['report_path']}")
+
+        print(f"\n{Fore.CYAN}Summary:{Style.RESET_ALL}")
+        print(f"  Total Tests: {run['total']}")
+        print(f"  Vulnerable: {Fore.RED}{run['vulnerable']}{Style.RESET_ALL}")
+        print(f"  Secure: {Fore.GREEN}{run['total'] - run['vulnerable']}{Style.RESET_ALL}\n")
+
+        suite = None
+        for result in store.run_results(run['id']):
+            if result['suite'] != suite:
+                suite = result['suite']
+                print(f"{Fore.CYAN}{suite}:{Style.RESET_ALL}")
+            color = Fore.RED if result['verdict'] == 'VULNERABLE' else Fore.GREEN
+            print(f"  [{color}{result['verdict']}{Style.RESET_ALL}] {result['test']}")
+            if result['verdict'] == 'VULNERABLE':
+                print(f"     {Fore.WHITE}{result['details']}{Style.RESET_ALL}")
 
-        print(f"Found {len(result_files)} result file(s):\n")
+        print("\n" + "=" * 70)
+        options = []
+        previous = store.runs_before(run['id'])
+        if previous:
+            options.append(f"c) Compare with run #{previous[0]['id']}")
+        report = self.base_dir / run['report_path'] if run['report_path'] else None
+        if report and report.suffix == '.json' and report.exists():
+            options.append("j) View JSON report")
+        choice = input(f"\n{', '.join(options + ['Enter to continue'])}: ").strip().lower()
+        if choice == 'c' and previous:
+            self.display_run_diff(store, run['id'], previous[0]['id'])
+        elif choice == 'j' and 'j) View JSON report' in options:
+            self.display_result_file(report)
+
+    def display_run_diff(self, store, head_id, base_id):
+        """Display verdict flips and latency shifts between two stored runs"""
+        from results_diff import diff_runs, print_diff
+
+        self.clear_screen()
+        self.print_banner()
+        print_diff(diff_runs(store, head_id, base_id))
+        print("=" * 70)
+        input("\nPress Enter to continue...")
 
-        for i, file in enumerate(result_files, 1):
-            mod_time = datetime.fromtimestamp(file.stat().st_mtime)
-            size = file.stat().st_size
-            print(f"  {i}. {file.name}")
-            print(f"     {Fore.WHITE}Modified: {mod_time.strftime('%Y-%m-%d %H:%M:%S')} | Size: {size} bytes{Style.RESET_ALL}\n")
+    def display_latest_verdicts(self, store):
+        """Display the newest verdict of every test, per target"""
+        self.clear_screen()
+        self.print_banner()
 
-        print(f"{Fore.CYAN}Options:{Style.RESET_ALL}")
-        print(f"  1-{len(result_files)}) View specific result")
-        print(f"  l) View latest result")
-        print(f"  d) Delete all results")
-        print(f"  r) Return to menu")
+        print(f"{Fore.CYAN}Latest Verdict per Test{Style.RESET_ALL}\n")
 
-        choice = input(f"\n{Fore.GREEN}Select option: {Style.RESET_ALL}").strip().lower()
+        target = None
+        for row in store.latest_verdicts():
+            if row['target'] != target:
+                target = row['target']
+                print(f"{Fore.YELLOW}{target}{Style.RESET_ALL}")
+            color = Fore.RED if row['verdict'] == 'VULNERABLE' else Fore.GREEN
+            print(f"  [{color}{row['verdict']}{Style.RESET_ALL}] {row['suite']} / {row['test']} "
+                  f"{Fore.WHITE}({row['timestamp'][:10]}){Style.RESET_ALL}")
 
-        if choice == 'l' and result_files:
-            self.display_result_file(result_files[0])
-        elif choice == 'd':
-            confirm = input(f"\n{Fore.RED}Delete all result files? (y/N): {Style.RESET_ALL}").strip().lower()
-            if confirm == 'y':
-                for file in result_files:
-                    file.unlink()
-                print(f"\n{Fore.GREEN}✓ All results deleted{Style.RESET_ALL}")
-                time.sleep(1)
-            return
-        elif choice == 'r':
-            return
-        elif choice.isdigit() and 1 <= int(choice) <= len(result_files):
-            idx = int(choice) - 1
-            self.display_result_file(result_files[idx])
-        else:
-            return self.view_results()
+        print("\n" + "=" * 70)
+        input("\nPress Enter to continue...")
 
     def display_result_file(self, file_path):
         """Display content of a result file"""
@@ -817,7 +894,7 @@ class SecurityTestMenu:
 def main():
     """Main entry point"""
     try:
-        menu = SecurityTestMenu()
+        menu = SecurityTestMenu(isolate=True if '--isolate' in sys.argv[1:] else None)
         menu.main_menu()
     except KeyboardInterrupt:
         print(f"\n\n{Fore.YELLOW}Interrupted by user{Style.RESET_ALL}\n")
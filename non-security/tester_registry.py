@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Tester Registry for Security Tests
+Reads the metadata each tester class declares (suite name, severity, tags,
+estimated duration, isolation, endpoints) straight from tests/test_*.py
+without importing them, caches it on disk, and answers selection queries
+such as "CRITICAL suites touching /api/v1"
+"""
+
+import ast
+import importlib
+import json
+import os
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TESTS_DIR = os.path.join(BASE_DIR, 'tests')
+CACHE_PATH = os.path.join(BASE_DIR, '.tester_registry.json')
+
+# Bump when the metadata read changes so stale caches are rebuilt
+REGISTRY_VERSION = 2
+
+SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+
+# Class attributes read as metadata, with their defaults
+METADATA = {
+    'suite_name': None,
+    'order': 100,
+    'severity': 'MEDIUM',
+    'tags': (),
+    'test_count': None,
+    'optional_tests': {},   # env switch -> tests it adds to test_count
+    'estimated_duration': 30,
+    'run_args': None,
+    'isolated': False,
+    'description': '',
+    'endpoints': (),
+}
+
+
+def read_testers(path):
+    """Metadata of every class in a test file that declares a suite_name"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    module = os.path.splitext(os.path.basename(path))[0]
+    testers = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        values = {}
+        for statement in node.body:
+            if not isinstance(statement, ast.Assign) or len(statement.targets) != 1:
+                continue
+            target = statement.targets[0]
+            if isinstance(target, ast.Name) and target.id in METADATA:
+                try:
+                    values[target.id] = ast.literal_eval(statement.value)
+                except ValueError:
+                    continue   # computed at import time; not usable as metadata
+        if values.get('suite_name'):
+            testers.append({
+                **METADATA,
+                **{key: list(value) if isinstance(value, tuple) else value for key, value in values.items()},
+                'module': module,
+                'class_name': node.name,
+                'file': os.path.basename(path),
+            })
+    return testers
+
+
+class TesterInfo:
+    """One registered tester"""
+
+    def __init__(self, data):
+        self.data = data
+        for key in METADATA:
+            setattr(self, key, data[key])
+        self.module = data['module']
+        self.class_name = data['class_name']
+        self.file = data['file']
+
+    def __repr__(self):
+        return f"<TesterInfo {self.suite_name} ({self.tester})>"
+
+    @property
+    def tester(self):
+        """'module:Class', as used in run_all_tests.TEST_SUITES"""
+        return f"{self.module}:{self.class_name}"
+
+    @property
+    def spec(self):
+        """(suite name, tester, run_all_tests argument kind)"""
+        return (self.suite_name, self.tester, self.run_args)
+
+    def load(self):
+        """Import the tester class"""
+        if TESTS_DIR not in sys.path:
+            sys.path.insert(0, TESTS_DIR)
+        return getattr(importlib.import_module(self.module), self.class_name)
+
+    def planned_tests(self, env=None):
+        """test_count plus the optional tests switched on in env (default os.environ)"""
+        if self.test_count is None:
+            return None
+        env = os.environ if env is None else env
+        return self.test_count + sum(count for switch, count in self.optional_tests.items()
+                                     if str(env.get(switch, '')).lower() in ('1', 'true', 'yes'))
+
+    def touches(self, prefix):
+        return any(endpoint.startswith(prefix) for endpoint in self.endpoints)
+
+
+class TesterRegistry:
+    """Registered testers in suite order, queryable by their metadata"""
+
+    def __init__(self, testers, built=False):
+        self.testers = sorted((TesterInfo(data) for data in testers), key=lambda t: (t.order, t.suite_name))
+        self.built = built   # True when this load re-read the test files
+
+    def __len__(self):
+        return len(self.testers)
+
+    def __iter__(self):
+        return iter(self.testers)
+
+    def get(self, key):
+        """A tester by suite name, file name, module or 'module:Class'"""
+        for tester in self.testers:
+            if key in (tester.suite_name, tester.file, tester.module, tester.tester):
+                return tester
+        return None
+
+    def query(self, severity=None, tags=None, endpoint=None, names=None, isolated=None):
+        """
+        Testers matching every given filter
+
+        severity is one level or several; tags must all be present; endpoint
+        is a path prefix matched against the declared endpoints; names are
+        anything get() accepts.
+        """
+        if isinstance(severity, str):
+            severity = [severity]
+        severity = {level.upper() for level in severity} if severity else None
+        wanted = {self.get(name) for name in names} if names else None
+
+        matches = []
+        for tester in self.testers:
+            if severity and tester.severity.upper() not in severity:
+                continue
+            if tags and not set(tags).issubset(tester.tags):
+                continue
+            if endpoint and not tester.touches(endpoint):
+                continue
+            if wanted is not None and tester not in wanted:
+                continue
+            if isolated is not None and tester.isolated != isolated:
+                continue
+            matches.append(tester)
+        return matches
+
+    def specs(self, testers=None):
+        """TEST_SUITES entries for testers (default: all)"""
+        return [tester.spec for tester in (self.testers if testers is None else testers)]
+
+
+def _test_files(tests_dir):
+    return sorted(name for name in os.listdir(tests_dir) if name.startswith('test_') and name.endswith('.py'))
+
+
+def _stats(tests_dir, names):
+    stats = {}
+    for name in names:
+        stat = os.stat(os.path.join(tests_dir, name))
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def load_registry(tests_dir=None, cache_path=None, rebuild=False):
+    """Registry from the cache, re-reading the test files only when one was added, removed or changed"""
+    tests_dir = os.path.abspath(tests_dir or TESTS_DIR)
+    cache_path = cache_path or CACHE_PATH
+    stats = _stats(tests_dir, _test_files(tests_dir))
+
+    if not rebuild:
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+            if (cache.get('version') == REGISTRY_VERSION and cache.get('tests_dir') == tests_dir
+                    and cache.get('files') == stats):
+                return TesterRegistry(cache['testers'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    testers = []
+    for name in stats:
+        testers.extend(read_testers(os.path.join(tests_dir, name)))
+    _write_cache(cache_path, {'version': REGISTRY_VERSION, 'tests_dir': tests_dir, 'files': stats, 'testers': testers})
+    return TesterRegistry(testers, built=True)
+
+
+def _write_cache(cache_path, cache):
+    try:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass   # read-only checkout: still usable, just not cached
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide tester registry, loading it on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = load_registry()
+        return _registry
+
+
+if __name__ == "__main__":
+    registry = load_registry(rebuild='--rebuild' in sys.argv)
+    print(f"{len(registry)} testers ({'rebuilt' if registry.built else 'cached'})")
+    for tester in registry:
+        print(f"  {tester.severity:<8} {tester.suite_name:<34} ~{tester.estimated_duration}s"
+              f"{'  isolated' if tester.isolated else ''}  [{', '.join(tester.tags)}]")
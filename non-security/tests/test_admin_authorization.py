@@ -4,21 +4,47 @@ Test Admin Authorization Vulnerabilities
 Tests if regular users can access admin endpoints
 """
 
-import requests
-import time
 import json
+import sys
+import os
 from datetime import datetime
 from colorama import Fore, Style, init
 
+# Add parent directory to path for shared helper imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_transport import get_transport, preview
+from results_sink import emit_result
+from results_store import save_suite_file
+from session_helper import SessionManager
+from route_index import get_route_index
+from auth_matrix import AuthorizationMatrix, Identity, previous_path
+
 init(autoreset=True)
 
 class AdminAuthTester:
-    def __init__(self, base_url):
+    # Registry metadata (tester_registry.py reads these without importing the module)
+    suite_name = "Admin Authorization"
+    order = 3
+    severity = 'CRITICAL'
+    tags = ('authorization', 'admin', 'rce')
+    test_count = 3
+    optional_tests = {'AUTHZ_MATRIX': 1}
+    estimated_duration = 20
+    run_args = 'token'
+    description = 'Plugin upload RCE, admin endpoint access'
+    endpoints = ('/api/v1/admin/schemas', '/api/admin', '/admin', '/admin/plugins/upload')
+
+    def __init__(self, base_url, matrix=None):
         self.base_url = base_url.rstrip('/')
         self.results = []
+        self.http = get_transport()
         self.regular_user_token = None
+        self.session_manager = SessionManager(base_url)
+        if matrix is None:
+            matrix = os.getenv('AUTHZ_MATRIX', 'false').lower() == 'true'
+        self.matrix = matrix
 
-    def log_result(self, test_name, success, details):
+    def log_result(self, test_name, success, details, **extra):
         """Log test result"""
         result = {
             'test': test_name,
@@ -26,64 +52,35 @@ class AdminAuthTester:
             'details': details,
             'timestamp': datetime.now().isoformat()
         }
+        result.update(extra)
         self.results.append(result)
+        emit_result(self.suite_name, result)
 
         status = f"{Fore.RED}VULNERABLE" if success else f"{Fore.GREEN}SECURE"
         print(f"[{status}{Style.RESET_ALL}] {test_name}")
         print(f"  └─ {details}\n")
 
     def create_test_account(self):
-        """Create a test account and get token"""
+        """Create a test account and get token (once per run, then reused)"""
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"SETUP: Creating Test Account")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        timestamp = int(time.time())
-        email = f"admin-test-{timestamp}@example.com"
-        password = "Password123"
+        success, token, email, message = self.session_manager.register_test_account(
+            'admin-test', "Admin Test User", "admin-test"
+        )
 
-        # Register
-        try:
-            reg_response = requests.post(
-                f"{self.base_url}/register",
-                json={
-                    "name": "Admin Test User",
-                    "email": email,
-                    "password": password,
-                    "password_confirmation": password
-                },
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
+        print(message)
 
-            print(f"Registration Status: {reg_response.status_code}")
-
-            # Login to get token
-            login_response = requests.post(
-                f"{self.base_url}/api/auth/login",
-                json={"email": email, "password": password},
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
+        if success:
+            self.regular_user_token = token
+            print(f"{Fore.GREEN}✓ Test account ready{Style.RESET_ALL}")
+            print(f"  Email: {email}")
+            print(f"  Token: {token[:30]}...\n")
+            return True
 
-            if login_response.status_code == 200:
-                try:
-                    token = login_response.json().get('token') or login_response.json().get('access_token')
-                    self.regular_user_token = token
-                    print(f"{Fore.GREEN}✓ Test account created{Style.RESET_ALL}")
-                    print(f"  Email: {email}")
-                    print(f"  Token: {token[:30]}...\n")
-                    return True
-                except:
-                    print(f"{Fore.RED}✗ Could not extract token{Style.RESET_ALL}\n")
-                    return False
-            else:
-                print(f"{Fore.RED}✗ Login failed: {login_response.status_code}{Style.RESET_ALL}\n")
-                return False
-
-        except Exception as e:
-            print(f"{Fore.RED}Error creating test account: {str(e)}{Style.RESET_ALL}\n")
-            return False
+        print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}\n")
+        return False
 
     def test_schema_access(self):
         """Test access to admin schema endpoints"""
@@ -101,6 +98,15 @@ class AdminAuthTester:
             ("DELETE", "/api/v1/admin/schemas/1", "Delete schema"),
         ]
 
+        # Read-only admin API routes from the route index
+        index = get_route_index()
+        seen = {(method, endpoint) for method, endpoint, desc in endpoints}
+        for route in index.query(method='GET', prefix='/api/admin'):
+            endpoint = index.fill_path(route['path'])
+            if ("GET", endpoint) not in seen:
+                seen.add(("GET", endpoint))
+                endpoints.append(("GET", endpoint, route['action'] or "Indexed route"))
+
         vulnerable = False
 
         for method, endpoint, desc in endpoints:
@@ -108,7 +114,7 @@ class AdminAuthTester:
                 print(f"Testing: {method} {endpoint} ({desc})")
 
                 if method == "GET":
-                    response = requests.get(
+                    response = self.http.get(
                         f"{self.base_url}{endpoint}",
                         headers={
                             'Authorization': f'Bearer {self.regular_user_token}',
@@ -117,7 +123,7 @@ class AdminAuthTester:
                         timeout=10
                     )
                 elif method == "DELETE":
-                    response = requests.delete(
+                    response = self.http.delete(
                         f"{self.base_url}{endpoint}",
                         headers={
                             'Authorization': f'Bearer {self.regular_user_token}',
@@ -139,8 +145,6 @@ class AdminAuthTester:
                 else:
                     print(f"  {Fore.YELLOW}? Unexpected response{Style.RESET_ALL}\n")
 
-                time.sleep(0.5)
-
             except Exception as e:
                 print(f"  {Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
 
@@ -187,7 +191,7 @@ class AdminAuthTester:
             print(f"Attempting plugin upload as regular user...")
 
             with open(zip_path, 'rb') as f:
-                response = requests.post(
+                response = self.http.post(
                     f"{self.base_url}/admin/plugins/upload",
                     files={'plugin': ('test.zip', f, 'application/zip')},
                     headers={
@@ -197,7 +201,7 @@ class AdminAuthTester:
                 )
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:300]}\n")
+            print(f"Response: {preview(response, 300)}\n")
 
             if response.status_code in [200, 201]:
                 self.log_result(
@@ -240,13 +244,17 @@ class AdminAuthTester:
             "/admin/settings"
         ]
 
+        # Plus every parameterless admin page in the route index
+        index = get_route_index()
+        admin_urls = list(dict.fromkeys(admin_urls + index.paths(index.query(method='GET', prefix='/admin', has_params=False))))
+
         vulnerable = False
 
         for url in admin_urls:
             try:
                 print(f"Testing: {url}")
 
-                response = requests.get(
+                response = self.http.get(
                     f"{self.base_url}{url}",
                     headers={
                         'Authorization': f'Bearer {self.regular_user_token}'
@@ -285,6 +293,82 @@ class AdminAuthTester:
 
         return vulnerable
 
+    def matrix_identities(self):
+        """Anonymous, the regular test account, and org member / admin accounts when configured"""
+        identities = [
+            Identity('anonymous'),
+            Identity('regular', token=self.regular_user_token, cookies=self.session_manager.get_cookies()),
+        ]
+
+        for name, prefix, admin in (('org_member', 'ORG_MEMBER', False), ('admin', 'ADMIN', True)):
+            email, password = os.getenv(f'{prefix}_EMAIL'), os.getenv(f'{prefix}_PASSWORD')
+            if not (email and password):
+                print(f"{Fore.YELLOW}No {prefix}_EMAIL/{prefix}_PASSWORD - skipping {name} identity{Style.RESET_ALL}")
+                continue
+            success, token, message = self.session_manager.get_api_token(email, password)
+            if success:
+                identities.append(Identity(name, token=token, admin=admin))
+            else:
+                print(f"{Fore.YELLOW}{name}: {message} - skipping{Style.RESET_ALL}")
+
+        return identities
+
+    def test_authorization_matrix(self, output='results_authz_matrix.json'):
+        """Every indexed GET route against every test identity"""
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 4: Authorization Matrix (routes x identities)")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
+
+        try:
+            matrix = AuthorizationMatrix(self.base_url, self.matrix_identities())
+            matrix.run()
+        except Exception as e:
+            print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
+            self.log_result("Authorization Matrix", False, f"Error: {str(e)}")
+            return False
+
+        stats = matrix.stats
+        print(f"\n{stats['rows']} routes x {stats['identities']} identities = {stats['cells']} cells, "
+              f"{stats['requests']} requests ({stats['deduplicated']} deduplicated) in {stats['seconds']}s\n")
+
+        for identity in matrix.identities:
+            verdicts = matrix.verdicts(identity.name)
+            counts = ', '.join(f"{verdicts.count(v)}{v}" for v in 'ADRNEX' if v in verdicts)
+            print(f"  {identity.name:12} {counts}")
+
+        changes = matrix.save_with_previous(output)
+        print(f"\nMatrix saved to: {output}")
+        if changes is None:
+            print("No earlier matrix of this target to compare with\n")
+        else:
+            print(f"{len(changes)} cells changed since the previous matrix ({previous_path(output)})")
+            for change in changes:
+                print(f"  {change['identity']}: {change['method']} {change['path']} "
+                      f"{change['before'] or '-'} -> {change['after'] or '-'}")
+            print()
+        extra = {'matrix_changes': changes} if changes is not None else {}
+
+        findings = matrix.findings()
+        for finding in findings:
+            print(f"  {Fore.RED}✗ {finding['identity']}: {finding['path']} ({finding['status']}) - {finding['issue']}{Style.RESET_ALL}")
+
+        if findings:
+            self.log_result(
+                "Authorization Matrix",
+                True,
+                f"{len(findings)} routes allowed that should be denied (matrix: {output})",
+                findings=findings, matrix_stats=stats, **extra
+            )
+            return True
+
+        self.log_result(
+            "Authorization Matrix",
+            False,
+            f"No unexpected access across {stats['cells']} route/identity cells",
+            matrix_stats=stats, **extra
+        )
+        return False
+
     def run_all_tests(self, existing_token=None):
         """Run all admin authorization tests"""
         print(f"\n{Fore.YELLOW}{'='*60}")
@@ -304,13 +388,14 @@ class AdminAuthTester:
 
         # Run tests
         self.test_schema_access()
-        time.sleep(1)
 
         self.test_plugin_upload()
-        time.sleep(1)
 
         self.test_admin_panel_access()
 
+        if self.matrix:
+            self.test_authorization_matrix()
+
         # Summary
         print(f"\n{Fore.YELLOW}{'='*60}")
         print(f"TEST SUMMARY")
@@ -341,12 +426,15 @@ if __name__ == "__main__":
     base_url = os.getenv('BASE_URL', 'https://evenleads.com')
     token = os.getenv('TEST_TOKEN')
 
-    if len(sys.argv) > 1:
-        base_url = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if args:
+        base_url = args[0]
 
-    tester = AdminAuthTester(base_url)
+    tester = AdminAuthTester(base_url, matrix=True if '--matrix' in sys.argv else None)
     results = tester.run_all_tests(token)
 
     with open('results_admin_authorization.json', 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Results saved to: results_admin_authorization.json")
+
+    save_suite_file(base_url, tester, 'results_admin_authorization.json')
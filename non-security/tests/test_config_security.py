@@ -4,18 +4,42 @@ Test Configuration Security Issues
 Tests for exposed credentials, weak secrets, and configuration vulnerabilities
 """
 
-import requests
-import time
 import json
+import re
+import sys
+import os
 from datetime import datetime
 from colorama import Fore, Style, init
 
+# Add parent directory to path for shared helper imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_transport import get_transport
+from response_scanner import SECRETS_GROUP, get_scanner
+from results_sink import emit_result
+from results_store import save_suite_file
+from route_index import get_route_index
+
 init(autoreset=True)
 
 class ConfigSecurityTester:
+    # Registry metadata (tester_registry.py reads these without importing the module)
+    suite_name = "Configuration Security"
+    order = 6
+    severity = 'MEDIUM'
+    tags = ('configuration', 'disclosure', 'headers', 'cors')
+    test_count = 5
+    estimated_duration = 15
+    run_args = 'credentials'
+    description = 'Credentials exposure, debug mode, headers'
+    endpoints = ('/.env', '/.env.example', '/env.example', '/.env.backup', '/.env.old', '/.git/config',
+                 '/composer.json', '/package.json', '/api/settings', '/api/v1/health', '/api/v1/campaigns',
+                 '/error/test')
+
     def __init__(self, base_url):
         self.base_url = base_url.rstrip('/')
         self.results = []
+        self.http = get_transport()
+        self.scanner = get_scanner()
 
     def log_result(self, test_name, success, details):
         """Log test result"""
@@ -26,55 +50,90 @@ class ConfigSecurityTester:
             'timestamp': datetime.now().isoformat()
         }
         self.results.append(result)
+        emit_result(self.suite_name, result)
 
         status = f"{Fore.RED}VULNERABLE" if success else f"{Fore.GREEN}SECURE"
         print(f"[{status}{Style.RESET_ALL}] {test_name}")
         print(f"  └─ {details}\n")
 
+    ENV_FILE_ENDPOINTS = [
+        "/.env.example",
+        "/.env",
+        "/env.example",
+        "/.env.backup",
+        "/.env.old"
+    ]
+
     def test_env_example_accessible(self):
         """Test if .env.example is publicly accessible"""
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"TEST 1: .env.example File Accessibility")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        endpoints = [
-            "/.env.example",
-            "/.env",
-            "/env.example",
-            "/.env.backup",
-            "/.env.old"
-        ]
-
         found_files = []
 
-        for endpoint in endpoints:
+        for endpoint in self.ENV_FILE_ENDPOINTS:
             try:
-                print(f"Checking: {endpoint}")
-                response = requests.get(
+                # Reading stops at the first secret value; keywords alone don't name one
+                scan = self.scanner.stop_on(SECRETS_GROUP)
+                response = self.http.get(
                     f"{self.base_url}{endpoint}",
                     timeout=5,
-                    allow_redirects=False
+                    allow_redirects=False,
+                    on_chunk=scan
                 )
+                self._check_env_file(endpoint, response, found_files, scan.result())
 
-                print(f"  Status: {response.status_code}")
+            except Exception as e:
+                print(f"Checking: {endpoint}")
+                print(f"  Error: {str(e)}\n")
 
-                if response.status_code == 200:
-                    print(f"  {Fore.RED}✗ FILE ACCESSIBLE!{Style.RESET_ALL}")
-                    found_files.append(endpoint)
+        return self._log_env_exposure(found_files)
 
-                    # Check for credentials in content
-                    if 'PASSWORD' in response.text or 'SECRET' in response.text:
-                        print(f"  {Fore.RED}⚠️  Contains credentials/secrets!{Style.RESET_ALL}\n")
-                    else:
-                        print()
-                elif response.status_code in [403, 404]:
-                    print(f"  {Fore.GREEN}✓ Not accessible{Style.RESET_ALL}\n")
-                else:
-                    print(f"  ? Status: {response.status_code}\n")
+    async def test_env_example_accessible_async(self, engine):
+        """Async variant: probes every env file path at once"""
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 1: .env.example File Accessibility")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
 
-            except Exception as e:
-                print(f"  Error: {str(e)}\n")
+        scans = [self.scanner.stop_on(SECRETS_GROUP) for endpoint in self.ENV_FILE_ENDPOINTS]
+        responses = await engine.gather([
+            engine.get(f"{self.base_url}{endpoint}", timeout=5, allow_redirects=False, on_chunk=scan)
+            for endpoint, scan in zip(self.ENV_FILE_ENDPOINTS, scans)
+        ])
+
+        found_files = []
 
+        for endpoint, response, scan in zip(self.ENV_FILE_ENDPOINTS, responses, scans):
+            if isinstance(response, Exception):
+                print(f"Checking: {endpoint}")
+                print(f"  Error: {str(response)}\n")
+            else:
+                self._check_env_file(endpoint, response, found_files, scan.result())
+
+        return self._log_env_exposure(found_files)
+
+    def _check_env_file(self, endpoint, response, found_files, found):
+        """Print and collect the outcome for one env file path; found is the body's scan result"""
+        print(f"Checking: {endpoint}")
+        print(f"  Status: {response.status_code}")
+
+        if response.status_code == 200:
+            print(f"  {Fore.RED}✗ FILE ACCESSIBLE!{Style.RESET_ALL}")
+            found_files.append(endpoint)
+
+            # Check for credentials in content
+            if found.names('credentials') or found.names(SECRETS_GROUP):
+                print(f"  {Fore.RED}⚠️  Contains credentials/secrets!{Style.RESET_ALL}")
+                self._print_secrets(found)
+            self._print_read(response)
+            print()
+        elif response.status_code in [403, 404]:
+            print(f"  {Fore.GREEN}✓ Not accessible{Style.RESET_ALL}\n")
+        else:
+            print(f"  ? Status: {response.status_code}\n")
+
+    def _log_env_exposure(self, found_files):
         if found_files:
             self.log_result(
                 "Environment File Exposure",
@@ -97,29 +156,25 @@ class ConfigSecurityTester:
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
         try:
-            # Trigger error to check for debug output
-            response = requests.get(
+            # Trigger error to check for debug output; reading stops at the
+            # first debug trace (response_scanner.KEYWORDS['debug'])
+            scan = self.scanner.stop_on('debug')
+            response = self.http.get(
                 f"{self.base_url}/error/test",  # Known error endpoint
-                timeout=10
+                timeout=10,
+                on_chunk=scan
             )
 
             print(f"Status Code: {response.status_code}")
+            self._print_read(response)
 
-            # Check for debug traces
-            debug_indicators = [
-                'Whoops\\Handler',
-                'Stack trace',
-                'vendor/laravel',
-                'APP_DEBUG',
-                'DebugBar',
-                'Ignition'
-            ]
+            found = scan.result()
+            debug_traces = found.in_group('debug')
 
-            has_debug = any(indicator in response.text for indicator in debug_indicators)
-
-            if has_debug:
+            if debug_traces:
                 print(f"{Fore.RED}Debug mode appears to be enabled!{Style.RESET_ALL}")
-                print(f"Response contains stack traces/debug info\n")
+                print(f"Response contains stack traces/debug info "
+                      f"({', '.join(found.names('debug'))}, first at byte {debug_traces[0].start})\n")
                 self.log_result(
                     "Debug Mode Detection",
                     True,
@@ -140,52 +195,114 @@ class ConfigSecurityTester:
             self.log_result("Debug Mode Detection", False, "Could not test")
             return False
 
+    DISCLOSURE_ENDPOINTS = [
+        ("/api/settings", "Public settings endpoint"),
+        ("/api/v1/health", "Health check endpoint"),
+        ("/.git/config", "Git configuration"),
+        ("/composer.json", "Composer dependencies"),
+        ("/package.json", "NPM dependencies"),
+    ]
+
+    # Public routes whose path suggests they describe the app itself
+    DISCLOSURE_HINT = re.compile(r'setting|health|config|debug|status|info|version|env|test')
+
+    def disclosure_endpoints(self):
+        """Hard-coded endpoints plus matching public GET routes from the route index"""
+        endpoints = list(self.DISCLOSURE_ENDPOINTS)
+        known = {endpoint for endpoint, desc in endpoints}
+
+        index = get_route_index()
+        for route in index.query(method='GET', authenticated=False, has_params=False):
+            if route['path'] not in known and self.DISCLOSURE_HINT.search(route['path']):
+                known.add(route['path'])
+                endpoints.append((route['path'], f"Public route {route['name'] or route['action']}"))
+        return endpoints
+
     def test_information_disclosure(self):
         """Test for information disclosure in responses"""
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"TEST 3: Information Disclosure")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        endpoints = [
-            ("/api/settings", "Public settings endpoint"),
-            ("/api/v1/health", "Health check endpoint"),
-            ("/.git/config", "Git configuration"),
-            ("/composer.json", "Composer dependencies"),
-            ("/package.json", "NPM dependencies"),
-        ]
-
         disclosed_info = []
 
-        for endpoint, desc in endpoints:
+        for endpoint, desc in self.disclosure_endpoints():
             try:
-                print(f"Testing: {endpoint} ({desc})")
-                response = requests.get(
+                # Reading stops at the first secret value; keywords alone don't name one
+                scan = self.scanner.stop_on(SECRETS_GROUP)
+                response = self.http.get(
                     f"{self.base_url}{endpoint}",
-                    timeout=5
+                    timeout=5,
+                    on_chunk=scan
                 )
+                self._check_disclosure(endpoint, desc, response, disclosed_info, scan.result())
+
+            except Exception as e:
+                print(f"Testing: {endpoint} ({desc})")
+                print(f"  Error: {str(e)}\n")
 
-                print(f"  Status: {response.status_code}")
+        return self._log_disclosure(disclosed_info)
 
-                if response.status_code == 200:
-                    # Check what information is exposed
-                    sensitive_keys = ['key', 'secret', 'password', 'token', 'api', 'stripe', 'database']
-                    content_lower = response.text.lower()
+    async def test_information_disclosure_async(self, engine):
+        """Async variant: fetches every disclosure endpoint at once"""
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 3: Information Disclosure")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
 
-                    exposed = [key for key in sensitive_keys if key in content_lower]
+        endpoints = self.disclosure_endpoints()
+        scans = [self.scanner.stop_on(SECRETS_GROUP) for endpoint in endpoints]
+        responses = await engine.gather([
+            engine.get(f"{self.base_url}{endpoint}", timeout=5, on_chunk=scan)
+            for (endpoint, desc), scan in zip(endpoints, scans)
+        ])
 
-                    if exposed:
-                        print(f"  {Fore.RED}✗ Exposes: {', '.join(exposed)}{Style.RESET_ALL}\n")
-                        disclosed_info.append(f"{endpoint}: {', '.join(exposed)}")
-                    else:
-                        print(f"  {Fore.YELLOW}! Accessible but no sensitive data{Style.RESET_ALL}\n")
-                elif response.status_code in [403, 404]:
-                    print(f"  {Fore.GREEN}✓ Not accessible{Style.RESET_ALL}\n")
-                else:
-                    print(f"  ? Status: {response.status_code}\n")
+        disclosed_info = []
 
-            except Exception as e:
-                print(f"  Error: {str(e)}\n")
+        for (endpoint, desc), response, scan in zip(endpoints, responses, scans):
+            if isinstance(response, Exception):
+                print(f"Testing: {endpoint} ({desc})")
+                print(f"  Error: {str(response)}\n")
+            else:
+                self._check_disclosure(endpoint, desc, response, disclosed_info, scan.result())
+
+        return self._log_disclosure(disclosed_info)
+
+    def _check_disclosure(self, endpoint, desc, response, disclosed_info, found):
+        """Print and collect what one endpoint exposes; found is the body's scan result"""
+        print(f"Testing: {endpoint} ({desc})")
+        print(f"  Status: {response.status_code}")
+
+        if response.status_code == 200:
+            # Check what information is exposed: sensitive keywords
+            # (response_scanner.KEYWORDS['sensitive']) and actual secret values
+            exposed = found.names('sensitive') + found.names(SECRETS_GROUP)
+
+            if exposed:
+                print(f"  {Fore.RED}✗ Exposes: {', '.join(exposed)}{Style.RESET_ALL}")
+                self._print_secrets(found)
+                self._print_read(response)
+                print()
+                disclosed_info.append(f"{endpoint}: {', '.join(exposed)}")
+            else:
+                print(f"  {Fore.YELLOW}! Accessible but no sensitive data{Style.RESET_ALL}\n")
+        elif response.status_code in [403, 404]:
+            print(f"  {Fore.GREEN}✓ Not accessible{Style.RESET_ALL}\n")
+        else:
+            print(f"  ? Status: {response.status_code}\n")
+
+    def _print_read(self, response):
+        """Note a body that was not read to the end"""
+        if response.stopped_early:
+            print(f"  (stopped reading after {len(response.content)} bytes: verdict decided)")
+        elif response.truncated:
+            print(f"  (body cut at the {len(response.content)} byte budget)")
+
+    def _print_secrets(self, found):
+        """Print where each secret value was found; the values themselves are not printed"""
+        for match in found.in_group(SECRETS_GROUP):
+            print(f"  {Fore.RED}✗ {match.name} at bytes {match.start}-{match.end}{Style.RESET_ALL}")
 
+    def _log_disclosure(self, disclosed_info):
         if disclosed_info:
             self.log_result(
                 "Information Disclosure",
@@ -208,7 +325,7 @@ class ConfigSecurityTester:
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}",
                 timeout=10
             )
@@ -273,7 +390,7 @@ class ConfigSecurityTester:
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
         try:
-            response = requests.options(
+            response = self.http.options(
                 f"{self.base_url}/api/v1/campaigns",
                 headers={
                     'Origin': 'https://evil.com',
@@ -331,20 +448,39 @@ class ConfigSecurityTester:
 
         # Run tests
         self.test_env_example_accessible()
-        time.sleep(1)
 
         self.test_debug_mode_enabled()
-        time.sleep(1)
 
         self.test_information_disclosure()
-        time.sleep(1)
 
         self.test_security_headers()
-        time.sleep(1)
 
         self.test_cors_misconfiguration()
 
-        # Summary
+        self.print_summary()
+
+        return self.results
+
+    async def run_all_tests_async(self, engine, email=None, password=None):
+        """Run all configuration tests on the async engine"""
+        print(f"\n{Fore.YELLOW}{'='*60}")
+        print(f"CONFIGURATION SECURITY TESTS")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
+        print(f"Target: {self.base_url}")
+        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+        await self.test_env_example_accessible_async(engine)
+        await engine.run_sync(self.test_debug_mode_enabled)
+        await self.test_information_disclosure_async(engine)
+        await engine.run_sync(self.test_security_headers)
+        await engine.run_sync(self.test_cors_misconfiguration)
+
+        self.print_summary()
+
+        return self.results
+
+    def print_summary(self):
+        """Print the suite summary"""
         print(f"\n{Fore.YELLOW}{'='*60}")
         print(f"TEST SUMMARY")
         print(f"{'='*60}{Style.RESET_ALL}\n")
@@ -361,8 +497,6 @@ class ConfigSecurityTester:
         else:
             print(f"{Fore.GREEN}✓ All configuration tests passed{Style.RESET_ALL}\n")
 
-        return self.results
-
 if __name__ == "__main__":
     import sys
     import os
@@ -381,3 +515,5 @@ if __name__ == "__main__":
     with open('results_config_security.json', 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Results saved to: results_config_security.json")
+
+    save_suite_file(base_url, tester, 'results_config_security.json')
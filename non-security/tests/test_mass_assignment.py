@@ -4,27 +4,62 @@ Test Mass Assignment Vulnerabilities
 Tests if sensitive fields can be manipulated during registration/updates
 """
 
-import requests
 import time
 import json
+import re
 import sys
 import os
+import uuid
 from datetime import datetime
 from colorama import Fore, Style, init
 
-# Add parent directory to path for session_helper import
+# Add parent directory to path for shared helper imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from session_helper import SessionManager
+from http_transport import get_transport, preview
+from results_sink import emit_result
+from results_store import save_suite_file
+from field_discovery import (
+    GroupProbe, GroupTester, candidate_value, load_migration_columns, probe_marker, value_persisted
+)
 
 init(autoreset=True)
 
+# Persisted fields matching this are privilege or billing relevant
+SENSITIVE_FIELD = re.compile(r'role|admin|verif|bypass|trial|two_factor|secret|organization|growth_hack|plan|subscription|credit')
+
 class MassAssignmentTester:
-    def __init__(self, base_url):
+    # Registry metadata (tester_registry.py reads these without importing the module)
+    suite_name = "Mass Assignment Vulnerabilities"
+    order = 1
+    severity = 'CRITICAL'
+    tags = ('mass-assignment', 'accounts', 'privilege-escalation')
+    test_count = 5
+    optional_tests = {'MASS_ASSIGN_DISCOVERY': 2}
+    estimated_duration = 30
+    run_args = 'credentials'
+    description = 'Admin escalation, bypass flags, trial manipulation'
+    endpoints = ('/register', '/api/auth/login', '/api/user', '/api/auth/user', '/api/user/profile')
+
+    # Seeds from the hand-written tests that are not users columns
+    EXTRA_CANDIDATES = {'role_id': 'integer', 'is_admin': 'boolean', 'role': 'string'}
+
+    # Sent by every registration, so not candidates there
+    REGISTRATION_FIELDS = {'name', 'email', 'password', 'password_confirmation'}
+
+    def __init__(self, base_url, discover=None):
         self.base_url = base_url.rstrip('/')
         self.results = []
+        self.http = get_transport()
         self.session_manager = SessionManager(base_url)
-
-    def log_result(self, test_name, success, details):
+        if discover is None:
+            discover = os.getenv('MASS_ASSIGN_DISCOVERY', 'false').lower() == 'true'
+        self.discover = discover
+        self.group_size = int(os.getenv('MASS_ASSIGN_GROUP_SIZE', '64'))
+        self.readback_path = os.getenv('MASS_ASSIGN_READBACK_PATH')
+        self.discovery_requests = 0
+
+    def log_result(self, test_name, success, details, **extra):
         """Log test result"""
         result = {
             'test': test_name,
@@ -32,7 +67,9 @@ class MassAssignmentTester:
             'details': details,
             'timestamp': datetime.now().isoformat()
         }
+        result.update(extra)
         self.results.append(result)
+        emit_result(self.suite_name, result)
 
         status = f"{Fore.RED}VULNERABLE" if success else f"{Fore.GREEN}SECURE"
         print(f"[{status}{Style.RESET_ALL}] {test_name}")
@@ -56,7 +93,7 @@ class MassAssignmentTester:
         }
 
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/register",
                 json=payload,
                 headers={'Content-Type': 'application/json'},
@@ -64,7 +101,7 @@ class MassAssignmentTester:
             )
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:500]}\n")
+            print(f"Response: {preview(response, 500)}\n")
 
             # Check if registration succeeded
             if response.status_code in [200, 201, 302]:
@@ -105,7 +142,7 @@ class MassAssignmentTester:
         }
 
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/register",
                 json=payload,
                 headers={'Content-Type': 'application/json'},
@@ -113,7 +150,7 @@ class MassAssignmentTester:
             )
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:500]}\n")
+            print(f"Response: {preview(response, 500)}\n")
 
             if response.status_code in [200, 201, 302]:
                 self.log_result(
@@ -152,7 +189,7 @@ class MassAssignmentTester:
         }
 
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/register",
                 json=payload,
                 headers={'Content-Type': 'application/json'},
@@ -160,7 +197,7 @@ class MassAssignmentTester:
             )
 
             print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text[:500]}\n")
+            print(f"Response: {preview(response, 500)}\n")
 
             if response.status_code in [200, 201, 302]:
                 self.log_result(
@@ -213,7 +250,7 @@ class MassAssignmentTester:
         for i, payload in enumerate([payload1, payload2], 1):
             try:
                 print(f"Method {i}: {list(payload.keys())[-1]}")
-                response = requests.post(
+                response = self.http.post(
                     f"{self.base_url}/register",
                     json=payload,
                     headers={'Content-Type': 'application/json'},
@@ -221,7 +258,7 @@ class MassAssignmentTester:
                 )
 
                 print(f"Status Code: {response.status_code}")
-                print(f"Response: {response.text[:300]}\n")
+                print(f"Response: {preview(response, 300)}\n")
 
                 if response.status_code in [200, 201, 302]:
                     vulnerable = True
@@ -288,7 +325,7 @@ class MassAssignmentTester:
             # Make authenticated request
             if token:
                 # Token-based auth
-                update_response = requests.put(
+                update_response = self.http.put(
                     f"{self.base_url}/api/user/profile",
                     json=update_payload,
                     headers={
@@ -307,7 +344,10 @@ class MassAssignmentTester:
                 )
 
             print(f"Update Status Code: {update_response.status_code}")
-            print(f"Update Response: {update_response.text[:500]}\n")
+            print(f"Update Response: {preview(update_response, 500)}\n")
+
+            if update_response.status_code == 401 and token:
+                self.session_manager.invalidate_token(email)
 
             if update_response.status_code in [200, 201]:
                 self.log_result(
@@ -329,6 +369,193 @@ class MassAssignmentTester:
             self.log_result("Profile Update Escalation", False, f"Error: {str(e)}")
             return False
 
+    def candidate_fields(self):
+        """users columns from the migrations, the seed fields, and MASS_ASSIGN_FIELDS_FILE (name[:type] per line)"""
+        fields = load_migration_columns('users')
+        for name, column_type in self.EXTRA_CANDIDATES.items():
+            fields.setdefault(name, column_type)
+
+        path = os.getenv('MASS_ASSIGN_FIELDS_FILE')
+        if path:
+            with open(path) as f:
+                for line in f:
+                    name, _, column_type = line.strip().partition(':')
+                    if name and not name.startswith('#'):
+                        fields.setdefault(name, column_type or 'string')
+        return fields
+
+    def _discovery_request(self, method, url, **kwargs):
+        self.discovery_requests += 1
+        return self.http.request(method, url, timeout=10, **kwargs)
+
+    def read_back(self, token):
+        """Current user as stored, via the first read-back endpoint that answers with an object"""
+        paths = [self.readback_path] if self.readback_path else ['/api/user', '/api/auth/user']
+        for path in paths:
+            response = self._discovery_request(
+                'GET', f"{self.base_url}{path}",
+                headers={'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+            )
+            if response.status_code != 200:
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                self.readback_path = path
+                return data.get('user', data) if isinstance(data.get('user'), dict) else data
+        return None
+
+    def register_and_read(self, marker, extra):
+        """Register a throwaway account with extra fields, then read it back"""
+        email = f"{marker}-{uuid.uuid4().hex[:6]}@example.com"
+        payload = {
+            "name": "Field Discovery Test",
+            "email": email,
+            "password": "Password123",
+            "password_confirmation": "Password123",
+            **extra
+        }
+
+        response = self._discovery_request(
+            'POST', f"{self.base_url}/register",
+            json=payload, headers={'Content-Type': 'application/json'}, allow_redirects=False
+        )
+        if response.status_code not in [200, 201, 302]:
+            return None
+
+        sent = self.session_manager.requests_sent
+        success, token, _ = self.session_manager.get_api_token(email, "Password123")
+        self.discovery_requests += self.session_manager.requests_sent - sent
+        return self.read_back(token) if success else None
+
+    @staticmethod
+    def compare_read_back(values, before, after, volatile):
+        """Attribute read-back changes to the fields that were sent"""
+        persisted = {
+            field: after[field] for field, value in values.items()
+            if field in after and value_persisted(value, after[field])
+        }
+        changed = {key for key in after if after.get(key) != before.get(key)}
+        # A sent field that changed to something other than what was sent is a side effect too
+        side_effects = changed - set(persisted) - volatile
+        return GroupProbe(True, persisted, side_effects)
+
+    def report_discovery(self, test_name, outcome):
+        """Log a group testing run; sensitive persisted fields make it vulnerable"""
+        persisted = outcome['persisted']
+        sensitive = sorted(field for field in persisted if SENSITIVE_FIELD.search(field))
+
+        print(f"Candidates: {outcome['candidates']}, probes: {outcome['probes']} "
+              f"(saved {outcome['probes_saved']} vs one per field), HTTP requests: {self.discovery_requests}")
+        print(f"Persisted: {sorted(persisted) or 'none'}")
+        if outcome['side_effects']:
+            print(f"Side effects: {outcome['side_effects']}")
+        if outcome['rejected']:
+            print(f"Rejected (request failed when sent): {outcome['rejected']}")
+        print()
+
+        if sensitive:
+            details = f"Sensitive fields persisted: {', '.join(sensitive)}"
+        else:
+            details = f"No sensitive fields persisted ({len(persisted)} benign)"
+        details += f" - {outcome['probes']} probes for {outcome['candidates']} fields"
+
+        self.log_result(test_name, bool(sensitive), details, http_requests=self.discovery_requests, **outcome)
+        return bool(sensitive)
+
+    def test_field_discovery_registration(self):
+        """Find which candidate fields /register persists, by group testing"""
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 6: Field Discovery via Registration (group testing)")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
+
+        types = {name: column_type for name, column_type in self.candidate_fields().items()
+                 if name not in self.REGISTRATION_FIELDS}
+        marker = probe_marker()
+        self.discovery_requests = 0
+
+        try:
+            # Two plain accounts: the baseline, and which keys differ per account anyway
+            baseline = self.register_and_read(marker, {})
+            second = self.register_and_read(marker, {}) if baseline is not None else None
+            if baseline is None or second is None:
+                self.log_result("Field Discovery (Registration)", False,
+                                "Could not register and read back a plain account - discovery skipped")
+                return False
+            volatile = {key for key in baseline if baseline.get(key) != second.get(key)} | {'updated_at'}
+
+            def oracle(group):
+                values = {field: candidate_value(types[field], baseline.get(field), f"{marker}-{field}")
+                          for field in group}
+                stored = self.register_and_read(marker, values)
+                if stored is None:
+                    return GroupProbe(False)
+                return self.compare_read_back(values, baseline, stored, volatile)
+
+            outcome = GroupTester(oracle, self.group_size).run(types)
+            return self.report_discovery("Field Discovery (Registration)", outcome)
+
+        except Exception as e:
+            print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
+            self.log_result("Field Discovery (Registration)", False, f"Error: {str(e)}")
+            return False
+
+    def test_field_discovery_profile(self):
+        """
+        Find which candidate fields the profile update persists, by group testing
+
+        Probes write role, 2FA and bypass columns, so they run on a throwaway
+        account registered for discovery, never on the TEST_EMAIL account.
+        """
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"TEST 7: Field Discovery via Profile Update (group testing)")
+        print(f"{'='*60}{Style.RESET_ALL}\n")
+
+        types = self.candidate_fields()
+        marker = probe_marker()
+        self.discovery_requests = 0
+
+        try:
+            sent = self.session_manager.requests_sent
+            success, token, _, message = self.session_manager.register_test_account(
+                'field-discovery', "Field Discovery Test", "field-discovery"
+            )
+            self.discovery_requests += self.session_manager.requests_sent - sent
+            current = self.read_back(token) if success else None
+            if current is None:
+                self.log_result("Field Discovery (Profile Update)", False,
+                                f"Could not register and read back a discovery account - discovery skipped ({message})")
+                return False
+
+            def oracle(group):
+                nonlocal current
+                values = {field: candidate_value(types[field], current.get(field), f"{marker}-{field}")
+                          for field in group}
+                response = self._discovery_request(
+                    'PUT', f"{self.base_url}/api/user/profile",
+                    json=values,
+                    headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+                )
+                if response.status_code not in [200, 201]:
+                    return GroupProbe(False)
+                stored = self.read_back(token)
+                if stored is None:
+                    return GroupProbe(False)
+                probe = self.compare_read_back(values, current, stored, {'updated_at'})
+                # Updates stick, so the next group is compared against this state
+                current = stored
+                return probe
+
+            outcome = GroupTester(oracle, self.group_size).run(types)
+            return self.report_discovery("Field Discovery (Profile Update)", outcome)
+
+        except Exception as e:
+            print(f"{Fore.RED}Error: {str(e)}{Style.RESET_ALL}\n")
+            self.log_result("Field Discovery (Profile Update)", False, f"Error: {str(e)}")
+            return False
+
     def run_all_tests(self, test_email=None, test_password=None):
         """Run all mass assignment tests"""
         print(f"\n{Fore.YELLOW}{'='*60}")
@@ -339,22 +566,22 @@ class MassAssignmentTester:
 
         # Run tests
         self.test_admin_escalation_registration()
-        time.sleep(1)
 
         self.test_bypass_flags_registration()
-        time.sleep(1)
 
         self.test_trial_manipulation()
-        time.sleep(1)
 
         self.test_email_verification_bypass()
-        time.sleep(1)
 
         if test_email and test_password:
             self.test_profile_update_escalation(test_email, test_password)
         else:
             print(f"{Fore.YELLOW}Skipping profile update test (no credentials provided){Style.RESET_ALL}\n")
 
+        if self.discover:
+            self.test_field_discovery_registration()
+            self.test_field_discovery_profile()
+
         # Summary
         print(f"\n{Fore.YELLOW}{'='*60}")
         print(f"TEST SUMMARY")
@@ -387,13 +614,16 @@ if __name__ == "__main__":
     test_email = os.getenv('TEST_EMAIL')
     test_password = os.getenv('TEST_PASSWORD')
 
-    if len(sys.argv) > 1:
-        base_url = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if args:
+        base_url = args[0]
 
-    tester = MassAssignmentTester(base_url)
+    tester = MassAssignmentTester(base_url, discover=True if '--discover' in sys.argv else None)
     results = tester.run_all_tests(test_email, test_password)
 
     # Save results
     with open('results_mass_assignment.json', 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Results saved to: results_mass_assignment.json")
+
+    save_suite_file(base_url, tester, 'results_mass_assignment.json')
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Statistical Timing Analysis for Security Tests
+Interleaved sampling of two request conditions, outlier trimming, bootstrap
+confidence intervals and Welch / Mann-Whitney tests, so a timing verdict
+holds up on a noisy network
+"""
+
+import math
+import os
+import random
+import statistics
+import time
+
+from pacing import suite_executor
+
+
+def trim(samples, fraction):
+    """Drop the lowest and highest fraction of the samples"""
+    ordered = sorted(samples)
+    cut = int(len(ordered) * fraction)
+    return ordered[cut:len(ordered) - cut] if cut and len(ordered) > 2 * cut else ordered
+
+
+def _beta_continued_fraction(a, b, x):
+    """Continued fraction for the regularized incomplete beta (modified Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return result
+
+
+def regularized_beta(a, b, x):
+    """I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - front * _beta_continued_fraction(b, a, 1 - x) / b
+
+
+def normal_two_sided_p(z):
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def welch_t_test(a, b):
+    """Two-sided Welch t-test: (t, degrees of freedom, p)"""
+    var_a, var_b = statistics.variance(a) / len(a), statistics.variance(b) / len(b)
+    if var_a + var_b == 0:
+        return 0.0, float(len(a) + len(b) - 2), 1.0
+    t = (statistics.fmean(a) - statistics.fmean(b)) / math.sqrt(var_a + var_b)
+    df = (var_a + var_b) ** 2 / (var_a ** 2 / (len(a) - 1) + var_b ** 2 / (len(b) - 1))
+    return t, df, regularized_beta(df / 2, 0.5, df / (df + t * t))
+
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test, normal approximation with tie correction: (U, z, p)"""
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    n_a, n_b, n = len(a), len(b), len(combined)
+
+    rank_sum_a = 0.0
+    tie_term = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        rank_sum_a += rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+
+    u = rank_sum_a - n_a * (n_a + 1) / 2
+    mean_u = n_a * n_b / 2
+    sigma = math.sqrt(n_a * n_b / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return u, 0.0, 1.0
+    # Continuity correction towards the mean
+    z = (u - mean_u - math.copysign(0.5, u - mean_u)) / sigma if u != mean_u else 0.0
+    return u, z, normal_two_sided_p(z)
+
+
+def bootstrap_ci(a, b, statistic=statistics.median, iterations=2000, confidence=0.95, rng=None):
+    """Percentile bootstrap interval for statistic(a) - statistic(b)"""
+    rng = rng or random.Random()
+    differences = sorted(
+        statistic(rng.choices(a, k=len(a))) - statistic(rng.choices(b, k=len(b)))
+        for _ in range(iterations)
+    )
+    tail = (1 - confidence) / 2
+    return (differences[int(tail * (iterations - 1))], differences[int((1 - tail) * (iterations - 1))])
+
+
+class TimingComparison:
+    """Outcome of comparing a suspected-slow condition against a baseline"""
+
+    def __init__(self, slow, fast, raw_counts, ci, welch, mann_whitney, alpha, min_effect):
+        self.slow = slow
+        self.fast = fast
+        self.raw_counts = raw_counts
+        self.median_slow = statistics.median(slow)
+        self.median_fast = statistics.median(fast)
+        self.difference = self.median_slow - self.median_fast
+        self.ci = ci
+        self.welch = welch
+        self.mann_whitney = mann_whitney
+        self.alpha = alpha
+        self.min_effect = min_effect
+
+    @property
+    def relative_difference(self):
+        return self.difference / self.median_fast if self.median_fast else 0.0
+
+    @property
+    def significant(self):
+        """
+        Slower with confidence: the rank test rejects, the whole interval is
+        above zero, and the effect is big enough to matter
+        """
+        return (self.mann_whitney[2] < self.alpha
+                and self.ci[0] > 0
+                and self.relative_difference >= self.min_effect)
+
+    def to_dict(self):
+        ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            'samples': self.raw_counts,
+            'samples_after_trim': [len(self.slow), len(self.fast)],
+            'median_ms': [ms(self.median_slow), ms(self.median_fast)],
+            'difference_ms': ms(self.difference),
+            'relative_difference': round(self.relative_difference, 4),
+            'ci_ms': [ms(self.ci[0]), ms(self.ci[1])],
+            'welch_t': round(self.welch[0], 3),
+            'welch_p': self.welch[2],
+            'mann_whitney_u': self.mann_whitney[0],
+            'mann_whitney_p': self.mann_whitney[2],
+            'alpha': self.alpha,
+            'significant': self.significant,
+        }
+
+
+class TimingEngine:
+    """
+    Collects timing samples for named conditions and compares them
+
+    Conditions are sampled in rounds, one request each per round in a
+    shuffled order, so drift in the network or the target lands on all
+    conditions alike. Rounds run on a small thread pool; only pass
+    conditions whose requests are safe to send concurrently (reads).
+    """
+
+    def __init__(self, samples=None, workers=None, trim_fraction=None, bootstrap=None,
+                 alpha=None, min_effect=None, confidence=0.95, seed=None):
+        self.samples = samples or int(os.getenv('TIMING_SAMPLES', 200))
+        self.workers = workers or int(os.getenv('TIMING_WORKERS', 4))
+        self.trim_fraction = trim_fraction if trim_fraction is not None else float(os.getenv('TIMING_TRIM', 0.05))
+        self.bootstrap = bootstrap or int(os.getenv('TIMING_BOOTSTRAP', 2000))
+        self.alpha = alpha or float(os.getenv('TIMING_ALPHA', 0.01))
+        self.min_effect = min_effect if min_effect is not None else float(os.getenv('TIMING_MIN_EFFECT', 0.05))
+        self.confidence = confidence
+        self.rng = random.Random(seed)
+
+    @staticmethod
+    def _timed(condition, send):
+        start = time.perf_counter()
+        try:
+            send()
+        except Exception:
+            return condition, None
+        return condition, time.perf_counter() - start
+
+    def collect(self, conditions):
+        """Sample each of {name: send()} self.samples times; returns {name: [seconds]}"""
+        schedule = []
+        for _ in range(self.samples):
+            names = list(conditions)
+            self.rng.shuffle(names)
+            schedule.extend(names)
+
+        results = {name: [] for name in conditions}
+        with suite_executor(self.workers) as executor:
+            for name, elapsed in executor.map(lambda name: self._timed(name, conditions[name]), schedule):
+                if elapsed is not None:
+                    results[name].append(elapsed)
+        return results
+
+    def compare(self, slow, fast):
+        """Test whether slow samples are slower than fast ones"""
+        if min(len(slow), len(fast)) < 3:
+            raise ValueError("need at least 3 samples per condition")
+        raw_counts = [len(slow), len(fast)]
+        slow, fast = trim(slow, self.trim_fraction), trim(fast, self.trim_fraction)
+        ci = bootstrap_ci(slow, fast, iterations=self.bootstrap, confidence=self.confidence, rng=self.rng)
+        return TimingComparison(slow, fast, raw_counts, ci, welch_t_test(slow, fast),
+                                mann_whitney_u(slow, fast), self.alpha, self.min_effect)
+
+    @staticmethod
+    def percentile_rank(value, samples):
+        """Fraction of samples at or above value: an empirical one-sided p-value"""
+        return (sum(1 for sample in samples if sample >= value) + 1) / (len(samples) + 1)
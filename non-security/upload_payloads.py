@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Streaming Upload Payloads for Security Tests
+Multipart bodies built lazily from payload sources, so a 1GB upload costs
+one chunk of memory and no disk writes
+"""
+
+import mmap
+import os
+import select
+import socket
+import ssl
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from cassette import get_cassette, request_key
+from latency import LATENCY
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BytesSource:
+    """Small in-memory payload"""
+
+    def __init__(self, data):
+        self.data = data.encode() if isinstance(data, str) else data
+        self.size = len(self.data)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        view = memoryview(self.data)
+        for offset in range(0, self.size, chunk_size):
+            yield view[offset:offset + chunk_size]
+
+
+class SyntheticSource:
+    """
+    Generated payload of any size
+
+    Repeats one preallocated chunk (optionally after a short prefix such as
+    a file signature), so memory use is one chunk whatever the size.
+    """
+
+    def __init__(self, size, fill=b'\x00', prefix=b''):
+        self.size = size
+        self.fill = fill
+        self.prefix = prefix[:size]
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        if self.prefix:
+            yield memoryview(self.prefix)
+
+        remaining = self.size - len(self.prefix)
+        block = memoryview((self.fill * (chunk_size // len(self.fill) + 1))[:chunk_size])
+        while remaining > 0:
+            step = min(chunk_size, remaining)
+            yield block[:step]
+            remaining -= step
+
+
+class MappedFileSource:
+    """Existing file streamed through a read-only memory map"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        if self.size == 0:
+            return
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Slicing copies one chunk out of the page cache; holding
+                # memoryviews instead would keep the map from closing
+                for offset in range(0, self.size, chunk_size):
+                    yield mapped[offset:offset + chunk_size]
+
+
+class StreamingMultipartBody:
+    """
+    multipart/form-data body for one file field, read lazily
+
+    Pass it as data= with its content_type header; requests sees a sized
+    file-like object and streams it with a Content-Length.
+    """
+
+    def __init__(self, field, filename, content_type, source, chunk_size=CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.source = source
+        self.chunk_size = chunk_size
+        self.preamble = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+        self.bytes_read = 0
+        self.rewind()
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def headers(self):
+        return {'Content-Type': self.content_type}
+
+    def __len__(self):
+        return len(self.preamble) + self.source.size + len(self.epilogue)
+
+    def _parts(self):
+        yield memoryview(self.preamble)
+        yield from self.source.iter_chunks(self.chunk_size)
+        yield memoryview(self.epilogue)
+
+    def rewind(self):
+        """Start again from the first byte"""
+        self._parts_iter = self._parts()
+        self._pending = memoryview(b'')
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self) - self.bytes_read
+
+        out = bytearray()
+        while len(out) < size:
+            if not self._pending:
+                try:
+                    self._pending = next(self._parts_iter)
+                except StopIteration:
+                    break
+            take = self._pending[:size - len(out)]
+            out += take
+            self._pending = self._pending[len(take):]
+
+        self.bytes_read += len(out)
+        return bytes(out)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class UploadProbe:
+    """Outcome of one streamed upload"""
+
+    def __init__(self, size, status_code, bytes_sent, aborted, elapsed):
+        self.size = size
+        self.status_code = status_code   # None if the server closed without answering
+        self.bytes_sent = bytes_sent
+        self.aborted = aborted           # stopped sending because the server answered or hung up
+        self.elapsed = elapsed
+
+    @property
+    def accepted(self):
+        return self.status_code == 200
+
+    def to_dict(self):
+        return {
+            'size': self.size,
+            'status_code': self.status_code,
+            'bytes_sent': self.bytes_sent,
+            'aborted': self.aborted,
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+def _poll_response(sock):
+    """
+    Bytes the server has already answered with, without blocking
+
+    Returns None when there is nothing to read yet and b'' when the server
+    closed the connection. TLS sockets can be readable with no application
+    data (e.g. session tickets), which also comes back as None.
+    """
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return None
+
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        return sock.recv(65536)
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return None
+    except ConnectionError:
+        return b''
+    finally:
+        sock.settimeout(timeout)
+
+
+def read_status(sock, received):
+    """Status code from the response status line, or None if there is none"""
+    while b'\r\n' not in received:
+        try:
+            data = sock.recv(65536)
+        except (ConnectionError, socket.timeout, ssl.SSLError):
+            break
+        if not data:
+            break
+        received += data
+
+    parts = received.split(b'\r\n', 1)[0].split()
+    if len(parts) >= 2 and parts[0].startswith(b'HTTP/') and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def post_streaming(url, body, timeout=30, tls_context=None):
+    """
+    POST a streamed body over a fresh connection, stopping as soon as the
+    server answers
+
+    requests always sends the whole body before reading the response; here
+    each chunk is preceded by a non-blocking check, so a server that rejects
+    on Content-Length (e.g. 413) costs only the bytes sent before it replied.
+    The connection is closed afterwards.
+    """
+    cassette = get_cassette()
+    key = request_key('POST', url, body) if cassette is not None else None
+    if cassette is not None and cassette.replaying:
+        entry = cassette.replay(key)
+        LATENCY.record('POST', url, entry['elapsed'])
+        return UploadProbe(entry['size'], entry['status_code'], entry['bytes_sent'], entry['aborted'], entry['elapsed'])
+
+    parts = urlsplit(url)
+    https = parts.scheme == 'https'
+    port = parts.port or (443 if https else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    start = time.perf_counter()
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    try:
+        if https:
+            context = tls_context or ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Content-Type: {body.content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Accept: application/json\r\n"
+            f"Connection: close\r\n\r\n"
+        ).encode()
+
+        received = b''
+        aborted = False
+        sent = 0
+        try:
+            sock.sendall(head)
+            for chunk in body:
+                early = _poll_response(sock)
+                if early is not None:
+                    received = early
+                    aborted = True
+                    break
+                sock.sendall(chunk)
+                sent += len(chunk)
+        except ConnectionError:
+            # Server hung up mid-body; it may still have written a response first
+            aborted = True
+
+        status_code = read_status(sock, received)
+        elapsed = time.perf_counter() - start
+        LATENCY.record('POST', url, elapsed)
+        probe = UploadProbe(body.source.size, status_code, sent, aborted, elapsed)
+        if cassette is not None:
+            cassette.record(key, {**probe.to_dict(), 'elapsed': elapsed})
+        return probe
+    finally:
+        sock.close()
+
+
+def payload_source(size_bytes, prefix=b''):
+    """
+    Source for a large upload: UPLOAD_PAYLOAD_FILE if set (memory-mapped),
+    otherwise generated zeros
+    """
+    path = os.getenv('UPLOAD_PAYLOAD_FILE')
+    if path:
+        return MappedFileSource(path)
+    return SyntheticSource(size_bytes, prefix=prefix)